@@ -0,0 +1,54 @@
+// Schema: 一意制約・インデックス
+// save_weather.py の SatelliteDataWriter が初回書き込み時（または --migrate）に
+// 同じ移行を行ってから同じ定義を作成する。移行後も制約を作成できない場合は書き込みを中止する
+//
+// SatelliteData は (farm, date, product) で一意。再実行しても観測は重複せず上書きされる。
+
+// ----------------------------------------------------------------------------
+// 既存データの移行（キー導入前に CREATE で保存された観測）
+// ----------------------------------------------------------------------------
+
+// 1. キー項目を補完（同じキーの観測が既にあれば古い方を削除）
+MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
+WHERE s.farm IS NULL OR s.product IS NULL
+WITH coalesce(s.farm, f.name) AS farm, s.date AS date, coalesce(s.product, 'SGLI') AS product, s
+ORDER BY coalesce(s.updated_at, s.created_at) DESC
+WITH farm, date, product, collect(s) AS legacy
+OPTIONAL MATCH (keyed:SatelliteData {farm: farm, date: date, product: product})
+WITH farm, product, legacy, count(keyed) > 0 AS has_keyed
+WITH farm, product,
+     CASE WHEN has_keyed THEN [] ELSE legacy[0..1] END AS kept,
+     CASE WHEN has_keyed THEN legacy ELSE legacy[1..] END AS duplicates
+FOREACH (s IN kept | SET s.farm = farm, s.product = product)
+FOREACH (duplicate IN duplicates | DETACH DELETE duplicate);
+
+// 2. 同じキーの重複を最新の1件に集約
+MATCH (s:SatelliteData)
+WHERE s.farm IS NOT NULL AND s.product IS NOT NULL
+WITH s.farm AS farm, s.date AS date, s.product AS product, s
+ORDER BY coalesce(s.updated_at, s.created_at) DESC
+WITH farm, date, product, collect(s) AS nodes
+WHERE size(nodes) > 1
+UNWIND nodes[1..] AS duplicate
+DETACH DELETE duplicate;
+
+// ----------------------------------------------------------------------------
+// 制約・インデックス
+// ----------------------------------------------------------------------------
+
+CREATE CONSTRAINT farm_name IF NOT EXISTS
+FOR (f:Farm) REQUIRE f.name IS UNIQUE;
+
+CREATE CONSTRAINT satellite_data_key IF NOT EXISTS
+FOR (s:SatelliteData) REQUIRE (s.farm, s.date, s.product) IS UNIQUE;
+
+CREATE RANGE INDEX satellite_data_date IF NOT EXISTS
+FOR (s:SatelliteData) ON (s.date);
+
+// 日次・週次・月次の集計ノード（既存データの集計は SatelliteDataWriter の初回書き込み時、
+// または save_weather.py --migrate / --rebuild-aggregates で作成）
+CREATE CONSTRAINT observation_aggregate_key IF NOT EXISTS
+FOR (a:ObservationAggregate) REQUIRE (a.farm, a.period, a.start) IS UNIQUE;
+
+CREATE RANGE INDEX observation_aggregate_start IF NOT EXISTS
+FOR (a:ObservationAggregate) ON (a.period, a.start);
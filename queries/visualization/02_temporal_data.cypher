@@ -45,32 +45,43 @@ LIMIT 20;
 
 // ---------------------------------------------------------------------
 
-// クエリ3: 週次NDVI平均
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WITH s.date AS date, s.ndvi_avg AS ndvi
-WITH date.year AS 年, date.week AS 週, ndvi
+// クエリ3: 週次NDVI平均（週次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'week'})
+WHERE a.ndvi_count > 0
+WITH a.start.weekYear AS 年,
+     a.start.week AS 週,
+     sum(a.ndvi_sum) AS total,
+     sum(a.ndvi_count) AS n,
+     min(a.ndvi_min) AS ndvi_min,
+     max(a.ndvi_max) AS ndvi_max
 RETURN 年,
        週,
-       AVG(ndvi) AS NDVI平均,
-       COUNT(*) AS データ数,
-       MIN(ndvi) AS NDVI最小,
-       MAX(ndvi) AS NDVI最大
+       total / n AS NDVI平均,
+       n AS データ数,
+       ndvi_min AS NDVI最小,
+       ndvi_max AS NDVI最大
 ORDER BY 年 DESC, 週 DESC
 LIMIT 12;
 
 // ---------------------------------------------------------------------
 
-// クエリ4: 月次統計サマリー
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WITH s.date.year AS 年,
-     s.date.month AS 月,
-     s.ndvi_avg AS ndvi,
-     s.temperature AS temp
+// クエリ4: 月次統計サマリー（月次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'month'})
+WITH a.start.year AS 年,
+     a.start.month AS 月,
+     sum(a.ndvi_sum) AS ndvi_total,
+     sum(a.ndvi_count) AS ndvi_n,
+     sum(a.ndvi_sumsq) AS ndvi_sumsq,
+     sum(a.temp_sum) AS temp_total,
+     sum(a.temp_count) AS temp_n
 RETURN 年,
        月,
-       round(AVG(ndvi) * 1000) / 1000 AS NDVI平均,
-       round(AVG(temp) * 10) / 10 AS 温度平均,
-       COUNT(*) AS 観測回数
+       CASE WHEN ndvi_n > 0 THEN round(ndvi_total / ndvi_n * 1000) / 1000 END AS NDVI平均,
+       CASE WHEN ndvi_n > 0
+            THEN round(sqrt(ndvi_sumsq / ndvi_n - (ndvi_total / ndvi_n) ^ 2) * 1000) / 1000
+       END AS NDVI標準偏差,
+       CASE WHEN temp_n > 0 THEN round(temp_total / temp_n * 10) / 10 END AS 温度平均,
+       ndvi_n AS 観測回数
 ORDER BY 年 DESC, 月 DESC;
 
 // ---------------------------------------------------------------------
@@ -94,6 +105,10 @@ LIMIT 50;
 // - duration({days: 30}): 過去30日分のデータを取得
 // - date(): 現在の日付
 // - s.date.year, s.date.month, s.date.week: 年月週の抽出
+// - ObservationAggregate: 保存時に更新される日次・週次・月次の集計ノード
+//   （period: 'day' | 'week' | 'month'、start: 期間の開始日）。
+//   件数・合計・二乗和・最小・最大を持ち、平均 = 合計 / 件数、
+//   標準偏差 = sqrt(二乗和 / 件数 - 平均^2) で求める
 //
 // 【可視化のヒント】
 // Neo4jブラウザの設定:
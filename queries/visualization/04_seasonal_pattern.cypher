@@ -16,23 +16,29 @@
 //
 // =====================================================================
 
-// クエリ1: 季節別統計サマリー
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WITH s.date.month AS 月,
-     CASE
-       WHEN s.date.month IN [3, 4, 5] THEN '春'
-       WHEN s.date.month IN [6, 7, 8] THEN '夏'
-       WHEN s.date.month IN [9, 10, 11] THEN '秋'
+// クエリ1: 季節別統計サマリー（月次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'month'})
+WITH CASE
+       WHEN a.start.month IN [3, 4, 5] THEN '春'
+       WHEN a.start.month IN [6, 7, 8] THEN '夏'
+       WHEN a.start.month IN [9, 10, 11] THEN '秋'
        ELSE '冬'
      END AS 季節,
-     s.ndvi_avg AS ndvi,
-     s.temperature AS temp
+     a
+WITH 季節,
+     sum(a.ndvi_count) AS ndvi_n,
+     sum(a.ndvi_sum) AS ndvi_total,
+     min(a.ndvi_min) AS ndvi_min,
+     max(a.ndvi_max) AS ndvi_max,
+     sum(a.temp_count) AS temp_n,
+     sum(a.temp_sum) AS temp_total
+WHERE ndvi_n > 0
 RETURN 季節,
-       COUNT(*) AS 観測数,
-       round(AVG(ndvi) * 1000) / 1000 AS NDVI平均,
-       round(MIN(ndvi) * 1000) / 1000 AS NDVI最小,
-       round(MAX(ndvi) * 1000) / 1000 AS NDVI最大,
-       round(AVG(temp) * 10) / 10 AS 温度平均
+       ndvi_n AS 観測数,
+       round(ndvi_total / ndvi_n * 1000) / 1000 AS NDVI平均,
+       round(ndvi_min * 1000) / 1000 AS NDVI最小,
+       round(ndvi_max * 1000) / 1000 AS NDVI最大,
+       CASE WHEN temp_n > 0 THEN round(temp_total / temp_n * 10) / 10 END AS 温度平均
 ORDER BY CASE 季節
   WHEN '春' THEN 1
   WHEN '夏' THEN 2
@@ -42,12 +48,18 @@ END;
 
 // ---------------------------------------------------------------------
 
-// クエリ2: 月次NDVIトレンド（年間パターン）
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WITH s.date.month AS 月,
-     AVG(s.ndvi_avg) AS ndvi平均,
-     AVG(s.temperature) AS 温度平均,
-     COUNT(*) AS データ数
+// クエリ2: 月次NDVIトレンド（年間パターン、月次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'month'})
+WITH a.start.month AS 月,
+     sum(a.ndvi_sum) AS ndvi_total,
+     sum(a.ndvi_count) AS ndvi_n,
+     sum(a.temp_sum) AS temp_total,
+     sum(a.temp_count) AS temp_n
+WHERE ndvi_n > 0
+WITH 月,
+     ndvi_total / ndvi_n AS ndvi平均,
+     CASE WHEN temp_n > 0 THEN temp_total / temp_n END AS 温度平均,
+     ndvi_n AS データ数
 RETURN 月,
        CASE 月
          WHEN 1 THEN '1月' WHEN 2 THEN '2月' WHEN 3 THEN '3月'
@@ -67,11 +79,14 @@ ORDER BY 月;
 
 // ---------------------------------------------------------------------
 
-// クエリ3: 年次比較（複数年のデータがある場合）
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WITH s.date.year AS 年,
-     s.date.month AS 月,
-     AVG(s.ndvi_avg) AS ndvi平均
+// クエリ3: 年次比較（複数年のデータがある場合、月次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'month'})
+WITH a.start.year AS 年,
+     a.start.month AS 月,
+     sum(a.ndvi_sum) AS ndvi_total,
+     sum(a.ndvi_count) AS ndvi_n
+WHERE ndvi_n > 0
+WITH 年, 月, ndvi_total / ndvi_n AS ndvi平均
 RETURN 年,
        月,
        round(ndvi平均 * 1000) / 1000 AS NDVI平均
@@ -103,25 +118,32 @@ LIMIT 30;
 
 // ---------------------------------------------------------------------
 
-// クエリ5: 温度とNDVIの季節相関
-MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-WHERE s.temperature IS NOT NULL
-WITH s.date.month AS 月,
-     CASE
-       WHEN s.date.month IN [3, 4, 5] THEN '春'
-       WHEN s.date.month IN [6, 7, 8] THEN '夏'
-       WHEN s.date.month IN [9, 10, 11] THEN '秋'
+// クエリ5: 温度とNDVIの季節相関（月次集計ノードから）
+MATCH (f:Farm)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'month'})
+WITH CASE
+       WHEN a.start.month IN [3, 4, 5] THEN '春'
+       WHEN a.start.month IN [6, 7, 8] THEN '夏'
+       WHEN a.start.month IN [9, 10, 11] THEN '秋'
        ELSE '冬'
      END AS 季節,
-     s.ndvi_avg AS ndvi,
-     s.temperature AS temp
+     a
+WITH 季節,
+     sum(a.temp_sum) AS temp_total,
+     sum(a.temp_count) AS temp_n,
+     sum(a.ndvi_sum) AS ndvi_total,
+     sum(a.ndvi_count) AS ndvi_n
+WHERE temp_n > 0 AND ndvi_n > 0
+WITH 季節,
+     temp_total / temp_n AS temp,
+     ndvi_total / ndvi_n AS ndvi,
+     temp_n AS データ数
 RETURN 季節,
-       round(AVG(temp) * 10) / 10 AS 平均温度,
-       round(AVG(ndvi) * 1000) / 1000 AS 平均NDVI,
-       COUNT(*) AS データ数,
+       round(temp * 10) / 10 AS 平均温度,
+       round(ndvi * 1000) / 1000 AS 平均NDVI,
+       データ数,
        CASE
-         WHEN AVG(temp) > 25 AND AVG(ndvi) > 0.7 THEN '⚠️ 高温・高NDVI'
-         WHEN AVG(temp) < 10 AND AVG(ndvi) < 0.5 THEN '⚠️ 低温・低NDVI'
+         WHEN temp > 25 AND ndvi > 0.7 THEN '⚠️ 高温・高NDVI'
+         WHEN temp < 10 AND ndvi < 0.5 THEN '⚠️ 低温・低NDVI'
          ELSE '✓ 正常範囲'
        END AS 状態
 ORDER BY CASE 季節
@@ -161,6 +183,8 @@ LIMIT 20;
 // =====================================================================
 // 【パラメータ説明】
 // - s.date.month: 月（1-12）
+// - 集計系のクエリ（1, 2, 3, 5）は月次集計ノード ObservationAggregate {period: 'month'}
+//   の件数・合計を足し合わせるため、観測数ではなく月数に比例する
 // - 季節の定義: 春(3-5月), 夏(6-8月), 秋(9-11月), 冬(12-2月)
 // - 成長ステージ閾値: NDVI > 0.7 (成長期), > 0.5 (成長中)
 //
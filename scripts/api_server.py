@@ -4,13 +4,35 @@ Nanaka Farm API Server
 Flask REST APIサーバー - Neo4jデータをダッシュボードに提供
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, make_response, stream_with_context
 from flask_cors import CORS
 from neo4j import GraphDatabase
-from datetime import datetime, timedelta
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import wraps
+import gzip
+import hashlib
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+# brotliはオプション（未インストール時はgzipのみ）
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+from dashboard_queries import (
+    FIELDS_PAGING, FIELDS_QUERY, NDVI_TREND_QUERY, TREND_PAGING, decode_cursor, format_field,
+    format_trend_row, mock_ndvi_trend, parse_limit, read_dashboard, read_fields, read_health,
+    read_ndvi_distribution, read_ndvi_trend, read_page, read_summary, read_work_hours
+)
+from data_version import read_version
+from tile_renderer import get_tile
+
 # 環境変数読み込み
 load_dotenv()
 
@@ -22,15 +44,458 @@ NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# 接続プール設定（プロセスごと）
+NEO4J_POOL_SIZE = int(os.getenv('NEO4J_POOL_SIZE', '100'))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv('NEO4J_ACQUISITION_TIMEOUT', '5'))
+
+_driver = None
+_driver_lock = threading.Lock()
+
+
+def get_driver():
+    """
+    Neo4jドライバを取得（初回呼び出し時に作成、プロセスごとに1つ）
+
+    import時には接続しないため、ワーカープロセスは起動後の最初の
+    リクエストで自分の接続プールを作る。プールが埋まっている場合は
+    NEO4J_ACQUISITION_TIMEOUT 秒で諦めてエラーを返す。
+    """
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            _driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USER, NEO4J_PASSWORD),
+                max_connection_pool_size=NEO4J_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT
+            )
+        return _driver
+
+
+def close_neo4j_driver():
+    """Neo4jドライバをクローズ（サーバー終了時）"""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
 
 
 def get_neo4j_session():
     """Neo4jセッションを取得"""
-    return driver.session()
+    return get_driver().session()
+
+
+# レスポンスキャッシュ設定
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', '300'))
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '256'))
+
+
+class ResponseCache:
+    """
+    エンドポイント＋クエリ引数をキーにしたレスポンスキャッシュ（TTL・LRU）
+
+    各エントリは保存時のデータバージョンを持ち、書き込み側が
+    バージョンを上げると次のアクセスで破棄される。
+    """
+
+    def __init__(self, maxsize=API_CACHE_SIZE, ttl=API_CACHE_TTL):
+        """
+        Args:
+            maxsize: 最大エントリ数（超えたら最も古く使われたものから削除）
+            ttl: 有効期間（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """有効なエントリを取得（期限切れ・旧バージョンはNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, entry_version, value = entry
+            if entry_version != version or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, version, value, ttl=None):
+        """エントリを保存"""
+        with self._lock:
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, version, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """全エントリを削除"""
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+# 圧縮設定（これより小さいレスポンスは圧縮しない）
+API_COMPRESS_MIN_SIZE = int(os.getenv('API_COMPRESS_MIN_SIZE', '1024'))
+
+
+def response_etag(key, version):
+    """
+    レスポンスの強いETagを計算
+
+    内容はデータバージョン・エンドポイント・クエリ引数と、クエリが
+    date() 基準の期間を使うため当日の日付で決まる。Neo4jに問い合わせずに求まる。
+    """
+    seed = json.dumps([version, datetime.now().date().isoformat(), key[0], key[1]])
+    return hashlib.sha1(seed.encode('utf-8')).hexdigest()
+
+
+def etag_matches(req, etag):
+    """If-None-Match が（いずれかの圧縮形式の）ETagに一致するか"""
+    if_none_match = req.if_none_match
+    return any(
+        if_none_match.contains_weak(tag)
+        for tag in (etag, f"{etag}-gzip", f"{etag}-br")
+    )
+
+
+def negotiate_encoding(req, size):
+    """
+    Accept-Encoding から圧縮形式を選択
+
+    Returns:
+        'br' / 'gzip'（圧縮しない場合はNone）
+    """
+    if size < API_COMPRESS_MIN_SIZE:
+        return None
+
+    offers = ['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip']
+    return req.accept_encodings.best_match(offers)
+
+
+def compress_body(body, encoding):
+    """レスポンス本文を圧縮"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def wants_ndjson(req):
+    """Accept で NDJSON（1行1レコード）のストリーミングが要求されているか"""
+    best = req.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+
+def json_response(payload, status=200):
+    """JSONレスポンス（リクエストコンテキスト外でも使える jsonify）"""
+    response = app.json.response(payload)
+    response.status_code = status
+    return response
+
+
+def error_response(error, status=500):
+    """エラーのJSONレスポンス"""
+    return json_response({'error': str(error)}, status)
+
+
+# ---------------------------------------------------------------------------
+# 読み取りエンドポイント（api_server_async.py と共通）
+# ---------------------------------------------------------------------------
+#
+# 各エンドポイントはリクエストを JsonRead（dashboard_queries の読み取り関数）か
+# NdjsonRead（1行1レコードで送るクエリ）に変換するだけで、Neo4jへの問い合わせは
+# Flask版では同期ドライバ、ASGI版では非同期ドライバで行う。
+
+# work: dashboard_queries.read_transaction で包んだ読み取り関数
+# transaction: True なら読み取りトランザクション（execute_read）で実行
+JsonRead = namedtuple('JsonRead', ['work', 'args', 'transaction'])
+
+# limit・cursor_of はページ分割時のみ、fallback は結果が0件のときに返すレコードのリスト
+NdjsonRead = namedtuple('NdjsonRead', ['query', 'params', 'format_row', 'limit', 'cursor_of', 'fallback'])
+
+
+def paged_request(req, paging):
+    """
+    limit・cursor クエリ引数を読み取る
+
+    Args:
+        req: リクエスト
+        paging: dashboard_queries の TREND_PAGING / FIELDS_PAGING
+
+    Returns:
+        (limit, カーソルのパラメータ辞書)（limit省略時は (None, {})）
+
+    Raises:
+        ValueError: 不正な limit・cursor
+    """
+    limit = parse_limit(req.args.get('limit'))
+    if limit is None:
+        return None, {}
+    return limit, decode_cursor(req.args.get('cursor'), paging[1])
+
+
+def paged_read(req, paging, limit, cursor_params, **params):
+    """
+    キーセットページ分割の読み取り（JSON または NDJSON）
+
+    Args:
+        req: リクエスト
+        paging: dashboard_queries の TREND_PAGING / FIELDS_PAGING
+        limit: ページサイズ
+        cursor_params: カーソルのパラメータ辞書
+        **params: その他のクエリパラメータ
+    """
+    query, _, format_row, cursor_of = paging
+    # 1件多く読んで続きの有無を判定する
+    params = dict(params, limit=limit + 1, **cursor_params)
+
+    if wants_ndjson(req):
+        return NdjsonRead(query, params, format_row, limit, cursor_of, None)
+    return JsonRead(read_page, (paging, limit, params), False)
+
+
+def summary_read(req):
+    """/api/summary"""
+    return JsonRead(read_summary, (), False)
+
+
+def ndvi_trend_read(req):
+    """/api/ndvi-trend"""
+    days = req.args.get('days', default=7, type=int)
+    limit, cursor_params = paged_request(req, TREND_PAGING)
+
+    if limit is not None:
+        return paged_read(req, TREND_PAGING, limit, cursor_params, days=days)
+
+    if wants_ndjson(req):
+        return NdjsonRead(NDVI_TREND_QUERY, {'days': days}, format_trend_row, None, None,
+                          mock_ndvi_trend(days))
+
+    return JsonRead(read_ndvi_trend, (days,), False)
+
+
+def ndvi_distribution_read(req):
+    """/api/ndvi-distribution"""
+    return JsonRead(read_ndvi_distribution, (req.args.get('days', default=30, type=int),), False)
+
+
+def work_hours_read(req):
+    """/api/work-hours"""
+    return JsonRead(read_work_hours, (), False)
+
+
+def fields_read(req):
+    """/api/fields"""
+    limit, cursor_params = paged_request(req, FIELDS_PAGING)
+
+    if limit is not None:
+        return paged_read(req, FIELDS_PAGING, limit, cursor_params)
+
+    if wants_ndjson(req):
+        return NdjsonRead(FIELDS_QUERY, {}, format_field, None, None, None)
+
+    return JsonRead(read_fields, (), False)
+
+
+def dashboard_read(req):
+    """/api/dashboard（1セッション・1読み取りトランザクション・1クエリ）"""
+    return JsonRead(read_dashboard, (req.args.get('days', default=7, type=int),), True)
+
+
+READ_ENDPOINTS = {
+    '/api/summary': summary_read,
+    '/api/ndvi-trend': ndvi_trend_read,
+    '/api/ndvi-distribution': ndvi_distribution_read,
+    '/api/work-hours': work_hours_read,
+    '/api/fields': fields_read,
+    '/api/dashboard': dashboard_read
+}
+
+
+def run_read(read):
+    """JsonRead を同期ドライバで実行"""
+    with get_neo4j_session() as session:
+        if read.transaction:
+            return session.execute_read(read.work, *read.args)
+        return read.work(session, *read.args)
+
+
+def ndjson_line(item):
+    """NDJSONの1行"""
+    return json.dumps(item, ensure_ascii=False) + '\n'
+
+
+def ndjson_lines(read):
+    """
+    Neo4jの結果を読みながら1行ずつ返すNDJSON
+
+    結果はドライバがバッチ単位で取得するため、件数によらずメモリ使用量は一定。
+    ページ分割時に続きがあれば最終行に {"nextCursor": ...} を返す。
+
+    Args:
+        read: NdjsonRead
+    """
+    try:
+        with get_neo4j_session() as session:
+            count = 0
+            last_row = None
+            for row in session.run(read.query, **read.params):
+                if read.limit is not None and count == read.limit:
+                    yield ndjson_line({'nextCursor': read.cursor_of(last_row)})
+                    return
+                yield ndjson_line(read.format_row(row))
+                count += 1
+                last_row = row
+
+        if count == 0:
+            for item in read.fallback or []:
+                yield ndjson_line(item)
+
+    except Exception as e:
+        # ステータスは送信済みのためエラーも1行として返す
+        yield ndjson_line({'error': str(e)})
+
+
+def serve_read(endpoint):
+    """
+    読み取りエンドポイントを同期ドライバで処理
+
+    Args:
+        endpoint: READ_ENDPOINTS の関数
+
+    Returns:
+        JSON または NDJSON のレスポンス（不正な引数は400、Neo4jのエラーは500）
+    """
+    try:
+        read = endpoint(request)
+    except ValueError as e:
+        return error_response(e, 400)
+
+    if isinstance(read, NdjsonRead):
+        return Response(stream_with_context(ndjson_lines(read)), mimetype='application/x-ndjson')
+
+    try:
+        return json_response(run_read(read))
+    except Exception as e:
+        return error_response(e)
+
+
+def not_modified_response(etag):
+    """304レスポンス"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+
+def encoded_response(req, cached, etag):
+    """キャッシュした本文を（必要なら圧縮して）返すレスポンス"""
+    body, mimetype, encoded = cached
+
+    encoding = negotiate_encoding(req, len(body))
+    if encoding:
+        if encoding not in encoded:
+            encoded[encoding] = compress_body(body, encoding)
+        body = encoded[encoding]
+
+    response = app.response_class(body, status=200, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{etag}-{encoding}")
+    else:
+        response.set_etag(etag)
+    # ブラウザにも毎回ETagで再検証させる
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+
+def cache_lookup(req, ttl=None):
+    """
+    ETag・レスポンスキャッシュを確認
+
+    Args:
+        req: リクエスト
+        ttl: 有効期間（秒、省略時は API_CACHE_TTL、0でキャッシュしない）
+
+    Returns:
+        (レスポンス, None)（304またはキャッシュ済み）、
+        または (None, cache_store に渡す状態)（Neo4jへの問い合わせが必要）
+    """
+    key = (req.path, tuple(sorted(req.args.items(multi=True))))
+    version = read_version()
+    etag = response_etag(key, version)
+
+    if etag_matches(req, etag):
+        return not_modified_response(etag), None
+
+    use_cache = ttl != 0 and response_cache.maxsize > 0
+    cached = response_cache.get(key, version) if use_cache else None
+    if cached is not None:
+        return encoded_response(req, cached, etag), None
+
+    return None, (key, version, etag, use_cache, ttl)
+
+
+def cache_store(req, state, response):
+    """
+    成功レスポンス（200）をキャッシュし、圧縮・ETagを付けて返す
+
+    Args:
+        req: リクエスト
+        state: cache_lookup が返した状態
+        response: ビューのレスポンス
+    """
+    if response.status_code != 200:
+        return response
+
+    key, version, etag, use_cache, ttl = state
+    cached = (response.get_data(), response.mimetype, {})
+    if use_cache:
+        response_cache.set(key, version, cached, ttl)
+
+    return encoded_response(req, cached, etag)
+
+
+def cached_response(ttl=None):
+    """
+    成功レスポンス（200）をキャッシュするデコレータ
+
+    データバージョンから求めたETagを付け、If-None-Match が一致すれば
+    Neo4jに問い合わせず304を返す。大きなレスポンスは gzip/brotli で圧縮し、
+    圧縮結果もキャッシュする。
+
+    Args:
+        ttl: 有効期間（秒、省略時は API_CACHE_TTL）
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # ストリーミングは結果を保持しないためキャッシュしない
+            if wants_ndjson(request):
+                return view(*args, **kwargs)
+
+            response, state = cache_lookup(request, ttl)
+            if response is not None:
+                return response
+
+            return cache_store(request, state, make_response(view(*args, **kwargs)))
+        return wrapper
+    return decorator
 
 
 @app.route('/api/summary', methods=['GET'])
+@cached_response()
 def get_summary():
     """
     サマリー情報を取得
@@ -43,98 +508,59 @@ def get_summary():
             "avgNDVI": float
         }
     """
-    try:
-        with get_neo4j_session() as session:
-            # 総圃場数と総面積
-            farm_query = """
-            MATCH (f:Farm)
-            RETURN COUNT(f) AS totalFields,
-                   SUM(f.area) AS totalArea
-            """
-            farm_result = session.run(farm_query).single()
-
-            # 今月の作業時間（モックデータ - 実際のWorkLogノードがあれば置き換え）
-            monthly_hours = 120
-
-            # 平均NDVI（直近7日間）
-            ndvi_query = """
-            MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-            WHERE s.date >= date() - duration('P7D')
-            RETURN AVG(s.ndvi_avg) AS avgNDVI
-            """
-            ndvi_result = session.run(ndvi_query).single()
-
-            return jsonify({
-                'totalFields': farm_result['totalFields'] or 0,
-                'totalArea': farm_result['totalArea'] or 0,
-                'monthlyWorkHours': monthly_hours,
-                'avgNDVI': round(ndvi_result['avgNDVI'] or 0, 4)
-            })
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return serve_read(summary_read)
 
 
 @app.route('/api/ndvi-trend', methods=['GET'])
+@cached_response()
 def get_ndvi_trend():
     """
     NDVI時系列データを取得
 
     Query Parameters:
         days: 取得日数（デフォルト: 7日）
+        limit: 指定するとキーセットページ分割（1〜1000件）
+        cursor: 前ページの nextCursor
+
+    Accept: application/x-ndjson の場合は1行1レコードでストリーミング。
 
     Returns:
         [
             {"date": "2026-01-01", "ndvi": 0.75},
             ...
         ]
+        （limit指定時は {"items": [...], "nextCursor": str | null}）
     """
-    try:
-        days = request.args.get('days', default=7, type=int)
+    return serve_read(ndvi_trend_read)
 
-        with get_neo4j_session() as session:
-            query = """
-            MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
-            WHERE s.date >= date() - duration('P' + $days + 'D')
-            WITH s.date AS date, AVG(s.ndvi_avg) AS avgNdvi
-            RETURN date, avgNdvi
-            ORDER BY date ASC
-            """
-
-            result = session.run(query, days=days)
-
-            data = []
-            for record in result:
-                # Neo4j Dateオブジェクトを文字列に変換
-                date_obj = record['date']
-                if hasattr(date_obj, 'to_native'):
-                    date_str = date_obj.to_native().strftime('%m/%d')
-                else:
-                    date_str = str(date_obj)
-
-                data.append({
-                    'date': date_str,
-                    'ndvi': round(record['avgNdvi'], 4)
-                })
-
-            # データがない場合はモックデータを返す
-            if not data:
-                today = datetime.now()
-                data = [
-                    {
-                        'date': (today - timedelta(days=i)).strftime('%m/%d'),
-                        'ndvi': round(0.70 + (i * 0.01), 2)
-                    }
-                    for i in range(days-1, -1, -1)
-                ]
-
-            return jsonify(data)
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+@app.route('/api/ndvi-distribution', methods=['GET'])
+@cached_response()
+def get_ndvi_distribution():
+    """
+    期間内のNDVIピクセル分布を取得
+
+    各観測に保存されたスケッチをマージするため、ラスタの再読み込みは不要。
+
+    Query Parameters:
+        days: 取得日数（デフォルト: 30日）
+
+    Returns:
+        {
+            "observations": int,
+            "pixelCount": int,
+            "mean": float,
+            "std": float,
+            "min": float,
+            "max": float,
+            "percentiles": {"10": float, "25": float, ...}
+        }
+    """
+    return serve_read(ndvi_distribution_read)
 
 
 @app.route('/api/work-hours', methods=['GET'])
+@cached_response()
 def get_work_hours():
     """
     圃場別作業時間を取得
@@ -145,44 +571,21 @@ def get_work_hours():
             ...
         ]
     """
-    try:
-        with get_neo4j_session() as session:
-            # 実際のWorkLogノードがある場合はそちらを使用
-            # ここではモックデータを返す
-            query = """
-            MATCH (f:Farm)
-            RETURN f.name AS farmName
-            ORDER BY f.name
-            LIMIT 5
-            """
-
-            result = session.run(query)
-            farms = [record['farmName'] for record in result]
-
-            # 実データがない場合のモックデータ
-            if not farms:
-                farms = ['圃場A', '圃場B', '圃場C', '圃場D', '圃場E']
-
-            # 各圃場にモック作業時間を割り当て
-            data = []
-            base_hours = 35
-            for i, farm_name in enumerate(farms):
-                data.append({
-                    'field': farm_name,
-                    'hours': base_hours - (i * 5)
-                })
-
-            return jsonify(data)
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return serve_read(work_hours_read)
 
 
 @app.route('/api/fields', methods=['GET'])
+@cached_response()
 def get_fields():
     """
     圃場の位置情報とNDVI状態を取得
 
+    Query Parameters:
+        limit: 指定するとキーセットページ分割（1〜1000件）
+        cursor: 前ページの nextCursor
+
+    Accept: application/x-ndjson の場合は1行1レコードでストリーミング。
+
     Returns:
         [
             {
@@ -195,68 +598,226 @@ def get_fields():
                 "status": "healthy"
             }
         ]
+        （limit指定時は {"items": [...], "nextCursor": str | null}）
     """
-    try:
-        with get_neo4j_session() as session:
-            query = """
-            MATCH (f:Farm)
-            OPTIONAL MATCH (f)-[:HAS_OBSERVATION]->(s:SatelliteData)
-            WHERE s.date >= date() - duration('P7D')
-            WITH f, AVG(s.ndvi_avg) AS avgNdvi
-            RETURN
-                id(f) AS id,
-                f.name AS name,
-                f.latitude AS lat,
-                f.longitude AS lon,
-                f.area AS area,
-                avgNdvi AS ndvi,
-                CASE
-                    WHEN avgNdvi > 0.7 THEN 'healthy'
-                    WHEN avgNdvi > 0.5 THEN 'moderate'
-                    WHEN avgNdvi > 0.3 THEN 'poor'
-                    ELSE 'very_poor'
-                END AS status
-            ORDER BY f.name
-            """
-
-            result = session.run(query)
-
-            data = []
-            for record in result:
-                data.append({
-                    'id': record['id'],
-                    'name': record['name'],
-                    'lat': record['lat'],
-                    'lon': record['lon'],
-                    'area': record['area'],
-                    'ndvi': round(record['ndvi'] or 0, 4),
-                    'status': record['status'] or 'unknown'
-                })
-
-            return jsonify(data)
+    return serve_read(fields_read)
+
+
+@app.route('/api/dashboard', methods=['GET'])
+@cached_response()
+def get_dashboard():
+    """
+    ダッシュボード表示用データをまとめて取得
+
+    summary・ndvi-trend・work-hours・fields と同じ内容を、
+    1セッション・1読み取りトランザクション・1クエリで返す。
 
+    Query Parameters:
+        days: NDVI時系列の取得日数（デフォルト: 7日）
+
+    Returns:
+        {
+            "summary": {...},
+            "ndviTrend": [...],
+            "workHours": [...],
+            "fields": [...]
+        }
+    """
+    return serve_read(dashboard_read)
+
+
+@app.route('/api/tiles/<product>/<date>/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def get_tile_png(product, date, z, x, y):
+    """
+    NDVI/LSTラスタのXYZタイル（Webメルカトル、256px PNG）
+
+    描画済みタイルは data/tiles/ のディスクLRUキャッシュから返す。
+
+    Path Parameters:
+        product: NDVI / LST
+        date: 観測日（YYYY-MM-DD、latest で最新のグラニュール）
+        z, x, y: タイル座標
+
+    Returns:
+        image/png（タイルと重なるグラニュールがない場合は404）
+    """
+    try:
+        result = get_tile(product, date, z, x, y)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    if result is None:
+        return jsonify({'error': f'グラニュールが見つかりません: {product} {date}'}), 404
+
+    data, etag = result
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(data, mimetype='image/png')
+
+    response.set_etag(etag)
+    # 日付指定のタイルは元ファイルが変わらない限り同じ内容
+    response.headers['Cache-Control'] = 'no-cache' if date == 'latest' else 'public, max-age=86400'
+    return response
+
+
+# SSE配信設定
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', '0.5'))
+STREAM_HEARTBEAT = float(os.getenv('STREAM_HEARTBEAT', '15'))
+
+
+def snapshot_key(days):
+    """ダッシュボードのスナップショットのキャッシュキー（/api/dashboard?days= と同じ）"""
+    return ('/api/dashboard', (('days', str(days)),))
+
+
+def cached_snapshot(days, version):
+    """キャッシュ済みのスナップショット（JSON文字列、なければNone）"""
+    cached = response_cache.get(snapshot_key(days), version)
+    return cached[0].decode('utf-8') if cached is not None else None
+
+
+def store_snapshot(days, version, dashboard):
+    """スナップショットをキャッシュしてJSON文字列を返す"""
+    body = json.dumps(dashboard, ensure_ascii=False)
+    response_cache.set(snapshot_key(days), version, (body.encode('utf-8'), 'application/json', {}))
+    return body
+
+
+def dashboard_snapshot(days, version):
+    """
+    ダッシュボードのJSONを取得（/api/dashboard とキャッシュを共有）
+
+    同じバージョンのスナップショットはNeo4jに1回だけ問い合わせ、
+    接続中の全クライアントで使い回す。
+
+    Args:
+        days: NDVI時系列の取得日数
+        version: 現在のデータバージョン
+
+    Returns:
+        str: JSON文字列
+    """
+    body = cached_snapshot(days, version)
+    if body is not None:
+        return body
+
+    with get_neo4j_session() as session:
+        dashboard = session.execute_read(read_dashboard, days)
+
+    return store_snapshot(days, version, dashboard)
+
+
+SSE_KEEPALIVE = ": keepalive\n\n"
+
+
+def sse_dashboard_event(version, body):
+    """ダッシュボードのSSEメッセージ（id はデータバージョン）"""
+    return f"id: {version}\nevent: dashboard\ndata: {body}\n\n"
+
+
+def sse_error_event(error):
+    """エラーのSSEメッセージ"""
+    return f"event: error\ndata: {json.dumps({'error': str(error)})}\n\n"
+
+
+def parse_last_event_id(value):
+    """Last-Event-ID ヘッダーから受信済みのバージョンを取り出す（なければNone）"""
+    return int(value) if value and value.isdigit() else None
+
+
+def dashboard_events(days, last_version=None):
+    """
+    データバージョンが上がったときだけダッシュボードを送るSSEイベント列
+
+    待機中はバージョンファイルのstatのみでNeo4jには問い合わせない。
+
+    Args:
+        days: NDVI時系列の取得日数
+        last_version: クライアントが受信済みのバージョン（Last-Event-ID）
+
+    Yields:
+        str: SSEメッセージ
+    """
+    last_sent = time.monotonic()
+
+    while True:
+        version = read_version()
+
+        if version != last_version:
+            try:
+                body = dashboard_snapshot(days, version)
+            except Exception as e:
+                # Neo4j停止中は待ってから再試行（次のバージョンを待たない）
+                yield sse_error_event(e)
+                time.sleep(STREAM_HEARTBEAT)
+                continue
+
+            yield sse_dashboard_event(version, body)
+            last_version = version
+            last_sent = time.monotonic()
+
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT:
+            # プロキシに切断されないようコメント行を送る
+            yield SSE_KEEPALIVE
+            last_sent = time.monotonic()
+
+        time.sleep(STREAM_POLL_INTERVAL)
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_dashboard():
+    """
+    ダッシュボード更新のServer-Sent Eventsストリーム
+
+    接続直後に現在のスナップショットを送り、以降は取り込みが
+    Neo4jへコミットしてデータバージョンが上がったときだけ送る。
+
+    Query Parameters:
+        days: NDVI時系列の取得日数（デフォルト: 7日）
+
+    Returns:
+        text/event-stream（event: dashboard、data は /api/dashboard と同じJSON）
+    """
+    days = request.args.get('days', default=7, type=int)
+
+    # 再接続時は受信済みのバージョンを再送しない
+    last_version = parse_last_event_id(request.headers.get('Last-Event-ID'))
+
+    return Response(
+        stream_with_context(dashboard_events(days, last_version)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def health_response(error=None):
+    """ヘルスチェックのレスポンス（error はNeo4j接続時の例外）"""
+    if error is None:
+        return json_response({
+            'status': 'healthy',
+            'neo4j': 'connected',
+            'timestamp': datetime.now().isoformat()
+        })
+    return json_response({
+        'status': 'unhealthy',
+        'neo4j': 'disconnected',
+        'error': str(error),
+        'timestamp': datetime.now().isoformat()
+    }, 500)
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """ヘルスチェックエンドポイント"""
     try:
         with get_neo4j_session() as session:
-            session.run("RETURN 1")
-        return jsonify({
-            'status': 'healthy',
-            'neo4j': 'connected',
-            'timestamp': datetime.now().isoformat()
-        })
+            read_health(session)
+        return health_response()
     except Exception as e:
-        return jsonify({
-            'status': 'unhealthy',
-            'neo4j': 'disconnected',
-            'error': str(e),
-            'timestamp': datetime.now().isoformat()
-        }), 500
+        return health_response(e)
 
 
 @app.teardown_appcontext
@@ -278,8 +839,12 @@ if __name__ == '__main__':
     print("  GET /api/health          - ヘルスチェック")
     print("  GET /api/summary         - サマリー情報")
     print("  GET /api/ndvi-trend      - NDVI時系列データ")
+    print("  GET /api/ndvi-distribution - NDVI分布（期間集計）")
     print("  GET /api/work-hours      - 圃場別作業時間")
     print("  GET /api/fields          - 圃場位置情報")
+    print("  GET /api/dashboard       - ダッシュボード一括取得")
+    print("  GET /api/stream          - ダッシュボード更新通知（SSE）")
+    print("  GET /api/tiles/{product}/{date}/{z}/{x}/{y}.png - NDVI/LSTタイル")
     print("-" * 60)
     print("💡 Usage:")
     print("  curl http://localhost:5000/api/health")
@@ -287,4 +852,5 @@ if __name__ == '__main__':
     print("=" * 60)
 
     # デバッグモードで起動（本番環境では False に設定）
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # SSE接続がリクエストを占有するためスレッドで並行処理する
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Nanaka Farm API Server (ASGI)
+api_server.py と同じAPIを Neo4j 非同期ドライバで提供するASGIアプリ（uvicorn用）
+
+/api/summary・/api/ndvi-trend・/api/ndvi-distribution・/api/work-hours・
+/api/fields・/api/dashboard・/api/health・/api/stream はイベントループ上の
+非同期ハンドラで処理し、Neo4jへの問い合わせを await するため同時リクエスト数は
+スレッド数ではなく接続プール（NEO4J_POOL_SIZE）で決まる。引数の解釈・読み取り関数・
+キャッシュ・ETag・圧縮・ページ分割・SSEのメッセージ形式は api_server.py と共通。
+
+タイル（/api/tiles）などNeo4jを使わないエンドポイントは a2wsgi でFlaskアプリを
+スレッドプール（API_THREADS）上で呼び出す。
+
+起動:
+    python scripts/serve_api.py --workers 4
+"""
+
+import asyncio
+import io
+import os
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from neo4j import AsyncGraphDatabase
+from werkzeug.wrappers import Request
+
+import api_server
+from api_server import (
+    NEO4J_ACQUISITION_TIMEOUT, NEO4J_PASSWORD, NEO4J_POOL_SIZE, NEO4J_URI, NEO4J_USER,
+    READ_ENDPOINTS, SSE_KEEPALIVE, NdjsonRead, cache_lookup, cache_store, cached_snapshot,
+    error_response, health_response, json_response, ndjson_line, parse_last_event_id,
+    sse_dashboard_event, sse_error_event, store_snapshot, wants_ndjson
+)
+from dashboard_queries import read_dashboard, read_health, run_plan_async
+from data_version import read_version
+
+# タイル描画などFlaskアプリで処理するスレッド数（ワーカープロセスごと）
+API_THREADS = int(os.getenv('API_THREADS', '8'))
+
+wsgi_app = WSGIMiddleware(api_server.app, workers=API_THREADS)
+
+_driver = None
+
+
+def get_driver():
+    """
+    Neo4j非同期ドライバを取得（初回呼び出し時に作成、ワーカープロセスごとに1つ）
+
+    ドライバはイベントループに結び付くため、import時ではなく
+    uvicorn のループ上で最初のリクエストを処理するときに作る。
+    """
+    global _driver
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT
+        )
+    return _driver
+
+
+async def close_driver():
+    """Neo4j非同期ドライバをクローズ（サーバー終了時）"""
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+
+
+async def run_read(read):
+    """JsonRead を非同期ドライバで実行（api_server.run_read の非同期版）"""
+    async with get_driver().session() as session:
+        if read.transaction:
+            return await session.execute_read(run_plan_async, read.work, *read.args)
+        return await run_plan_async(session, read.work, *read.args)
+
+
+async def ndjson_lines(read):
+    """
+    Neo4jの結果を読みながら1行ずつ返すNDJSON（api_server.ndjson_lines の非同期版）
+
+    Args:
+        read: NdjsonRead
+    """
+    try:
+        count = 0
+        async with get_driver().session() as session:
+            result = await session.run(read.query, **read.params)
+            last_row = None
+            async for row in result:
+                if read.limit is not None and count == read.limit:
+                    yield ndjson_line({'nextCursor': read.cursor_of(last_row)})
+                    return
+                yield ndjson_line(read.format_row(row))
+                count += 1
+                last_row = row
+
+        if count == 0:
+            for item in read.fallback or []:
+                yield ndjson_line(item)
+
+    except Exception as e:
+        # ステータスは送信済みのためエラーも1行として返す
+        yield ndjson_line({'error': str(e)})
+
+
+def asgi_headers(headers):
+    """ヘッダーをASGIの形式に変換（CORSはFlask版の flask_cors と同じく全オリジン許可）"""
+    return [
+        (name.lower().encode('latin-1'), value.encode('latin-1'))
+        for name, value in headers
+    ] + [(b'access-control-allow-origin', b'*')]
+
+
+async def send_response(send, response):
+    """werkzeug のレスポンスを送信"""
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': asgi_headers(response.headers.items())
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+async def stream_ndjson(send, read):
+    """NdjsonRead の結果を1行ずつ送信"""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': asgi_headers([('Content-Type', 'application/x-ndjson')])
+    })
+    async for line in ndjson_lines(read):
+        await send({'type': 'http.response.body', 'body': line.encode('utf-8'), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def serve_read(scope, send, endpoint):
+    """
+    読み取りエンドポイントを非同期ドライバで処理（api_server.serve_read と cached_response の非同期版）
+
+    Args:
+        scope: ASGIスコープ
+        send: ASGI send
+        endpoint: api_server.READ_ENDPOINTS の関数
+    """
+    req = Request(build_environ(scope, io.BytesIO()))
+
+    # ストリーミングは結果を保持しないためキャッシュしない
+    state = None
+    if not wants_ndjson(req):
+        response, state = cache_lookup(req)
+        if response is not None:
+            await send_response(send, response)
+            return
+
+    try:
+        read = endpoint(req)
+    except ValueError as e:
+        await send_response(send, error_response(e, 400))
+        return
+
+    if isinstance(read, NdjsonRead):
+        await stream_ndjson(send, read)
+        return
+
+    try:
+        response = json_response(await run_read(read))
+    except Exception as e:
+        response = error_response(e)
+
+    if state is not None:
+        response = cache_store(req, state, response)
+    await send_response(send, response)
+
+
+async def health_check(send):
+    """ヘルスチェックエンドポイント（/api/health）"""
+    try:
+        async with get_driver().session() as session:
+            await run_plan_async(session, read_health)
+        response = health_response()
+    except Exception as e:
+        response = health_response(e)
+    await send_response(send, response)
+
+
+async def dashboard_snapshot(days, version):
+    """ダッシュボードのJSONを取得（api_server.dashboard_snapshot の非同期版）"""
+    body = cached_snapshot(days, version)
+    if body is not None:
+        return body
+
+    async with get_driver().session() as session:
+        dashboard = await session.execute_read(run_plan_async, read_dashboard, days)
+
+    return store_snapshot(days, version, dashboard)
+
+
+async def dashboard_events(days, last_version=None):
+    """
+    データバージョンが上がったときだけダッシュボードを送るSSEイベント列
+    （api_server.dashboard_events の非同期版）
+
+    待機中はバージョンファイルを確認するだけで、スナップショットは非同期ドライバで取得する。
+    """
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+
+    while True:
+        version = read_version()
+
+        if version != last_version:
+            try:
+                body = await dashboard_snapshot(days, version)
+            except Exception as e:
+                # Neo4j停止中は待ってから再試行（次のバージョンを待たない）
+                yield sse_error_event(e)
+                await asyncio.sleep(api_server.STREAM_HEARTBEAT)
+                continue
+
+            yield sse_dashboard_event(version, body)
+            last_version = version
+            last_sent = loop.time()
+
+        elif loop.time() - last_sent >= api_server.STREAM_HEARTBEAT:
+            # プロキシに切断されないようコメント行を送る
+            yield SSE_KEEPALIVE
+            last_sent = loop.time()
+
+        await asyncio.sleep(api_server.STREAM_POLL_INTERVAL)
+
+
+async def stream_dashboard(scope, receive, send):
+    """
+    ダッシュボード更新のServer-Sent Eventsストリーム（/api/stream）
+
+    パラメータ・ヘッダー・レスポンスは api_server.stream_dashboard と同じ。
+    """
+    args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    days = int(args['days']) if args.get('days', '').isdigit() else 7
+
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    events = dashboard_events(days, parse_last_event_id(headers.get('last-event-id')))
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': asgi_headers([
+        ('Content-Type', 'text/event-stream; charset=utf-8'),
+        ('Cache-Control', 'no-cache'),
+        ('X-Accel-Buffering', 'no')
+    ])})
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def push():
+        async for message in events:
+            await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+
+    # クライアントが切断したら配信タスクを止める
+    disconnect = asyncio.ensure_future(wait_disconnect())
+    pusher = asyncio.ensure_future(push())
+    await asyncio.wait([disconnect, pusher], return_when=asyncio.FIRST_COMPLETED)
+    for task in (disconnect, pusher):
+        task.cancel()
+
+
+async def lifespan(receive, send):
+    """起動・終了処理（終了時にNeo4jドライバとスレッドプールを閉じる）"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_driver()
+            api_server.close_neo4j_driver()
+            wsgi_app.executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGIアプリケーション"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    path = scope['path']
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        if path in READ_ENDPOINTS:
+            await serve_read(scope, send, READ_ENDPOINTS[path])
+            return
+        if path == '/api/health':
+            await health_check(send)
+            return
+        if path == '/api/stream':
+            await stream_dashboard(scope, receive, send)
+            return
+
+    await wsgi_app(scope, receive, send)
@@ -4,10 +4,20 @@
 Complete Workflow: Collect and Save Weather Data
 JAXA G-Portal API → GeoTIFF Processing → Neo4j Storage
 
+各ステップ（jaxa_api_client / geotiff_processor / save_weather）は
+サブプロセスではなく同一プロセス内のライブラリ関数として呼び出し、
+Neo4jへの接続は1つのドライバを全レコードで共有する。
+
+処理済みグラニュールは data/metadata/processing_manifest.db に記録し、
+再実行時は新規・変更されたファイルだけを処理・保存する（--force で全件）。
+
+Neo4jへの保存は data/metadata/neo4j_spool.db に先に追記してから
+書き出すため、Neo4jが停止していても統計は失われない。
+
 エラーハンドリング:
 - API接続失敗: 3回リトライ（指数バックオフ）
 - ダウンロード失敗: ログ記録、継続
-- Neo4j保存失敗: ロールバック
+- Neo4j保存失敗: スプールに保持し、次回実行時に書き出し
 """
 
 import argparse
@@ -15,10 +25,18 @@ import json
 import os
 import sys
 import time
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from geotiff_processor import observation_date, process_file
+from granule_ingest import INGEST_MARGIN_KM
+from jaxa_api_client import fetch_products
+from neo4j_spool import ObservationSpool
+from processing_manifest import ProcessingManifest
+from save_weather import SatelliteDataWriter, observation_row
+from stats_engine import merge_statistics
+
 # Windows環境でのUTF-8出力設定
 if sys.platform == 'win32':
     import codecs
@@ -63,36 +81,23 @@ class WorkflowLogger:
         self.error_file.close()
 
 
-def run_command_with_retry(command, retry=3, backoff=2):
+def run_with_retry(func, *args, retry=3, backoff=2, **kwargs):
     """
-    コマンドをリトライ付きで実行
+    関数をリトライ付きで実行
 
     Args:
-        command: 実行するコマンド（リスト）
+        func: 実行する関数
+        *args: 関数の位置引数
         retry: リトライ回数
         backoff: バックオフ係数
+        **kwargs: 関数のキーワード引数
 
     Returns:
-        (success, output, error)
+        (success, result, error)
     """
     for attempt in range(retry):
         try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-
-            if result.returncode == 0:
-                return True, result.stdout, None
-
-            # 失敗した場合、待機してリトライ
-            if attempt < retry - 1:
-                wait_time = backoff ** attempt
-                print(f"⚠️  リトライ {attempt + 1}/{retry} (待機: {wait_time}秒)")
-                time.sleep(wait_time)
+            return True, func(*args, **kwargs), None
 
         except Exception as e:
             if attempt < retry - 1:
@@ -102,10 +107,11 @@ def run_command_with_retry(command, retry=3, backoff=2):
             else:
                 return False, None, str(e)
 
-    return False, result.stdout if result else None, result.stderr if result else "Max retries exceeded"
+    return False, None, "Max retries exceeded"
 
 
-def fetch_satellite_data(lat, lon, days, product, logger, use_mock=False):
+def fetch_satellite_data(lat, lon, days, product, logger, use_mock=False, ingest=False,
+                         margin_km=INGEST_MARGIN_KM, delete_source=False):
     """
     JAXA G-Portal APIからデータ取得
 
@@ -116,35 +122,69 @@ def fetch_satellite_data(lat, lon, days, product, logger, use_mock=False):
         product: プロダクトタイプ
         logger: ロガー
         use_mock: モックモード
+        ingest: ダウンロードしたグラニュールを圃場周辺に切り出す
+        margin_km: 切り出し時に圃場の周囲に含めるマージン（km）
+        delete_source: 切り出し後に元のグラニュールを削除する
 
     Returns:
         成功したかどうか
     """
     logger.log(f"=== データ取得開始: {product} ===")
 
-    command = [
-        "python", "scripts/jaxa_api_client.py",
-        "--lat", str(lat),
-        "--lon", str(lon),
-        "--days", str(days),
-        "--product", product,
-        "--download"
-    ]
-
-    if use_mock:
-        command.append("--mock")
-
-    success, output, error = run_command_with_retry(command, retry=3)
+    success, results, error = run_with_retry(
+        fetch_products, lat, lon, days, product,
+        use_mock=use_mock, download=True, retry=3,
+        ingest=ingest, margin_km=margin_km, delete_source=delete_source
+    )
 
     if success:
-        logger.log(f"✓ {product}データ取得成功")
+        logger.log(f"✓ {product}データ取得成功: {len(results)} 件")
         return True
     else:
         logger.log(f"✗ {product}データ取得失敗: {error}", level="ERROR")
         return False
 
 
-def process_hdf5_files(lat, lon, logger):
+def _process_or_raise(hdf5_file, lat, lon, buffer_km, dataset):
+    """process_file の "error" 結果を例外に変換（リトライ判定用）"""
+    stats = process_file(hdf5_file, lat, lon, buffer_km, dataset, create_viz=False)
+    if "error" in stats:
+        raise RuntimeError(stats["error"])
+    return stats
+
+
+def guess_dataset(hdf5_file):
+    """ファイル名からデータセット名を推測"""
+    return "LST" if "LST" in Path(hdf5_file).name else "NDVI"
+
+
+def processing_params(lat, lon, buffer_km):
+    """台帳のキーに含める処理パラメータ"""
+    return {"lat": lat, "lon": lon, "buffer_km": buffer_km}
+
+
+def process_hdf5_file(hdf5_file, lat, lon, buffer_km=5.0, retry=2):
+    """
+    HDF5ファイルを1件処理（プロセスプールのワーカーからも呼び出される）
+
+    Args:
+        hdf5_file: HDF5ファイルパス
+        lat: 緯度
+        lon: 経度
+        buffer_km: バッファ距離（km）
+        retry: リトライ回数
+
+    Returns:
+        (success, stats, error)
+    """
+    dataset = guess_dataset(hdf5_file)
+
+    return run_with_retry(
+        _process_or_raise, hdf5_file, lat, lon, buffer_km, dataset, retry=retry
+    )
+
+
+def process_hdf5_files(lat, lon, logger, buffer_km=5.0, workers=1, manifest=None, force=False):
     """
     HDF5ファイルを処理
 
@@ -152,112 +192,172 @@ def process_hdf5_files(lat, lon, logger):
         lat: 緯度
         lon: 経度
         logger: ロガー
+        buffer_km: バッファ距離（km）
+        workers: 並列プロセス数（1の場合は逐次処理）
+        manifest: ProcessingManifest（指定時は処理済みのファイルをスキップ）
+        force: 台帳に関わらず全ファイルを処理
 
     Returns:
         (processed_files, stats_list)
     """
     logger.log("=== HDF5ファイル処理開始 ===")
 
-    hdf5_files = list(DATA_DIR.glob("*.h5"))
+    # 日付順（ファイル名順）に処理し、結果もこの順序で返す
+    hdf5_files = sorted(DATA_DIR.glob("*.h5"))
 
     if not hdf5_files:
         logger.log("⚠️  処理するHDF5ファイルが見つかりません", level="WARNING")
         return [], []
 
+    params = processing_params(lat, lon, buffer_km)
+
+    if manifest is not None and not force:
+        pending = [f for f in hdf5_files if not manifest.is_current(f, guess_dataset(f), params)]
+        skipped = len(hdf5_files) - len(pending)
+        if skipped:
+            logger.log(f"処理済みのためスキップ: {skipped} ファイル")
+        hdf5_files = pending
+
     processed = []
     stats_list = []
 
-    for hdf5_file in hdf5_files:
-        logger.log(f"処理中: {hdf5_file.name}")
+    def collect(hdf5_file, outcome):
+        success, stats, error = outcome
+        if success:
+            processed.append(hdf5_file)
+            stats_list.append(stats)
+            if manifest is not None:
+                manifest.record_processed(hdf5_file, guess_dataset(hdf5_file), params, stats)
+            logger.log(f"✓ {hdf5_file.name} 処理成功")
+        else:
+            logger.log(f"✗ {hdf5_file.name} 処理失敗: {error}", level="ERROR")
 
-        # データセット名を推測
-        dataset = "LST" if "LST" in hdf5_file.name else "NDVI"
+    if workers > 1 and len(hdf5_files) > 1:
+        logger.log(f"並列処理: {workers} プロセス")
+
+        # 結果は一時ファイルを介さずワーカーからメモリで受け取る
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for hdf5_file in hdf5_files:
+                logger.log(f"処理中: {hdf5_file.name}")
+                futures.append(executor.submit(process_hdf5_file, hdf5_file, lat, lon, buffer_km))
+
+            for hdf5_file, future in zip(hdf5_files, futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    # ワーカープロセス自体の異常終了など
+                    outcome = (False, None, str(e))
+                collect(hdf5_file, outcome)
+    else:
+        for hdf5_file in hdf5_files:
+            logger.log(f"処理中: {hdf5_file.name}")
+            collect(hdf5_file, process_hdf5_file(hdf5_file, lat, lon, buffer_km))
 
-        # 一時ファイルにJSON出力
-        temp_output = BASE_DIR / "temp_stats.json"
+    logger.log(f"処理完了: {len(processed)}/{len(hdf5_files)} ファイル")
 
-        command = [
-            "python", "scripts/geotiff_processor.py",
-            str(hdf5_file),
-            "--lat", str(lat),
-            "--lon", str(lon),
-            "--dataset", dataset,
-            "--output", str(temp_output)
-        ]
+    return processed, stats_list
 
-        success, output, error = run_command_with_retry(command, retry=2)
 
-        if success and temp_output.exists():
-            try:
-                # JSONファイルから読み込み
-                with open(temp_output, 'r', encoding='utf-8') as f:
-                    stats = json.load(f)
+def stats_to_observation(stats):
+    """
+    統計データをNeo4jの観測行に変換
 
-                processed.append(hdf5_file)
-                stats_list.append(stats)
-                logger.log(f"✓ {hdf5_file.name} 処理成功")
+    Args:
+        stats: process_file の結果辞書
 
-                # 一時ファイル削除
-                temp_output.unlink()
+    Returns:
+        observation_row の行辞書
+    """
+    # グラニュールの観測日（台帳に観測日を持たない以前の結果はファイルから求める）
+    # 観測日ごとに別の観測として保存するため、処理日では代用しない
+    date = stats.get('observation_date') or observation_date(stats.get('file', ''))
+    if date is None:
+        raise ValueError(f"観測日を特定できません: {stats.get('file')}")
+
+    # 統計値から温度・NDVIを抽出
+    stat_values = stats.get('statistics', {})
+
+    # (圃場, 日付, プロダクト) ごとに1観測として保存する
+    product = guess_dataset(stats.get('file', ''))
+
+    # LSTの場合はKelvinからCelsiusに変換
+    # 他方のプロダクトの値は持たせない（LSTの平均がNDVI平均に混ざらないように）
+    if product == 'LST':
+        temp_k = stat_values.get('mean', 291.5)
+        temperature = temp_k - 273.15
+        ndvi_avg = None
+    else:
+        temperature = None
+        ndvi_avg = stat_values.get('mean', 0.7)
 
-            except json.JSONDecodeError as e:
-                logger.log(f"✗ JSON解析失敗: {hdf5_file.name} - {e}", level="ERROR")
-        else:
-            logger.log(f"✗ {hdf5_file.name} 処理失敗: {error}", level="ERROR")
+    humidity = 65.0  # デフォルト値（実データがない場合）
 
-    logger.log(f"処理完了: {len(processed)}/{len(hdf5_files)} ファイル")
+    # ピクセル分布（スケッチ）も保存し、期間集計でマージできるようにする
+    ndvi_stats = lst_stats = None
+    if stat_values.get('valid_pixels'):
+        if product == 'LST':
+            lst_stats = stat_values
+        else:
+            ndvi_stats = stat_values
 
-    return processed, stats_list
+    return observation_row(date, temperature, humidity, ndvi_avg, ndvi_stats=ndvi_stats, product=product,
+                           lst_stats=lst_stats)
 
 
-def save_to_neo4j(stats, logger):
+def save_to_neo4j(stats_list, logger, spool):
     """
-    統計データをNeo4jに保存
+    統計データをスプール経由でNeo4jに保存
+
+    観測はまずローカルのスプールに追記し（この時点で保存完了とみなす）、
+    その後スプール全体をバッチ単位でNeo4jへ書き出す。Neo4jに接続できない
+    場合はスプールに残し、次回の実行または neo4j_spool.py --drain で書き出す。
 
     Args:
-        stats: 統計データ辞書
+        stats_list: 統計データ辞書のリスト
         logger: ロガー
+        spool: ObservationSpool
 
     Returns:
-        成功したかどうか
+        スプールに追記した統計データのインデックスのリスト
+        （観測日を特定できないものは除く。追記に失敗した場合は空リスト）
     """
-    try:
-        # ファイルパスから日付を抽出（簡易実装）
-        date = datetime.now().strftime('%Y-%m-%d')
-
-        # 統計値から温度・NDVIを抽出
-        stat_values = stats.get('statistics', {})
+    rows, appended = [], []
+    for i, stats in enumerate(stats_list):
+        try:
+            rows.append(stats_to_observation(stats))
+            appended.append(i)
+        except ValueError as e:
+            logger.log(f"✗ {e}", level="ERROR")
 
-        # LSTの場合はKelvinからCelsiusに変換
-        if 'LST' in stats.get('file', ''):
-            temp_k = stat_values.get('mean', 291.5)
-            temperature = temp_k - 273.15
-        else:
-            temperature = 20.0  # デフォルト値
+    try:
+        spool.append(rows)
+        logger.log(f"✓ スプールに追記: {len(rows)} 件")
 
-        ndvi_avg = stat_values.get('mean', 0.7)
-        humidity = 65.0  # デフォルト値（実データがない場合）
+    except Exception as e:
+        logger.log(f"✗ スプール追記中に例外: {e}", level="ERROR")
+        return []
 
-        command = [
-            "python", "scripts/save_weather.py",
-            "--date", date,
-            "--temperature", str(temperature),
-            "--humidity", str(humidity),
-            "--ndvi-avg", str(ndvi_avg)
-        ]
+    backlog = spool.count()
+    if not backlog:
+        return appended
 
-        success, output, error = run_command_with_retry(command, retry=2)
+    # 1つのドライバで溜まった分をまとめて書き出す
+    try:
+        with SatelliteDataWriter() as writer:
+            if writer.is_available():
+                success, written, error = run_with_retry(spool.drain, writer, retry=2)
+            else:
+                success, error = False, "Neo4jに接続できません"
+    except Exception as e:
+        success, error = False, str(e)
 
-        if success:
-            logger.log(f"✓ Neo4j保存成功: {date}")
-            return True
-        else:
-            logger.log(f"✗ Neo4j保存失敗: {error}", level="ERROR")
-            return False
+    if success:
+        logger.log(f"✓ Neo4j保存成功: {written} 件")
+    else:
+        logger.log(f"⚠️  Neo4j保存失敗、{spool.count()} 件をスプールに保持: {error}", level="WARNING")
 
-    except Exception as e:
-        logger.log(f"✗ Neo4j保存中に例外: {e}", level="ERROR")
-        return False
+    return appended
 
 
 def generate_summary_report(processed_files, stats_list, start_time, logger):
@@ -278,6 +378,8 @@ def generate_summary_report(processed_files, stats_list, start_time, logger):
     # NDVI分析
     ndvi_values = []
     lst_values = []
+    ndvi_stats = []
+    lst_stats = []
 
     for stats in stats_list:
         stat_values = stats.get('statistics', {})
@@ -286,9 +388,15 @@ def generate_summary_report(processed_files, stats_list, start_time, logger):
         if mean:
             if 'NDVI' in stats.get('file', ''):
                 ndvi_values.append(mean)
+                ndvi_stats.append(stat_values)
             elif 'LST' in stats.get('file', ''):
                 # Kelvin to Celsius
                 lst_values.append(mean - 273.15)
+                lst_stats.append(stat_values)
+
+    # ファイルごとの平均の平均ではなく、ピクセル単位でマージした分布から集計
+    ndvi_merged = merge_statistics(ndvi_stats)
+    lst_merged = merge_statistics(lst_stats)
 
     # NDVI傾向分析（簡易）
     ndvi_trend = "stable"
@@ -311,13 +419,22 @@ def generate_summary_report(processed_files, stats_list, start_time, logger):
         },
         "ndvi_analysis": {
             "count": len(ndvi_values),
-            "mean": sum(ndvi_values) / len(ndvi_values) if ndvi_values else 0,
+            "pixel_count": ndvi_merged["valid_pixels"],
+            "mean": ndvi_merged.get("mean", 0),
+            "std": ndvi_merged.get("std", 0),
+            "percentiles": ndvi_merged.get("percentiles", {}),
             "trend": ndvi_trend,
             "change_rate": ndvi_change
         },
         "lst_analysis": {
             "count": len(lst_values),
-            "mean_celsius": sum(lst_values) / len(lst_values) if lst_values else 0,
+            "pixel_count": lst_merged["valid_pixels"],
+            "mean_celsius": lst_merged["mean"] - 273.15 if lst_values else 0,
+            "std": lst_merged.get("std", 0),
+            "percentiles_celsius": {
+                p: (v - 273.15 if v is not None else None)
+                for p, v in lst_merged.get("percentiles", {}).items()
+            },
             "min": min(lst_values) if lst_values else 0,
             "max": max(lst_values) if lst_values else 0
         }
@@ -340,6 +457,17 @@ def main():
     parser.add_argument("--days", type=int, default=7, help="過去何日分")
     parser.add_argument("--retry", type=int, default=3, help="リトライ回数")
     parser.add_argument("--mock", action="store_true", help="モックモード")
+    parser.add_argument("--buffer", type=float, default=5.0, help="バッファ距離（km）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HDF5処理の並列プロセス数（デフォルト: 1）")
+    parser.add_argument("--force", action="store_true",
+                        help="処理済みのグラニュールも再処理する")
+    parser.add_argument("--ingest", action="store_true",
+                        help="ダウンロードしたグラニュールを登録済みの圃場周辺に切り出して保存する")
+    parser.add_argument("--margin-km", type=float, default=INGEST_MARGIN_KM,
+                        help=f"切り出し時に圃場の周囲に含めるマージン（km、デフォルト: {INGEST_MARGIN_KM:g}）")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="切り出し後に元のグラニュールを削除する（--ingest と併用）")
 
     args = parser.parse_args()
 
@@ -349,6 +477,7 @@ def main():
     error_file = LOGS_DIR / f"errors_{date_str}.log"
 
     logger = WorkflowLogger(log_file, error_file)
+    manifest = ProcessingManifest()
     start_time = datetime.now()
 
     logger.log("=" * 70)
@@ -360,23 +489,34 @@ def main():
 
     try:
         # 1. データ取得
+        ingest_options = {
+            "ingest": args.ingest, "margin_km": args.margin_km, "delete_source": args.delete_source
+        }
         success_lst = fetch_satellite_data(
-            args.lat, args.lon, args.days, "LST", logger, args.mock
+            args.lat, args.lon, args.days, "LST", logger, args.mock, **ingest_options
         )
         success_ndvi = fetch_satellite_data(
-            args.lat, args.lon, args.days, "NDVI", logger, args.mock
+            args.lat, args.lon, args.days, "NDVI", logger, args.mock, **ingest_options
         )
 
         # 2. データ処理
-        processed_files, stats_list = process_hdf5_files(args.lat, args.lon, logger)
+        processed_files, stats_list = process_hdf5_files(
+            args.lat, args.lon, logger, buffer_km=args.buffer, workers=args.workers,
+            manifest=manifest, force=args.force
+        )
+
+        # 3. Neo4j保存（スプールに追記してからまとめて書き出す）
+        # 今回処理したものに加え、前回スプールに追記できなかったグラニュールも対象
+        params = processing_params(args.lat, args.lon, args.buffer)
+        pending_saves = manifest.pending_saves(params)
 
-        # 3. Neo4j保存
-        saved_count = 0
-        for stats in stats_list:
-            if save_to_neo4j(stats, logger):
-                saved_count += 1
+        with ObservationSpool() as spool:
+            appended = save_to_neo4j([stats for _, _, stats in pending_saves], logger, spool)
+            for i in appended:
+                path, dataset, _ = pending_saves[i]
+                manifest.mark_saved(path, dataset, params)
 
-        logger.log(f"Neo4j保存: {saved_count}/{len(stats_list)} レコード")
+            logger.log(f"Neo4j保存待ち: {spool.count()} レコード")
 
         # 4. サマリーレポート生成
         report = generate_summary_report(processed_files, stats_list, start_time, logger)
@@ -397,6 +537,7 @@ def main():
         raise
 
     finally:
+        manifest.close()
         logger.close()
 
 
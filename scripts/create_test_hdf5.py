@@ -10,6 +10,8 @@ import numpy as np
 import sys
 from pathlib import Path
 
+from raster_convert import create_compressed_dataset, write_overviews
+
 # Windows環境でのUTF-8出力設定
 if sys.platform == 'win32':
     import codecs
@@ -33,14 +35,14 @@ def create_test_hdf5(output_path, dataset_name="LST", size=100):
         # LSTデータ（地表面温度、Kelvin）
         if dataset_name == "LST":
             lst = np.random.normal(291.5, 3.0, (size, size))
-            dset = image_data.create_dataset('LST', data=lst)
+            dset = create_compressed_dataset(image_data, 'LST', lst)
             dset.attrs['units'] = 'Kelvin'
             dset.attrs['description'] = 'Land Surface Temperature'
 
         # NDVIデータ
         elif dataset_name == "NDVI":
             ndvi = np.random.uniform(0.6, 0.85, (size, size))
-            dset = image_data.create_dataset('NDVI', data=ndvi)
+            dset = create_compressed_dataset(image_data, 'NDVI', ndvi)
             dset.attrs['units'] = 'dimensionless'
             dset.attrs['description'] = 'Normalized Difference Vegetation Index'
 
@@ -53,8 +55,11 @@ def create_test_hdf5(output_path, dataset_name="LST", size=100):
 
         lat_grid, lon_grid = np.meshgrid(lat, lon)
 
-        geometry_data.create_dataset('Latitude', data=lat_grid)
-        geometry_data.create_dataset('Longitude', data=lon_grid)
+        create_compressed_dataset(geometry_data, 'Latitude', lat_grid)
+        create_compressed_dataset(geometry_data, 'Longitude', lon_grid)
+
+        # 縮小読み込み用のオーバービュー
+        write_overviews(f, f'Image_data/{dataset_name}')
 
         # メタデータ
         f.attrs['product'] = 'GCOM-C/SGLI'
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dashboard Queries
+APIサーバーのCypherクエリとレスポンス整形
+
+個別エンドポイント（/api/summary など）と、ダッシュボード用の
+まとめ取得（/api/dashboard）で同じ整形処理を共有する。
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+
+from stats_engine import merge_statistics
+
+# ページ分割時の1ページあたりの最大件数
+MAX_PAGE_SIZE = 1000
+
+# 今月の作業時間（モックデータ - 実際のWorkLogノードがあれば置き換え）
+MONTHLY_WORK_HOURS = 120
+
+# 総圃場数と総面積
+FARM_TOTALS_QUERY = """
+MATCH (f:Farm)
+RETURN COUNT(f) AS totalFields,
+       SUM(f.area) AS totalArea
+"""
+
+# 平均NDVI（直近7日間、日次集計ノードから）
+AVG_NDVI_QUERY = """
+MATCH (a:ObservationAggregate {period: 'day'})
+WHERE a.start >= date() - duration('P7D')
+WITH sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+RETURN CASE WHEN n > 0 THEN total / n END AS avgNDVI
+"""
+
+# 日次集計ノードを読むため、観測数ではなく日数に比例
+NDVI_TREND_QUERY = """
+MATCH (a:ObservationAggregate {period: 'day'})
+WHERE a.start >= date() - duration('P' + $days + 'D')
+  AND a.ndvi_count > 0
+WITH a.start AS date, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+RETURN date, total / n AS avgNdvi
+ORDER BY date ASC
+"""
+
+# キーセットページ分割: 日付カーソル（$after）より後の日を $limit 件
+# 先に (period, start) のレンジインデックスの順にカーソル位置から $limit 日分の
+# 日付だけを読み、その日の集計ノードだけを合計する（残りの全日数を集計しない）
+NDVI_TREND_PAGE_QUERY = """
+MATCH (d:ObservationAggregate {period: 'day'})
+WHERE d.start >= date() - duration('P' + $days + 'D')
+  AND ($after IS NULL OR d.start > date($after))
+  AND d.ndvi_count > 0
+WITH DISTINCT d.start AS date
+ORDER BY date ASC
+LIMIT $limit
+MATCH (a:ObservationAggregate {period: 'day', start: date})
+WHERE a.ndvi_count > 0
+WITH date, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+RETURN date, total / n AS avgNdvi
+ORDER BY date ASC
+"""
+
+# 実際のWorkLogノードがある場合はそちらを使用
+# ここでは圃場名のみ取得し、作業時間はモックデータを割り当てる
+WORK_HOURS_QUERY = """
+MATCH (f:Farm)
+RETURN f.name AS farmName
+ORDER BY f.name
+LIMIT 5
+"""
+
+FIELDS_QUERY = """
+MATCH (f:Farm)
+OPTIONAL MATCH (f)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'day'})
+WHERE a.start >= date() - duration('P7D')
+WITH f, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+RETURN
+    id(f) AS id,
+    f.name AS name,
+    f.latitude AS lat,
+    f.longitude AS lon,
+    f.area AS area,
+    CASE WHEN n > 0 THEN total / n END AS ndvi
+ORDER BY f.name
+"""
+
+# キーセットページ分割: (圃場名, id) カーソルより後の圃場を $limit 件
+FIELDS_PAGE_QUERY = """
+MATCH (f:Farm)
+WHERE $afterName IS NULL
+   OR f.name > $afterName
+   OR (f.name = $afterName AND id(f) > $afterId)
+WITH f
+ORDER BY f.name, id(f)
+LIMIT $limit
+OPTIONAL MATCH (f)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'day'})
+WHERE a.start >= date() - duration('P7D')
+WITH f, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+RETURN
+    id(f) AS id,
+    f.name AS name,
+    f.latitude AS lat,
+    f.longitude AS lon,
+    f.area AS area,
+    CASE WHEN n > 0 THEN total / n END AS ndvi
+ORDER BY name, id
+"""
+
+NDVI_DISTRIBUTION_QUERY = """
+MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
+WHERE s.date >= date() - duration('P' + $days + 'D')
+  AND s.ndvi_sketch IS NOT NULL
+RETURN s.pixel_count AS count,
+       s.ndvi_avg AS mean,
+       s.ndvi_std AS std,
+       s.ndvi_min AS min,
+       s.ndvi_max AS max,
+       s.ndvi_sketch AS sketch
+"""
+
+# ダッシュボードの4パネル分を1クエリ（1往復）で取得
+# 各サブクエリは集計またはcollectで必ず1行を返す
+DASHBOARD_QUERY = """
+CALL {
+    MATCH (f:Farm)
+    RETURN COUNT(f) AS totalFields,
+           SUM(f.area) AS totalArea
+}
+CALL {
+    MATCH (a:ObservationAggregate {period: 'day'})
+    WHERE a.start >= date() - duration('P7D')
+    WITH sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+    RETURN CASE WHEN n > 0 THEN total / n END AS avgNDVI
+}
+CALL {
+    MATCH (a:ObservationAggregate {period: 'day'})
+    WHERE a.start >= date() - duration('P' + $days + 'D')
+      AND a.ndvi_count > 0
+    WITH a.start AS date, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+    ORDER BY date ASC
+    RETURN collect({date: date, avgNdvi: total / n}) AS trend
+}
+CALL {
+    MATCH (f:Farm)
+    WITH f
+    ORDER BY f.name
+    LIMIT 5
+    RETURN collect(f.name) AS farmNames
+}
+CALL {
+    MATCH (f:Farm)
+    OPTIONAL MATCH (f)-[:HAS_AGGREGATE]->(a:ObservationAggregate {period: 'day'})
+    WHERE a.start >= date() - duration('P7D')
+    WITH f, sum(a.ndvi_sum) AS total, sum(a.ndvi_count) AS n
+    ORDER BY f.name
+    RETURN collect({
+        id: id(f),
+        name: f.name,
+        lat: f.latitude,
+        lon: f.longitude,
+        area: f.area,
+        ndvi: CASE WHEN n > 0 THEN total / n END
+    }) AS fields
+}
+RETURN totalFields, totalArea, avgNDVI, trend, farmNames, fields
+"""
+
+
+def format_summary(totals, avg_ndvi):
+    """
+    サマリー情報を整形
+
+    Args:
+        totals: totalFields・totalArea を持つレコード
+        avg_ndvi: 直近7日間の平均NDVI（データなしはNone）
+    """
+    return {
+        'totalFields': totals['totalFields'] or 0,
+        'totalArea': totals['totalArea'] or 0,
+        'monthlyWorkHours': MONTHLY_WORK_HOURS,
+        'avgNDVI': round(avg_ndvi or 0, 4)
+    }
+
+
+def format_trend_row(row):
+    """NDVI時系列の1行を整形"""
+    # Neo4j Dateオブジェクトを文字列に変換
+    date_obj = row['date']
+    if hasattr(date_obj, 'to_native'):
+        date_str = date_obj.to_native().strftime('%m/%d')
+    else:
+        date_str = str(date_obj)
+
+    return {
+        'date': date_str,
+        'ndvi': round(row['avgNdvi'], 4)
+    }
+
+
+def mock_ndvi_trend(days):
+    """NDVI時系列のモックデータ（データがない場合）"""
+    today = datetime.now()
+    return [
+        {
+            'date': (today - timedelta(days=i)).strftime('%m/%d'),
+            'ndvi': round(0.70 + (i * 0.01), 2)
+        }
+        for i in range(days-1, -1, -1)
+    ]
+
+
+def format_ndvi_trend(rows, days):
+    """
+    NDVI時系列を整形（データがない場合はモックデータ）
+
+    Args:
+        rows: date・avgNdvi を持つレコードのイテラブル
+        days: 取得日数
+    """
+    data = [format_trend_row(row) for row in rows]
+
+    # データがない場合はモックデータを返す
+    if not data:
+        data = mock_ndvi_trend(days)
+
+    return data
+
+
+def format_work_hours(farm_names):
+    """
+    圃場別作業時間を整形（作業時間はモックデータ）
+
+    Args:
+        farm_names: 圃場名のリスト
+    """
+    # 実データがない場合のモックデータ
+    if not farm_names:
+        farm_names = ['圃場A', '圃場B', '圃場C', '圃場D', '圃場E']
+
+    # 各圃場にモック作業時間を割り当て
+    base_hours = 35
+    return [
+        {'field': farm_name, 'hours': base_hours - (i * 5)}
+        for i, farm_name in enumerate(farm_names)
+    ]
+
+
+def ndvi_status(ndvi):
+    """NDVI値から植生状態を判定"""
+    if ndvi is not None and ndvi > 0.7:
+        return 'healthy'
+    if ndvi is not None and ndvi > 0.5:
+        return 'moderate'
+    if ndvi is not None and ndvi > 0.3:
+        return 'poor'
+    return 'very_poor'
+
+
+def format_field(row):
+    """圃場の1行を整形"""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'lat': row['lat'],
+        'lon': row['lon'],
+        'area': row['area'],
+        'ndvi': round(row['ndvi'] or 0, 4),
+        'status': ndvi_status(row['ndvi'])
+    }
+
+
+def format_fields(rows):
+    """
+    圃場の位置情報とNDVI状態を整形
+
+    Args:
+        rows: id・name・lat・lon・area・ndvi を持つレコードのイテラブル
+    """
+    return [format_field(row) for row in rows]
+
+
+def encode_cursor(values):
+    """カーソル値のリストを不透明な文字列に変換"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, names):
+    """
+    カーソル文字列をクエリパラメータに変換
+
+    Args:
+        cursor: encode_cursor の文字列（None・空文字は先頭から）
+        names: カーソル値に対応するパラメータ名
+
+    Returns:
+        {name: value, ...}
+
+    Raises:
+        ValueError: 不正なカーソル
+    """
+    if not cursor:
+        return dict.fromkeys(names)
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"不正なカーソルです: {cursor}") from e
+
+    if not isinstance(values, list) or len(values) != len(names):
+        raise ValueError(f"不正なカーソルです: {cursor}")
+
+    return dict(zip(names, values))
+
+
+def parse_limit(value):
+    """
+    ページサイズを検証（省略時はNone = ページ分割なし）
+
+    Raises:
+        ValueError: 1〜MAX_PAGE_SIZE の整数でない
+    """
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"limit は整数で指定してください: {value}") from None
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit は1〜{MAX_PAGE_SIZE}で指定してください: {limit}")
+    return limit
+
+
+def trend_cursor(row):
+    """NDVI時系列の行からカーソルを作成（日付）"""
+    date_obj = row['date']
+    return encode_cursor([date_obj.iso_format() if hasattr(date_obj, 'iso_format') else str(date_obj)])
+
+
+def field_cursor(row):
+    """圃場の行からカーソルを作成（圃場名, id）"""
+    return encode_cursor([row['name'], row['id']])
+
+
+# ページ分割するエンドポイントの設定
+# (ページクエリ, カーソルのパラメータ名, 行の整形, カーソル作成)
+TREND_PAGING = (NDVI_TREND_PAGE_QUERY, ('after',), format_trend_row, trend_cursor)
+FIELDS_PAGING = (FIELDS_PAGE_QUERY, ('afterName', 'afterId'), format_field, field_cursor)
+
+
+def paginate(rows, limit, format_row, cursor_of):
+    """
+    limit+1 件まで読んだ結果からページを作成
+
+    Args:
+        rows: ページクエリ（LIMIT limit+1）の結果
+        limit: ページサイズ
+        format_row: 行の整形関数
+        cursor_of: 行からカーソルを作る関数
+
+    Returns:
+        {"items": [...], "nextCursor": str | None}
+    """
+    items = []
+    last_row = None
+    next_cursor = None
+
+    for row in rows:
+        if len(items) == limit:
+            next_cursor = cursor_of(last_row)
+            break
+        items.append(format_row(row))
+        last_row = row
+
+    return {'items': items, 'nextCursor': next_cursor}
+
+
+def format_ndvi_distribution(rows):
+    """
+    観測ごとのスケッチをマージしてNDVI分布を整形
+
+    Args:
+        rows: count・mean・std・min・max・sketch を持つレコードのイテラブル
+    """
+    stats_list = [
+        {
+            'valid_pixels': row['count'],
+            'mean': row['mean'],
+            'std': row['std'],
+            'min': row['min'],
+            'max': row['max'],
+            'sketch': json.loads(row['sketch'])
+        }
+        for row in rows
+    ]
+
+    merged = merge_statistics(stats_list, percentiles=(10, 25, 50, 75, 90))
+
+    return {
+        'observations': len(stats_list),
+        'pixelCount': merged['valid_pixels'],
+        'mean': merged.get('mean'),
+        'std': merged.get('std'),
+        'min': merged.get('min'),
+        'max': merged.get('max'),
+        'percentiles': merged.get('percentiles', {})
+    }
+
+
+# ---------------------------------------------------------------------------
+# 読み取り処理（同期・非同期ドライバで共有）
+# ---------------------------------------------------------------------------
+#
+# 読み取り関数はクエリを yield して結果を受け取るジェネレータとして書き、
+# 同期ドライバ（run_plan）と非同期ドライバ（run_plan_async）のどちらでも実行する。
+# read_transaction で包んだ関数は同期のトランザクション関数として
+# session.execute_read(read_dashboard, days) のようにそのまま使える。
+
+def single(query, **params):
+    """1行（なければNone）を受け取るクエリ"""
+    return query, params, True
+
+
+def records(query, **params):
+    """全行のリストを受け取るクエリ"""
+    return query, params, False
+
+
+def run_plan(tx, plan):
+    """
+    読み取り関数を同期ドライバで実行
+
+    Args:
+        tx: トランザクションまたはセッション（run を持つもの）
+        plan: 読み取り関数のジェネレータ
+
+    Returns:
+        読み取り関数の戻り値
+    """
+    value = None
+    while True:
+        try:
+            query, params, one = plan.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        result = tx.run(query, **params)
+        value = result.single() if one else list(result)
+
+
+async def run_plan_async(tx, work, *args):
+    """
+    読み取り関数を非同期ドライバで実行する読み取りトランザクション関数
+
+    AsyncSession.execute_read は一時的なエラーで関数を再実行するため、
+    読み取り関数は呼び出しごとに作り直す。
+
+    Args:
+        tx: 非同期トランザクション
+        work: read_transaction で包んだ読み取り関数
+        *args: 読み取り関数の引数
+
+    Returns:
+        読み取り関数の戻り値
+    """
+    plan = work.plan(*args)
+    value = None
+    while True:
+        try:
+            query, params, one = plan.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        result = await tx.run(query, **params)
+        value = await result.single() if one else [row async for row in result]
+
+
+def read_transaction(plan_function):
+    """
+    読み取り関数を同期のトランザクション関数 work(tx, *args) に変換
+
+    元のジェネレータ関数は work.plan に残し、非同期ドライバでは
+    run_plan_async(tx, work, *args) で実行する。
+    """
+    @wraps(plan_function)
+    def work(tx, *args):
+        return run_plan(tx, plan_function(*args))
+
+    work.plan = plan_function
+    return work
+
+
+@read_transaction
+def read_summary():
+    """サマリー情報（/api/summary）"""
+    totals = yield single(FARM_TOTALS_QUERY)
+    ndvi = yield single(AVG_NDVI_QUERY)
+    return format_summary(totals, ndvi['avgNDVI'])
+
+
+@read_transaction
+def read_ndvi_trend(days):
+    """NDVI時系列（/api/ndvi-trend、データがない場合はモックデータ）"""
+    rows = yield records(NDVI_TREND_QUERY, days=days)
+    return format_ndvi_trend(rows, days)
+
+
+@read_transaction
+def read_ndvi_distribution(days):
+    """期間内のNDVI分布（/api/ndvi-distribution）"""
+    rows = yield records(NDVI_DISTRIBUTION_QUERY, days=days)
+    return format_ndvi_distribution(rows)
+
+
+@read_transaction
+def read_work_hours():
+    """圃場別作業時間（/api/work-hours）"""
+    rows = yield records(WORK_HOURS_QUERY)
+    return format_work_hours([row['farmName'] for row in rows])
+
+
+@read_transaction
+def read_fields():
+    """圃場の位置情報とNDVI状態（/api/fields）"""
+    rows = yield records(FIELDS_QUERY)
+    return format_fields(rows)
+
+
+@read_transaction
+def read_page(paging, limit, params):
+    """
+    キーセットページ分割の1ページ
+
+    Args:
+        paging: TREND_PAGING / FIELDS_PAGING
+        limit: ページサイズ
+        params: ページクエリのパラメータ（limit は limit+1、カーソルを含む）
+    """
+    query, _, format_row, cursor_of = paging
+    rows = yield records(query, **params)
+    return paginate(rows, limit, format_row, cursor_of)
+
+
+@read_transaction
+def read_dashboard(days):
+    """
+    ダッシュボード全体を1クエリで取得する読み取り関数
+
+    Args:
+        days: NDVI時系列の取得日数
+
+    Returns:
+        {"summary": ..., "ndviTrend": ..., "workHours": ..., "fields": ...}
+    """
+    record = yield single(DASHBOARD_QUERY, days=days)
+
+    return {
+        'summary': format_summary(record, record['avgNDVI']),
+        'ndviTrend': format_ndvi_trend(record['trend'], days),
+        'workHours': format_work_hours(record['farmNames']),
+        'fields': format_fields(record['fields'])
+    }
+
+
+@read_transaction
+def read_health():
+    """Neo4jへの接続確認"""
+    yield single("RETURN 1")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data Version
+Neo4jのデータ更新を他プロセスへ知らせるバージョンカウンタ
+
+書き込み側（save_weather.py の SatelliteDataWriter）が保存のたびに
+data/metadata/data_version.json のバージョンを上げ、APIサーバーは
+バージョンが変わったらレスポンスキャッシュを破棄する。
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# バージョンの更新（読み込み→加算→置き換え）をプロセス間で排他する
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+METADATA_DIR = Path(__file__).parent.parent / "data" / "metadata"
+VERSION_PATH = METADATA_DIR / "data_version.json"
+
+# ファイルが置き換えられない限り再読み込みしない
+_cache = {"path": None, "stamp": None, "version": 0}
+
+
+def read_version(path=None):
+    """
+    現在のデータバージョンを取得
+
+    ファイルの置き換え（inode・更新時刻）で変更を検知するため、未変更時はstat 1回で返る。
+
+    Args:
+        path: バージョンファイルのパス（省略時は VERSION_PATH）
+
+    Returns:
+        int: バージョン（ファイルがない場合は0）
+    """
+    path = Path(path or VERSION_PATH)
+
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return 0
+
+    stamp = (st.st_ino, st.st_mtime_ns)
+    if _cache["path"] == path and _cache["stamp"] == stamp:
+        return _cache["version"]
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            version = int(json.load(f).get("version", 0))
+    except (OSError, ValueError) as e:
+        print(f"⚠️  データバージョンを読み込めません: {e}", file=sys.stderr)
+        return _cache["version"]
+
+    _cache.update(path=path, stamp=stamp, version=version)
+    return version
+
+
+@contextmanager
+def _exclusive_lock(lock_path):
+    """ロックファイルの排他ロックを取得（他プロセスが保持している間は待つ）"""
+    with open(lock_path, 'a+b') as f:
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def bump_version(path=None):
+    """
+    データバージョンを1つ上げる
+
+    Args:
+        path: バージョンファイルのパス（省略時は VERSION_PATH）
+
+    Returns:
+        int: 新しいバージョン
+    """
+    path = Path(path or VERSION_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # ワークフローと neo4j_spool.py --watch が同時に書き出しても、
+    # 同じ値を読んで同じ値を書く（更新が1回分失われる）ことがないよう排他する
+    with _exclusive_lock(path.with_name(f"{path.name}.lock")):
+        # 他プロセスが直前に上げた値を確実に読むため、キャッシュを使わない
+        _cache["stamp"] = None
+        version = read_version(path) + 1
+
+        # 読み込み側が書き込み途中のファイルを読まないよう一時ファイル経由で置き換える
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": version, "updated_at": datetime.now().isoformat()}, f)
+        tmp_path.replace(path)
+
+    return version
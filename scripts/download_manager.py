@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download Manager
+グラニュールの並列・再開可能ダウンロード
+
+転送中のデータは <ファイル名>.part に書き込み、接続が切れた場合は
+HTTP Rangeリクエストで続きから再開する。完了後にサイズ（と指定があれば
+チェックサム）を検証してから最終ファイル名に置き換えるため、
+data/geotiff/ に途中までのファイルが置かれることはない。
+
+使い方:
+    # 4並列でダウンロード
+    python scripts/download_manager.py URL [URL ...] --output-dir data/geotiff --workers 4
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "geotiff"
+
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 5
+# 接続断で失われるのは書き込み前の1チャンク分まで
+CHUNK_SIZE = 64 * 1024
+# (接続, 読み込み) タイムアウト（秒）
+TIMEOUT = (10, 60)
+
+
+class DownloadError(Exception):
+    """ダウンロード・検証の失敗"""
+
+
+class IncompleteTransfer(Exception):
+    """転送が途中で終わった（再開で続きを取得する）"""
+
+
+def part_path(dest):
+    """転送中ファイルのパス"""
+    dest = Path(dest)
+    return dest.with_name(dest.name + '.part')
+
+
+def parse_content_range(value):
+    """
+    Content-Range ヘッダーを解析
+
+    Returns:
+        (開始位置, 全体サイズ)（不明な値はNone）
+    """
+    if not value or not value.startswith('bytes '):
+        return None, None
+
+    span, _, total = value[len('bytes '):].partition('/')
+    start = int(span.split('-')[0]) if span != '*' else None
+    return start, (int(total) if total.isdigit() else None)
+
+
+def file_checksum(path, algorithm):
+    """ファイルのハッシュ値（16進）"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_file(path, expected_size=None, checksum=None):
+    """
+    ダウンロードしたファイルを検証
+
+    Args:
+        path: ファイルパス
+        expected_size: 期待するサイズ（バイト）
+        checksum: "アルゴリズム:16進値"（例: "sha256:ab12..."、"md5:..."）
+
+    Raises:
+        DownloadError: サイズ・チェックサムが一致しない
+    """
+    size = Path(path).stat().st_size
+    if expected_size is not None and size != expected_size:
+        raise DownloadError(f"サイズが一致しません: {size} != {expected_size} ({path})")
+
+    if checksum:
+        algorithm, _, expected = checksum.partition(':')
+        actual = file_checksum(path, algorithm.lower())
+        if actual.lower() != expected.lower():
+            raise DownloadError(f"チェックサムが一致しません: {algorithm}:{actual} ({path})")
+
+
+def _transfer(session, url, part, auth, chunk_size, timeout):
+    """
+    .part ファイルの続きを1回転送
+
+    Returns:
+        全体サイズ（サーバーが返さない場合はNone）
+
+    Raises:
+        IncompleteTransfer: 全体サイズに届かずに転送が終わった
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    with session.get(url, headers=headers, auth=auth, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # 要求した位置がファイル末尾以降 = 転送済み（サイズが合わなければやり直す）
+            _, total = parse_content_range(response.headers.get('Content-Range'))
+            if total is not None and total == offset:
+                return total
+            part.unlink()
+            raise IncompleteTransfer(f"再開位置が不正なため最初から転送します: {offset}")
+
+        response.raise_for_status()
+
+        start, total = parse_content_range(response.headers.get('Content-Range'))
+        if response.status_code == 206:
+            if start != offset:
+                part.unlink(missing_ok=True)
+                raise IncompleteTransfer(f"要求と異なる範囲が返されたため最初から転送します: {start} != {offset}")
+            mode = 'ab'
+        else:
+            # Range非対応のサーバーは全体を返すため最初から書き直す
+            mode = 'wb'
+            length = response.headers.get('Content-Length')
+            total = int(length) if length and length.isdigit() else None
+
+        with open(part, mode) as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+
+    size = part.stat().st_size
+    if total is not None and size < total:
+        raise IncompleteTransfer(f"{size}/{total} バイトで転送が中断されました")
+
+    return total
+
+
+def download_file(url, dest, expected_size=None, checksum=None, session=None, auth=None,
+                  retries=DEFAULT_RETRIES, backoff=1, chunk_size=CHUNK_SIZE, timeout=TIMEOUT):
+    """
+    1ファイルを再開可能にダウンロード
+
+    接続断・タイムアウト・5xxの場合は .part の続きから再試行し、
+    検証に通ったファイルだけを dest に置き換える。
+
+    Args:
+        url: ダウンロードURL
+        dest: 保存先パス
+        expected_size: 期待するサイズ（省略時はサーバーの申告サイズで検証）
+        checksum: "アルゴリズム:16進値"
+        session: requests.Session（省略時は新規作成）
+        auth: 認証情報 (ユーザー名, パスワード)
+        retries: 再試行回数
+        backoff: 最初の再試行までの間隔（秒、以降は倍々）
+        chunk_size: 書き込み単位（バイト）
+        timeout: (接続, 読み込み) タイムアウト（秒）
+
+    Returns:
+        Path: 保存したファイル
+
+    Raises:
+        DownloadError: 再試行しても完了しない、または検証に失敗した
+    """
+    dest = Path(dest)
+    part = part_path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    session = session or requests.Session()
+
+    for attempt in range(retries + 1):
+        try:
+            total = _transfer(session, url, part, auth, chunk_size, timeout)
+            break
+        except (IncompleteTransfer, requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            error = e
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code < 500:
+                raise DownloadError(f"ダウンロード失敗: {url}: {e}") from e
+            error = e
+
+        if attempt == retries:
+            raise DownloadError(f"ダウンロード失敗（{retries}回再試行）: {url}: {error}") from error
+
+        print(f"⚠️  転送中断、再開します ({attempt + 1}/{retries}): {dest.name}: {error}", file=sys.stderr)
+        time.sleep(backoff * 2 ** attempt)
+
+    try:
+        verify_file(part, expected_size if expected_size is not None else total, checksum)
+    except DownloadError:
+        # 壊れたデータから再開しないよう破棄する
+        part.unlink()
+        raise
+
+    os.replace(part, dest)
+    return dest
+
+
+class DownloadManager:
+    """複数ファイルの並列ダウンロード"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, auth=None, retries=DEFAULT_RETRIES, backoff=1):
+        """
+        Args:
+            workers: 同時転送数
+            auth: 認証情報 (ユーザー名, パスワード)
+            retries: ファイルごとの再試行回数
+            backoff: 最初の再試行までの間隔（秒）
+        """
+        self.workers = max(1, workers)
+        self.auth = auth
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+
+    def _session(self):
+        """スレッドごとのセッション（接続を使い回す）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def download(self, url, dest, expected_size=None, checksum=None):
+        """
+        1ファイルをダウンロード（スレッドセーフ）
+
+        Raises:
+            DownloadError: ダウンロード・検証の失敗
+        """
+        return download_file(
+            url, dest,
+            expected_size=expected_size,
+            checksum=checksum,
+            session=self._session(),
+            auth=self.auth,
+            retries=self.retries,
+            backoff=self.backoff
+        )
+
+    def download_all(self, tasks):
+        """
+        複数ファイルを並列にダウンロード
+
+        Args:
+            tasks: {"url", "dest", "size"（任意）, "checksum"（任意）} のリスト
+
+        Returns:
+            [{"url", "path", "error"}, ...]（tasks と同じ順、失敗時は path が None）
+        """
+        def run(task):
+            try:
+                path = self.download(task["url"], task["dest"], task.get("size"), task.get("checksum"))
+                return {"url": task["url"], "path": path, "error": None}
+            except DownloadError as e:
+                print(f"✗ {e}", file=sys.stderr)
+                return {"url": task["url"], "path": None, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run, tasks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="グラニュールの並列・再開可能ダウンロード")
+    parser.add_argument("urls", nargs="+", help="ダウンロードURL")
+    parser.add_argument("--output-dir", type=str, default=str(DATA_DIR),
+                       help="保存先ディレクトリ（デフォルト: data/geotiff）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help=f"同時転送数（デフォルト: {DEFAULT_WORKERS}）")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                       help=f"再試行回数（デフォルト: {DEFAULT_RETRIES}）")
+
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    tasks = [
+        {"url": url, "dest": output_dir / Path(urlparse(url).path).name}
+        for url in args.urls
+    ]
+
+    results = DownloadManager(workers=args.workers, retries=args.retries).download_all(tasks)
+
+    for result in results:
+        if result["path"]:
+            print(f"✓ {result['path']}")
+
+    if any(result["error"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
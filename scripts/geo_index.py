@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geolocation Index
+GCOM-C/SGLIの緯度経度グリッド（曲線格子）に対する空間索引
+
+格子点を一定間隔（度）の粗いバケットに振り分けてソートしておき、
+近傍バケットの格子点だけを調べることで最寄りピクセルや
+バッファ範囲のピクセル窓を高速に求める。
+
+索引はグラニュールごとに一度だけ構築し、data/metadata/ に
+<ファイル名>_geoindex.npz として保存して次回以降の実行で再利用する。
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 同一プロセス内で再利用する索引キャッシュ（ソースファイルパス → GeoIndex）
+_INDEX_CACHE = {}
+
+INDEX_VERSION = 1
+
+
+class GeoIndex:
+    """緯度経度グリッドの粗格子バケット索引"""
+
+    def __init__(self, shape, cell_deg, spacing_deg, lat0, lon0, n_lon_cells,
+                 bucket_keys, bucket_starts, order, lats, lons, source=None):
+        """
+        Args:
+            shape: 緯度経度グリッドの形状 (行, 列)
+            cell_deg: バケットの大きさ（度）
+            spacing_deg: 推定格子間隔（度）
+            lat0: バケット原点の緯度
+            lon0: バケット原点の経度
+            n_lon_cells: 経度方向のバケット数
+            bucket_keys: 空でないバケットのキー（昇順）
+            bucket_starts: 各バケットの order 上の開始位置（末尾に総数を含む）
+            order: バケット順に並べた格子点のフラットインデックス
+            lats: order順の緯度
+            lons: order順の経度
+            source: 索引元ファイルの識別情報（サイズ・更新時刻）
+        """
+        self.shape = tuple(int(v) for v in shape)
+        self.cell_deg = float(cell_deg)
+        self.spacing_deg = float(spacing_deg)
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.n_lon_cells = int(n_lon_cells)
+        self.bucket_keys = bucket_keys
+        self.bucket_starts = bucket_starts
+        self.order = order
+        self.lats = lats
+        self.lons = lons
+        self.source = source or {}
+
+    @classmethod
+    def build(cls, lat_grid, lon_grid, cell_deg=None, source=None):
+        """
+        緯度経度グリッドから索引を構築
+
+        Args:
+            lat_grid: 緯度の2次元配列
+            lon_grid: 経度の2次元配列
+            cell_deg: バケットの大きさ（度、省略時は格子間隔の4倍）
+            source: 索引元ファイルの識別情報
+
+        Returns:
+            GeoIndex
+        """
+        lat_grid = np.asarray(lat_grid, dtype=np.float64)
+        lon_grid = np.asarray(lon_grid, dtype=np.float64)
+
+        spacing = estimate_spacing(lat_grid, lon_grid)
+        if cell_deg is None:
+            cell_deg = spacing * 4
+
+        lats = lat_grid.ravel()
+        lons = lon_grid.ravel()
+
+        # 欠損値（NaN）の格子点は索引に含めない
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        lats = lats[valid]
+        lons = lons[valid]
+
+        lat0 = float(lats.min())
+        lon0 = float(lons.min())
+        n_lon_cells = int((lons.max() - lon0) // cell_deg) + 1
+
+        keys = ((lats - lat0) // cell_deg).astype(np.int64) * n_lon_cells \
+            + ((lons - lon0) // cell_deg).astype(np.int64)
+
+        sort = np.argsort(keys, kind='stable')
+        keys = keys[sort]
+        bucket_keys, bucket_starts = np.unique(keys, return_index=True)
+        bucket_starts = np.append(bucket_starts, len(keys))
+
+        return cls(
+            shape=lat_grid.shape,
+            cell_deg=cell_deg,
+            spacing_deg=spacing,
+            lat0=lat0,
+            lon0=lon0,
+            n_lon_cells=n_lon_cells,
+            bucket_keys=bucket_keys,
+            bucket_starts=bucket_starts,
+            order=valid[sort],
+            lats=lats[sort],
+            lons=lons[sort],
+            source=source,
+        )
+
+    def candidates(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        指定範囲と重なるバケットに属する格子点の位置（order上）を返す
+
+        バケットは緯度方向の行ごとに経度方向へ連続したキーを持つため、
+        バケット行ごとに1回の二分探索で連続区間として取り出せる。
+        """
+        iy0 = int((lat_min - self.lat0) // self.cell_deg)
+        iy1 = int((lat_max - self.lat0) // self.cell_deg)
+        ix0 = max(0, int((lon_min - self.lon0) // self.cell_deg))
+        ix1 = min(self.n_lon_cells - 1, int((lon_max - self.lon0) // self.cell_deg))
+
+        if ix0 > ix1:
+            return np.empty(0, dtype=np.int64)
+
+        row_keys = np.arange(max(0, iy0), iy1 + 1, dtype=np.int64) * self.n_lon_cells
+        lo = np.searchsorted(self.bucket_keys, row_keys + ix0, side='left')
+        hi = np.searchsorted(self.bucket_keys, row_keys + ix1, side='right')
+
+        spans = [np.arange(self.bucket_starts[a], self.bucket_starts[b])
+                 for a, b in zip(lo, hi) if b > a]
+
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(spans)
+
+    def nearest(self, lat, lon):
+        """
+        最寄りの格子点を検索
+
+        Args:
+            lat: 緯度
+            lon: 経度
+
+        Returns:
+            (行, 列, 距離[度])。グリッドの範囲外の場合はNone
+        """
+        radius = self.cell_deg
+        limit = 2 * self.spacing_deg
+
+        # 候補が見つかるまで探索範囲を広げる（格子間隔の2倍を超えたら範囲外）
+        while True:
+            pos = self.candidates(lat - radius, lat + radius, lon - radius, lon + radius)
+            if len(pos) or radius >= limit:
+                break
+            radius *= 2
+
+        if not len(pos):
+            return None
+
+        dist = np.hypot(self.lats[pos] - lat, self.lons[pos] - lon)
+        best = int(np.argmin(dist))
+
+        # 探索範囲の外側により近い点が残っていないか確認
+        if dist[best] > radius:
+            r = float(dist[best])
+            pos = self.candidates(lat - r, lat + r, lon - r, lon + r)
+            dist = np.hypot(self.lats[pos] - lat, self.lons[pos] - lon)
+            best = int(np.argmin(dist))
+
+        if dist[best] > limit:
+            return None
+
+        row, col = np.unravel_index(self.order[pos[best]], self.shape)
+        return int(row), int(col), float(dist[best])
+
+    def window(self, lat, lon, buffer_deg):
+        """
+        バッファ内に入る格子点の行・列範囲を求める
+
+        Args:
+            lat: 中心緯度
+            lon: 中心経度
+            buffer_deg: バッファ（度）
+
+        Returns:
+            (開始行, 終了行, 開始列, 終了列)（終了は含む）。範囲外の場合はNone
+        """
+        bounds = self.bbox_window(lat - buffer_deg, lat + buffer_deg, lon - buffer_deg, lon + buffer_deg)
+        if bounds is not None:
+            return bounds
+
+        # バッファが格子間隔より小さい場合は最寄りの格子点を使用
+        hit = self.nearest(lat, lon)
+        if hit is None:
+            return None
+        row, col, _ = hit
+        return row, row, col, col
+
+    def bbox_window(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        緯度経度の矩形範囲に入る格子点の行・列範囲を求める
+
+        Returns:
+            (開始行, 終了行, 開始列, 終了列)（終了は含む）。該当する格子点がない場合はNone
+        """
+        pos = self.candidates(lat_min, lat_max, lon_min, lon_max)
+
+        if len(pos):
+            lats = self.lats[pos]
+            lons = self.lons[pos]
+            pos = pos[(lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)]
+
+        if not len(pos):
+            return None
+
+        rows, cols = np.unravel_index(self.order[pos], self.shape)
+        return int(rows.min()), int(rows.max()), int(cols.min()), int(cols.max())
+
+    def save(self, path):
+        """索引をnpz形式で保存"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 書き込み途中のファイルを読まないよう一時ファイル経由で置き換える
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                shape=np.array(self.shape),
+                params=np.array([self.cell_deg, self.spacing_deg, self.lat0, self.lon0]),
+                n_lon_cells=self.n_lon_cells,
+                source=np.array([self.source.get('size', -1), self.source.get('mtime_ns', -1)], dtype=np.int64),
+                bucket_keys=self.bucket_keys,
+                bucket_starts=self.bucket_starts,
+                order=self.order,
+                lats=self.lats,
+                lons=self.lons,
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """npz形式の索引を読み込み"""
+        with np.load(path) as z:
+            if int(z['version']) != INDEX_VERSION:
+                raise ValueError(f"索引のバージョンが異なります: {path}")
+
+            cell_deg, spacing_deg, lat0, lon0 = z['params']
+            size, mtime_ns = z['source']
+
+            return cls(
+                shape=z['shape'],
+                cell_deg=cell_deg,
+                spacing_deg=spacing_deg,
+                lat0=lat0,
+                lon0=lon0,
+                n_lon_cells=int(z['n_lon_cells']),
+                bucket_keys=z['bucket_keys'],
+                bucket_starts=z['bucket_starts'],
+                order=z['order'],
+                lats=z['lats'],
+                lons=z['lons'],
+                source={'size': int(size), 'mtime_ns': int(mtime_ns)},
+            )
+
+
+def estimate_spacing(lat_grid, lon_grid):
+    """格子間隔（度）を中央値で推定"""
+    steps = []
+    if lat_grid.shape[0] > 1:
+        steps.append(np.hypot(np.diff(lat_grid, axis=0), np.diff(lon_grid, axis=0)).ravel())
+    if lat_grid.shape[1] > 1:
+        steps.append(np.hypot(np.diff(lat_grid, axis=1), np.diff(lon_grid, axis=1)).ravel())
+
+    if not steps:
+        return 0.01
+
+    steps = np.concatenate(steps)
+    steps = steps[np.isfinite(steps) & (steps > 0)]
+    return float(np.median(steps)) if len(steps) else 0.01
+
+
+def file_signature(file_path):
+    """ファイルサイズと更新時刻（索引の再構築判定用）"""
+    st = Path(file_path).stat()
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def index_path_for(file_path, index_dir=None):
+    """
+    索引ファイルのパスを返す
+
+    Args:
+        file_path: HDF5ファイルパス
+        index_dir: 保存先（省略時は data/geotiff/ と同階層の metadata/）
+    """
+    file_path = Path(file_path)
+    if index_dir is None:
+        index_dir = file_path.parent.parent / "metadata"
+    return Path(index_dir) / f"{file_path.stem}_geoindex.npz"
+
+
+def get_geo_index(hdf_file, index_dir=None,
+                  lat_path='Geometry_data/Latitude', lon_path='Geometry_data/Longitude'):
+    """
+    HDF5ファイルの索引を取得（メモリ → ディスク → 新規構築の順）
+
+    Args:
+        hdf_file: 開いているh5py.File
+        index_dir: 索引の保存先
+        lat_path: 緯度データセットのパス
+        lon_path: 経度データセットのパス
+
+    Returns:
+        GeoIndex
+    """
+    file_path = Path(hdf_file.filename).resolve()
+    signature = file_signature(file_path)
+
+    cached = _INDEX_CACHE.get(file_path)
+    if cached is not None and cached.source == signature:
+        return cached
+
+    index_path = index_path_for(file_path, index_dir)
+
+    index = None
+    if index_path.exists():
+        try:
+            index = GeoIndex.load(index_path)
+        except Exception as e:
+            print(f"⚠️  索引の読み込みに失敗しました。再構築します: {e}", file=sys.stderr)
+
+    if index is None or index.source != signature:
+        index = GeoIndex.build(hdf_file[lat_path][:], hdf_file[lon_path][:], source=signature)
+        try:
+            index.save(index_path)
+        except OSError as e:
+            print(f"⚠️  索引を保存できませんでした: {e}", file=sys.stderr)
+
+    _INDEX_CACHE[file_path] = index
+    return index
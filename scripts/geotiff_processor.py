@@ -11,7 +11,9 @@ GeoTIFFファイルを読み込み、指定座標周辺のデータを抽出・
 
 import argparse
 import json
+import math
 import os
+import re
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -32,6 +34,7 @@ except ImportError:
 
 try:
     import rasterio
+    from rasterio.enums import Resampling
     from rasterio.windows import Window
     RASTERIO_AVAILABLE = True
 except ImportError:
@@ -56,7 +59,34 @@ except ImportError:
     print("⚠️  matplotlibがインストールされていません (可視化オプション用)", file=sys.stderr)
 
 
-def read_geotiff_rasterio(file_path, lat, lon, buffer_km=5):
+# オーバービュー（raster_convert）を格納するHDF5のグループ
+OVERVIEW_GROUP = 'Overviews'
+
+# 距離の換算（おおよそ1km = 0.01度）
+METERS_PER_DEGREE = 100_000
+
+# ファイル名中の観測日（GC1SG1_YYYYMMDD...、GCOM-C_YYYYMMDD_... 等）
+FILENAME_DATE_PATTERN = re.compile(r'_(\d{4})(\d{2})(\d{2})')
+
+
+def select_overview(levels, factor):
+    """
+    要求する縮小倍率に合うオーバービューの倍率
+
+    出力解像度より粗くならないよう、factor 以下で最大の倍率を選ぶ。
+
+    Args:
+        levels: 利用できるオーバービューの倍率（[2, 4, 8] 等）
+        factor: 要求する縮小倍率（出力解像度 / 原解像度）
+
+    Returns:
+        倍率（原解像度を読む場合は1）
+    """
+    # 格子間隔から求めた原解像度の丸め誤差で1段細かい倍率にならないよう、わずかに許容する
+    return max((level for level in levels if level <= factor * 1.001), default=1)
+
+
+def read_geotiff_rasterio(file_path, lat, lon, buffer_km=5, resolution_m=None):
     """
     GeoTIFFファイルをrasterioで読み込み
 
@@ -65,6 +95,7 @@ def read_geotiff_rasterio(file_path, lat, lon, buffer_km=5):
         lat: 中心緯度
         lon: 中心経度
         buffer_km: バッファ距離（km）
+        resolution_m: 出力解像度（m、指定時は合うオーバービューから縮小して読む）
 
     Returns:
         data, metadata, stats
@@ -86,22 +117,20 @@ def read_geotiff_rasterio(file_path, lat, lon, buffer_km=5):
                 "bounds": src.bounds,
             }
 
-            # 座標変換（緯度経度 → ピクセル座標）
-            py, px = src.index(lon, lat)
-
-            # バッファ計算（おおよそ1km = 0.01度）
-            buffer_pixels = int(buffer_km * 0.01 / abs(src.transform[0]))
+            window = _geotiff_window(src, lat, lon, buffer_km)
 
-            # ウィンドウ定義
-            window = Window(
-                max(0, px - buffer_pixels),
-                max(0, py - buffer_pixels),
-                min(buffer_pixels * 2, src.width),
-                min(buffer_pixels * 2, src.height)
-            )
+            level = 1
+            if resolution_m:
+                pixel_m = abs(src.transform[0]) * METERS_PER_DEGREE
+                level = select_overview(src.overviews(1), resolution_m / pixel_m)
 
-            # データ読み込み
-            data = src.read(1, window=window)
+            # データ読み込み（縮小読み込みにするとGDALが同じ倍率のオーバービューを使う）
+            if level > 1:
+                out_shape = (math.ceil(window.height / level), math.ceil(window.width / level))
+                data = src.read(1, window=window, out_shape=out_shape, resampling=Resampling.nearest)
+                metadata["overview_level"] = level
+            else:
+                data = src.read(1, window=window)
 
             # NoDataマスク適用
             if src.nodata is not None:
@@ -116,7 +145,24 @@ def read_geotiff_rasterio(file_path, lat, lon, buffer_km=5):
         raise RuntimeError(f"GeoTIFF読み込みエラー: {e}")
 
 
-def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
+def _geotiff_window(src, lat, lon, buffer_km):
+    """緯度経度とバッファからGeoTIFFの読み込みウィンドウを求める"""
+    # 座標変換（緯度経度 → ピクセル座標）
+    py, px = src.index(lon, lat)
+
+    # バッファ計算（おおよそ1km = 0.01度）
+    buffer_pixels = int(buffer_km * 0.01 / abs(src.transform[0]))
+
+    # ウィンドウ定義
+    return Window(
+        max(0, px - buffer_pixels),
+        max(0, py - buffer_pixels),
+        min(buffer_pixels * 2, src.width),
+        min(buffer_pixels * 2, src.height)
+    )
+
+
+def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST", resolution_m=None):
     """
     GCOM-C/SGLI HDF5ファイルを読み込み
 
@@ -126,6 +172,7 @@ def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
         lon: 中心経度
         buffer_km: バッファ距離（km）
         dataset_name: データセット名 (LST, NDVI等)
+        resolution_m: 出力解像度（m、指定時は合うオーバービューから読む）
 
     Returns:
         data, metadata, stats
@@ -139,18 +186,7 @@ def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
             print(f"\n📂 HDF5ファイル構造:")
             print_hdf5_structure(f, max_depth=2)
 
-            # データセット検索（一般的なパス）
-            possible_paths = [
-                f'Image_data/{dataset_name}',
-                f'Geophysical_data/{dataset_name}',
-                dataset_name,
-            ]
-
-            data_path = None
-            for path in possible_paths:
-                if path in f:
-                    data_path = path
-                    break
+            data_path = find_hdf5_dataset(f, dataset_name)
 
             if not data_path:
                 # モックデータの場合は生成
@@ -163,9 +199,23 @@ def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
                     "shape": data.shape
                 }
             else:
-                # データ読み込み
                 dataset = f[data_path]
-                data = dataset[:]
+
+                # 座標周辺のウィンドウ（ハイパースラブ）のみ読み込み
+                window = find_hdf5_window(f, dataset.shape, lat, lon, buffer_km)
+
+                level = 1
+                if resolution_m and window is not None:
+                    levels = hdf5_overview_levels(f, data_path)
+                    level = select_overview(levels, resolution_m / hdf5_pixel_size_m(f, dataset.shape))
+
+                if window is None:
+                    # 緯度経度グリッドがない場合はグラニュール全体を読み込む
+                    data = dataset[:]
+                elif level > 1:
+                    data = f[levels[level]][overview_window(window, level)]
+                else:
+                    data = dataset[window]
 
                 metadata = {
                     "file": str(file_path),
@@ -175,6 +225,11 @@ def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
                     "attrs": dict(dataset.attrs) if hasattr(dataset, 'attrs') else {}
                 }
 
+                if window is not None:
+                    metadata["window"] = _window_metadata(window)
+                if level > 1:
+                    metadata["overview_level"] = level
+
             # 統計計算
             stats = calculate_statistics(data)
 
@@ -184,6 +239,342 @@ def read_hdf5_gcom_c(file_path, lat, lon, buffer_km=5, dataset_name="LST"):
         raise RuntimeError(f"HDF5読み込みエラー: {e}")
 
 
+def find_hdf5_dataset(hdf_file, dataset_name):
+    """データセットのパスを検索（一般的なパス）。見つからない場合はNone"""
+    possible_paths = [
+        f'Image_data/{dataset_name}',
+        f'Geophysical_data/{dataset_name}',
+        dataset_name,
+    ]
+
+    for path in possible_paths:
+        if path in hdf_file:
+            return path
+
+    return None
+
+
+def hdf5_overview_levels(hdf_file, data_path):
+    """
+    データセットのオーバービュー（raster_convert で作成）
+
+    Returns:
+        {倍率: データセットのパス}（ない場合は空）
+    """
+    group = hdf_file.get(f"{OVERVIEW_GROUP}/{data_path}")
+    if group is None:
+        return {}
+    return {int(name): f"{OVERVIEW_GROUP}/{data_path}/{name}" for name in group if name.isdigit()}
+
+
+def hdf5_pixel_size_m(hdf_file, data_shape):
+    """画像ピクセルの大きさ（m、緯度経度グリッドの間隔と Grid_interval から換算）"""
+    from geo_index import get_geo_index
+
+    lat_path = 'Geometry_data/Latitude'
+    index = get_geo_index(hdf_file, lat_path=lat_path, lon_path='Geometry_data/Longitude')
+    row_step, _ = grid_interval(hdf_file[lat_path], index.shape, data_shape)
+    return index.spacing_deg / row_step * METERS_PER_DEGREE
+
+
+def overview_window(window, level):
+    """原解像度のウィンドウを倍率 level のオーバービュー上のウィンドウに変換"""
+    return tuple(slice(s.start // level, math.ceil(s.stop / level)) for s in window)
+
+
+def read_geotiff_rasterio_batch(file_path, points):
+    """
+    複数地点の統計をGeoTIFFの1回の読み込みで計算
+
+    全地点のウィンドウを包含する範囲を一度だけ読み込み、
+    各地点の統計はその配列のビューから計算する。
+
+    Args:
+        file_path: GeoTIFFファイルパス
+        points: 地点リスト [{"name", "lat", "lon", "buffer_km"}, ...]
+
+    Returns:
+        fields, metadata
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("rasterioがインストールされていません")
+
+    try:
+        with rasterio.open(file_path) as src:
+            metadata = {
+                "driver": src.driver,
+                "dtype": str(src.dtypes[0]),
+                "nodata": src.nodata,
+                "width": src.width,
+                "height": src.height,
+                "count": src.count,
+                "crs": str(src.crs),
+                "bounds": src.bounds,
+            }
+
+            # 範囲外の地点はNone（結果にエラーとして記録し、読み込み範囲に含めない）
+            extent = Window(0, 0, src.width, src.height)
+            windows = []
+            for point in points:
+                py, px = src.index(point["lon"], point["lat"])
+                if not (0 <= py < src.height and 0 <= px < src.width):
+                    windows.append(None)
+                    continue
+                window = _geotiff_window(src, point["lat"], point["lon"], point["buffer_km"])
+                windows.append(window.intersection(extent).toslices())
+
+            valid_windows = [w for w in windows if w is not None]
+            if not valid_windows:
+                raise ValueError("グラニュール範囲内の地点がありません")
+
+            union = _union_window(valid_windows)
+            data = src.read(1, window=Window.from_slices(*union))
+
+            if src.nodata is not None:
+                data = np.ma.masked_equal(data, src.nodata)
+
+            metadata["window"] = _window_metadata(union)
+
+            return _batch_statistics(data, union, windows, points), metadata
+
+    except Exception as e:
+        raise RuntimeError(f"GeoTIFF読み込みエラー: {e}")
+
+
+def read_hdf5_gcom_c_batch(file_path, points, dataset_name="LST"):
+    """
+    複数地点の統計をHDF5の1回の読み込みで計算
+
+    Args:
+        file_path: HDF5ファイルパス
+        points: 地点リスト [{"name", "lat", "lon", "buffer_km"}, ...]
+        dataset_name: データセット名 (LST, NDVI等)
+
+    Returns:
+        fields, metadata
+    """
+    if not H5PY_AVAILABLE:
+        raise ImportError("h5pyがインストールされていません")
+
+    try:
+        with h5py.File(file_path, 'r') as f:
+            data_path = find_hdf5_dataset(f, dataset_name)
+            if not data_path:
+                raise ValueError(f"データセットが見つかりません: {dataset_name}")
+
+            dataset = f[data_path]
+
+            # 範囲外の地点はNone（結果にエラーとして記録）
+            # 緯度経度グリッドがない場合は read_hdf5_gcom_c と同じくグラニュール全体
+            full_extent = (slice(0, dataset.shape[0]), slice(0, dataset.shape[1]))
+            windows = []
+            for point in points:
+                try:
+                    window = find_hdf5_window(f, dataset.shape, point["lat"], point["lon"], point["buffer_km"])
+                except ValueError:
+                    window = None
+                else:
+                    window = full_extent if window is None else window
+                windows.append(window)
+
+            valid_windows = [w for w in windows if w is not None]
+            if not valid_windows:
+                raise ValueError("グラニュール範囲内の地点がありません")
+
+            union = _union_window(valid_windows)
+            data = dataset[union]
+
+            metadata = {
+                "file": str(file_path),
+                "dataset": data_path,
+                "shape": dataset.shape,
+                "dtype": str(dataset.dtype),
+                "attrs": dict(dataset.attrs) if hasattr(dataset, 'attrs') else {},
+                "window": _window_metadata(union),
+            }
+
+            return _batch_statistics(data, union, windows, points), metadata
+
+    except Exception as e:
+        raise RuntimeError(f"HDF5読み込みエラー: {e}")
+
+
+def _union_window(windows):
+    """(行スライス, 列スライス) のリストを包含するウィンドウ"""
+    return (
+        slice(min(w[0].start for w in windows), max(w[0].stop for w in windows)),
+        slice(min(w[1].start for w in windows), max(w[1].stop for w in windows)),
+    )
+
+
+def _window_metadata(window):
+    """ウィンドウをメタデータ用の辞書に変換"""
+    return {
+        "row_off": window[0].start,
+        "col_off": window[1].start,
+        "height": window[0].stop - window[0].start,
+        "width": window[1].stop - window[1].start,
+    }
+
+
+def _batch_statistics(data, union, windows, points):
+    """
+    包含ウィンドウの配列から地点ごとの統計を計算
+
+    NaN/NoDataのマスクは包含ウィンドウ全体で一度だけ作成し、各地点の
+    ウィンドウのピクセルに地点番号のラベルを付けて、件数・平均・標準偏差・
+    パーセンタイルを stats_engine.labelled_statistics で一括計算する
+    （重なるウィンドウのピクセルはそれぞれの地点に数える）。
+    """
+    from stats_engine import labelled_statistics
+
+    values = np.ma.getdata(data).astype(np.float64, copy=False).ravel()
+    invalid = np.isnan(values)
+    if isinstance(data, np.ma.MaskedArray):
+        invalid |= np.ma.getmaskarray(data).ravel()
+
+    # 包含ウィンドウ内の各地点のピクセル位置とラベル
+    width = union[1].stop - union[1].start
+    index_parts, label_parts = [], []
+    for label, window in enumerate(windows, start=1):
+        if window is None:
+            continue
+        rows = np.arange(window[0].start - union[0].start, window[0].stop - union[0].start)
+        cols = np.arange(window[1].start - union[1].start, window[1].stop - union[1].start)
+        index = (rows[:, None] * width + cols).ravel()
+        index_parts.append(index)
+        label_parts.append(np.full(index.size, label, dtype=np.int64))
+
+    index = np.concatenate(index_parts)
+    labels = np.concatenate(label_parts)
+    valid = ~invalid[index]
+    statistics = labelled_statistics(values[index[valid]], labels[valid], len(windows))
+
+    fields = []
+    for point, window, stats in zip(points, windows, statistics):
+        field = {
+            "name": point.get("name"),
+            "location": {
+                "latitude": point["lat"],
+                "longitude": point["lon"],
+                "buffer_km": point["buffer_km"]
+            },
+        }
+
+        if window is None:
+            field["error"] = "指定座標がグラニュールの範囲外です"
+        else:
+            field["window"] = _window_metadata(window)
+            field["statistics"] = stats
+
+        fields.append(field)
+
+    return fields
+
+
+def load_points_geojson(geojson_path, default_buffer_km=5.0):
+    """
+    GeoJSONのPointフィーチャーを地点リストとして読み込み
+
+    プロパティに buffer_km があればその値、なければ default_buffer_km を使用する。
+
+    Args:
+        geojson_path: GeoJSONファイルパス（exports/nanaka_farm_fields.geojson 等）
+        default_buffer_km: バッファ距離の既定値（km）
+
+    Returns:
+        [{"name", "lat", "lon", "buffer_km"}, ...]
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    points = []
+    for i, feature in enumerate(geojson.get("features", [])):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            continue
+
+        lon, lat = geometry["coordinates"][:2]
+        properties = feature.get("properties") or {}
+
+        points.append({
+            "name": properties.get("name") or f"field_{i}",
+            "lat": float(lat),
+            "lon": float(lon),
+            "buffer_km": float(properties.get("buffer_km") or default_buffer_km),
+        })
+
+    return points
+
+
+def find_hdf5_window(hdf_file, data_shape, lat, lon, buffer_km):
+    """
+    Geometry_dataの緯度経度グリッドから指定座標周辺のピクセル範囲を求める
+
+    SGLIの緯度経度グリッドは画像より粗い間隔（Grid_interval属性）で
+    格納されている場合があるため、画像ピクセル座標に換算して返す。
+    格子点の検索には data/metadata/ に保存される空間索引を使用する。
+
+    Args:
+        hdf_file: 開いているh5py.File
+        data_shape: 読み込むデータセットの形状
+        lat: 中心緯度
+        lon: 中心経度
+        buffer_km: バッファ距離（km）
+
+    Returns:
+        (行スライス, 列スライス)。緯度経度グリッドがない場合はNone
+
+    Raises:
+        ValueError: 指定座標がグラニュールの範囲外の場合
+    """
+    from geo_index import get_geo_index
+
+    lat_path = 'Geometry_data/Latitude'
+    lon_path = 'Geometry_data/Longitude'
+
+    if lat_path not in hdf_file or lon_path not in hdf_file:
+        return None
+
+    index = get_geo_index(hdf_file, lat_path=lat_path, lon_path=lon_path)
+
+    # バッファ計算（おおよそ1km = 0.01度）
+    buffer_deg = buffer_km * 0.01
+
+    grid_window = index.window(lat, lon, buffer_deg)
+    if grid_window is None:
+        raise ValueError(f"指定座標がグラニュールの範囲外です: ({lat}, {lon})")
+
+    r0, r1, c0, c1 = grid_window
+    row_step, col_step = grid_interval(hdf_file[lat_path], index.shape, data_shape)
+
+    return (
+        _grid_to_pixel_slice(r0, r1, row_step, data_shape[0]),
+        _grid_to_pixel_slice(c0, c1, col_step, data_shape[1]),
+    )
+
+
+def grid_interval(lat_ds, grid_shape, data_shape):
+    """緯度経度格子点1つあたりの画像ピクセル数 (行, 列)"""
+    interval = lat_ds.attrs.get('Grid_interval')
+    if interval is not None:
+        step = int(np.ravel(interval)[0])
+        return step, step
+
+    return (
+        max(1, round(data_shape[0] / grid_shape[0])),
+        max(1, round(data_shape[1] / grid_shape[1])),
+    )
+
+
+def _grid_to_pixel_slice(start, stop, step, size):
+    """格子点インデックスの範囲を画像ピクセルのスライスに変換"""
+    if step > 1:
+        # 格子点間のピクセルも含めるため前後に1格子分広げる
+        return slice(max(0, (start - 1) * step), min(size, (stop + 1) * step + 1))
+    return slice(start, min(size, stop + 1))
+
+
 def print_hdf5_structure(hdf_file, prefix="", max_depth=3, current_depth=0):
     """HDF5ファイル構造を表示"""
     if current_depth >= max_depth:
@@ -215,12 +606,19 @@ def generate_mock_data(dataset_name, buffer_km):
     return data
 
 
-def calculate_statistics(data):
+def calculate_statistics(data, percentiles=(25, 50, 75)):
     """
     統計値を計算
 
+    平均・標準偏差・最小・最大は1パスで集計し、中央値と全パーセンタイルは
+    1回の np.partition でまとめて求める。チャンクのイテレータを渡した場合は
+    チャンクごとに集計し、パーセンタイルはKLLスケッチで近似する
+    （グラニュール全体をメモリに載せずに計算できる）。
+    結果にはマージ可能なKLLスケッチ（sketch）を含める。
+
     Args:
-        data: numpy配列
+        data: numpy配列、またはnumpy配列チャンクのイテレータ
+        percentiles: 計算するパーセンタイル
 
     Returns:
         統計情報辞書
@@ -228,33 +626,27 @@ def calculate_statistics(data):
     if not NUMPY_AVAILABLE:
         return {"error": "numpy未インストール"}
 
-    # マスク配列対応
-    if isinstance(data, np.ma.MaskedArray):
-        data_clean = data.compressed()
-    else:
-        data_clean = data.flatten()
+    from stats_engine import summarize
 
-    # 有効データチェック
-    data_clean = data_clean[~np.isnan(data_clean)]
+    moments, quantiles, sketch = summarize(data, percentiles)
 
-    if len(data_clean) == 0:
+    # 有効データチェック
+    if moments.count == 0:
         return {
             "valid_pixels": 0,
             "error": "有効なデータがありません"
         }
 
     stats = {
-        "valid_pixels": int(len(data_clean)),
-        "mean": float(np.mean(data_clean)),
-        "median": float(np.median(data_clean)),
-        "std": float(np.std(data_clean)),
-        "min": float(np.min(data_clean)),
-        "max": float(np.max(data_clean)),
-        "percentiles": {
-            "25": float(np.percentile(data_clean, 25)),
-            "50": float(np.percentile(data_clean, 50)),
-            "75": float(np.percentile(data_clean, 75))
-        }
+        "valid_pixels": moments.count,
+        "mean": moments.mean,
+        "median": quantiles['median'],
+        "std": moments.std,
+        "min": moments.min,
+        "max": moments.max,
+        "percentiles": {str(p): quantiles[p] for p in percentiles},
+        # ファイル・日付をまたいで分布をマージするためのスケッチ
+        "sketch": sketch.to_dict()
     }
 
     return stats
@@ -309,7 +701,56 @@ def create_histogram(data, output_path, title="データ分布", xlabel="値"):
     return output_path
 
 
-def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz):
+def observation_date(file_path):
+    """
+    グラニュールの観測日
+
+    ファイル名の日付（SGLIのプロダクト名 GC1SG1_YYYYMMDD...）、HDF5の
+    Global_attributes/Image_start_time、ダウンロード時に保存したメタデータ
+    （data/metadata/<ファイル名>_metadata.json の observation_date）の順に探す。
+
+    Args:
+        file_path: ファイルパス
+
+    Returns:
+        観測日 (YYYY-MM-DD形式) またはNone（特定できない場合）
+    """
+    file_path = Path(file_path)
+
+    for match in FILENAME_DATE_PATTERN.finditer(file_path.name):
+        try:
+            return datetime(*map(int, match.groups())).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+
+    if H5PY_AVAILABLE and file_path.suffix.lower() in ('.h5', '.hdf5') and file_path.exists():
+        try:
+            with h5py.File(file_path, 'r') as f:
+                start = f['Global_attributes'].attrs.get('Image_start_time') \
+                    if 'Global_attributes' in f else None
+        except OSError:
+            start = None
+        if isinstance(start, np.ndarray):
+            start = start.flat[0] if start.size else None
+        if isinstance(start, bytes):
+            start = start.decode('ascii', 'ignore')
+        if start:
+            try:
+                return datetime.strptime(str(start)[:8], '%Y%m%d').strftime('%Y-%m-%d')
+            except ValueError:
+                pass
+
+    metadata_path = file_path.parent.parent / "metadata" / f"{file_path.stem}_metadata.json"
+    if metadata_path.exists():
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            value = json.load(f).get("observation_date")
+        if value:
+            return str(value)[:10]
+
+    return None
+
+
+def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz, resolution_m=None):
     """
     ファイルを処理
 
@@ -320,6 +761,7 @@ def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz):
         buffer_km: バッファ距離
         dataset_name: データセット名
         create_viz: 可視化を作成するか
+        resolution_m: 出力解像度（m、指定時はオーバービューから読む）
 
     Returns:
         結果辞書
@@ -340,11 +782,11 @@ def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz):
     try:
         if suffix in ['.tif', '.tiff']:
             # GeoTIFF処理
-            data, metadata, stats = read_geotiff_rasterio(file_path, lat, lon, buffer_km)
+            data, metadata, stats = read_geotiff_rasterio(file_path, lat, lon, buffer_km, resolution_m)
 
         elif suffix in ['.h5', '.hdf5']:
             # HDF5処理
-            data, metadata, stats = read_hdf5_gcom_c(file_path, lat, lon, buffer_km, dataset_name)
+            data, metadata, stats = read_hdf5_gcom_c(file_path, lat, lon, buffer_km, dataset_name, resolution_m)
 
         else:
             raise ValueError(f"未対応のファイル形式: {suffix}")
@@ -352,6 +794,7 @@ def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz):
         # 結果作成
         result = {
             "file": str(file_path),
+            "observation_date": observation_date(file_path),
             "processing_time": datetime.now().isoformat(),
             "location": {
                 "latitude": lat,
@@ -384,17 +827,68 @@ def process_file(file_path, lat, lon, buffer_km, dataset_name, create_viz):
         }
 
 
+def process_file_batch(file_path, points, dataset_name):
+    """
+    ファイルを1回だけ開いて複数地点を処理
+
+    Args:
+        file_path: ファイルパス
+        points: 地点リスト [{"name", "lat", "lon", "buffer_km"}, ...]
+        dataset_name: データセット名
+
+    Returns:
+        結果辞書（fields に地点ごとの統計）
+    """
+    file_path = Path(file_path)
+
+    if not file_path.exists():
+        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+    print(f"\n📊 ファイル処理（一括）: {file_path.name}")
+    print(f"   地点数: {len(points)}")
+
+    suffix = file_path.suffix.lower()
+
+    try:
+        if suffix in ['.tif', '.tiff']:
+            fields, metadata = read_geotiff_rasterio_batch(file_path, points)
+
+        elif suffix in ['.h5', '.hdf5']:
+            fields, metadata = read_hdf5_gcom_c_batch(file_path, points, dataset_name)
+
+        else:
+            raise ValueError(f"未対応のファイル形式: {suffix}")
+
+        return {
+            "file": str(file_path),
+            "processing_time": datetime.now().isoformat(),
+            "metadata": metadata,
+            "fields": fields
+        }
+
+    except Exception as e:
+        return {
+            "file": str(file_path),
+            "error": str(e),
+            "processing_time": datetime.now().isoformat()
+        }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="GeoTIFF/HDF5ファイルを処理して統計情報を抽出"
     )
     parser.add_argument("file", type=str, help="GeoTIFF/HDF5ファイルパス")
-    parser.add_argument("--lat", type=float, required=True, help="中心緯度")
-    parser.add_argument("--lon", type=float, required=True, help="中心経度")
+    parser.add_argument("--lat", type=float, help="中心緯度")
+    parser.add_argument("--lon", type=float, help="中心経度")
+    parser.add_argument("--points", type=str,
+                       help="複数地点のGeoJSON（Pointフィーチャー）。指定時は --lat/--lon の代わりに一括処理")
     parser.add_argument("--buffer", type=float, default=5.0,
                        help="バッファ距離（km、デフォルト: 5）")
     parser.add_argument("--dataset", type=str, default="LST",
                        help="データセット名（HDF5用、デフォルト: LST）")
+    parser.add_argument("--resolution", type=float,
+                       help="出力解像度（m）。変換済みファイルは合うオーバービューから読む")
     parser.add_argument("--viz", action="store_true",
                        help="ヒストグラムを生成")
     parser.add_argument("--output", type=str,
@@ -402,6 +896,9 @@ def main():
 
     args = parser.parse_args()
 
+    if not args.points and (args.lat is None or args.lon is None):
+        parser.error("--lat と --lon、または --points を指定してください")
+
     print("\n" + "=" * 70)
     print("GeoTIFF/HDF5 プロセッサ")
     print("=" * 70)
@@ -413,14 +910,19 @@ def main():
         sys.exit(1)
 
     # ファイル処理
-    result = process_file(
-        args.file,
-        args.lat,
-        args.lon,
-        args.buffer,
-        args.dataset,
-        args.viz
-    )
+    if args.points:
+        points = load_points_geojson(args.points, default_buffer_km=args.buffer)
+        result = process_file_batch(args.file, points, args.dataset)
+    else:
+        result = process_file(
+            args.file,
+            args.lat,
+            args.lon,
+            args.buffer,
+            args.dataset,
+            args.viz,
+            args.resolution
+        )
 
     # 結果出力
     if args.output:
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Granule Ingest
+ダウンロードしたグラニュールを圃場周辺に切り出して保存
+
+登録済みの全圃場（とマージン）を含む範囲だけをグラニュールから切り出し、
+チャンク分割・gzip圧縮したHDF5（GeoTIFFの場合はタイル分割・DEFLATE圧縮）に
+書き出す。近い圃場の範囲は1つにまとめ、離れた圃場は別のファイル（*_T1.h5 …）に
+切り出すため、圃場が散らばっていてもグラニュール全体にはならない。HDF5は
+Geometry_data の緯度経度グリッドも同じ範囲で切り出すため、
+geotiff_processor・tile_renderer はそのまま読める。
+
+グラニュール保存領域（granule_store）に保存済みのものは切り出し結果で
+置き換え、元のグラニュールは新しい圃場が登録されたときの再切り出し用に
+残す（delete_source=True で削除）。
+
+使い方:
+    # ファイルを圃場周辺に切り出し（元ファイルを置き換え）
+    python scripts/granule_ingest.py data/geotiff/GC1SG1_*.h5 --farm 32.8032,130.7075 --delete-source
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+import numpy as np
+
+from geo_index import GeoIndex
+from geotiff_processor import H5PY_AVAILABLE, OVERVIEW_GROUP, RASTERIO_AVAILABLE, grid_interval
+from granule_store import tile_name
+from raster_convert import image_datasets, write_overviews
+
+if H5PY_AVAILABLE:
+    import h5py
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    from rasterio.errors import WindowError
+    from rasterio.windows import Window, bounds as window_bounds, from_bounds
+
+# 圃場の周囲に含めるマージン（km、おおよそ1km = 0.01度）
+INGEST_MARGIN_KM = float(os.environ.get("INGEST_MARGIN_KM", "10"))
+
+# 2つの範囲を囲む矩形がそれぞれの面積の和のこの倍数以下なら1つのファイルにまとめる
+CLUSTER_MAX_GROWTH = float(os.environ.get("INGEST_CLUSTER_MAX_GROWTH", "2"))
+
+# 切り出し結果のチャンク・圧縮設定
+CHUNK_SHAPE = (256, 256)
+COMPRESSION_LEVEL = 4
+
+LAT_PATH = 'Geometry_data/Latitude'
+LON_PATH = 'Geometry_data/Longitude'
+
+
+def farm_region(lat, lon, margin_km=INGEST_MARGIN_KM):
+    """
+    圃場の座標とマージンから切り出し範囲を求める
+
+    Returns:
+        (lat_min, lat_max, lon_min, lon_max)
+    """
+    margin_deg = margin_km * 0.01
+    return lat - margin_deg, lat + margin_deg, lon - margin_deg, lon + margin_deg
+
+
+def registered_farms():
+    """
+    Neo4jに登録済みの圃場の座標
+
+    Neo4jに接続できない場合は既定の圃場（save_weather.DEFAULT_FARM）のみ返す。
+
+    Returns:
+        [(緯度, 経度), ...]
+    """
+    from save_weather import DEFAULT_FARM, NEO4J_AVAILABLE, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+
+    farms = [(DEFAULT_FARM["latitude"], DEFAULT_FARM["longitude"])]
+    if not NEO4J_AVAILABLE:
+        return farms
+
+    from neo4j import GraphDatabase
+
+    try:
+        with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
+            records, _, _ = driver.execute_query(
+                "MATCH (f:Farm) WHERE f.latitude IS NOT NULL AND f.longitude IS NOT NULL "
+                "RETURN f.latitude AS lat, f.longitude AS lon"
+            )
+    except Exception as e:
+        print(f"⚠️  登録済み圃場を取得できませんでした（既定の圃場のみ切り出します）: {e}", file=sys.stderr)
+        return farms
+
+    return list(dict.fromkeys(farms + [(record["lat"], record["lon"]) for record in records]))
+
+
+def chunk_shape(shape):
+    """データセットの形状に収まるチャンク形状"""
+    return tuple(min(size, chunk) for size, chunk in zip(shape, CHUNK_SHAPE + shape[2:]))
+
+
+def window_area(window):
+    """範囲 (r0, r1, c0, c1)（両端を含む）のピクセル数"""
+    r0, r1, c0, c1 = window
+    return (r1 - r0 + 1) * (c1 - c0 + 1)
+
+
+def window_union(a, b):
+    """2つの範囲を囲む範囲"""
+    return min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+
+
+def cluster_windows(windows, max_growth=CLUSTER_MAX_GROWTH):
+    """
+    近い範囲どうしをまとめる
+
+    2つの範囲を囲む矩形の面積がそれぞれの面積の和の max_growth 倍以下なら
+    1つにまとめる（重なる範囲は必ずまとまる）。離れた圃場の範囲は別のまま残す。
+
+    Args:
+        windows: [(r0, r1, c0, c1), ...]（両端を含む）
+        max_growth: まとめる面積の上限（倍）
+
+    Returns:
+        まとめた範囲のリスト（左上から順）
+    """
+    clusters = []
+    for window in sorted(windows):
+        for i, cluster in enumerate(clusters):
+            union = window_union(cluster, window)
+            if window_area(union) <= max_growth * (window_area(cluster) + window_area(window)):
+                clusters[i] = union
+                break
+        else:
+            clusters.append(tuple(window))
+
+    # まとめて広がった範囲どうしがさらにまとまる場合は繰り返す
+    if len(clusters) < len(windows):
+        return cluster_windows(clusters, max_growth)
+    return clusters
+
+
+def tile_path(dest_path, tile):
+    """切り出したタイルの書き出し先（0番目は dest_path）"""
+    dest_path = Path(dest_path)
+    return dest_path.with_name(tile_name(dest_path.name, tile))
+
+
+def image_shape(hdf_file, grid_shape):
+    """Geometry_data 以外で最も大きい2次元以上のデータセットの形状（画像の形状）"""
+    shapes = []
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset) and obj.ndim >= 2 \
+                and not name.startswith(('Geometry_data/', f'{OVERVIEW_GROUP}/')):
+            shapes.append(obj.shape[:2])
+
+    hdf_file.visititems(visit)
+    return max(shapes, key=lambda shape: shape[0] * shape[1], default=grid_shape)
+
+
+def copy_attrs(source, dest):
+    for key, value in source.attrs.items():
+        dest.attrs[key] = value
+
+
+def subset_hdf5(src_path, dest_path, regions):
+    """
+    SGLI形式のHDF5を範囲で切り出して書き出す
+
+    近い範囲は1つのファイルにまとめ、離れた範囲はそれぞれ緯度経度グリッドを
+    持つ別のファイル（tile_path）に書き出す。緯度経度グリッドが画像より粗い
+    場合（Grid_interval）は、格子点と画像ピクセルの対応が保たれるよう格子点の
+    境界で切り出す。
+
+    Args:
+        src_path: 元のHDF5ファイル
+        dest_path: 書き出し先（2つ目以降は *_T1.h5 …）
+        regions: [(lat_min, lat_max, lon_min, lon_max), ...]
+
+    Returns:
+        [(書き出したファイル, 範囲 [lon_min, lat_min, lon_max, lat_max]), ...]
+        （範囲がグラニュール外、または緯度経度グリッドがない場合は []）
+    """
+    if not H5PY_AVAILABLE:
+        raise ImportError("h5pyがインストールされていません")
+
+    with h5py.File(src_path, 'r') as src:
+        if LAT_PATH not in src or LON_PATH not in src:
+            return []
+
+        lat_grid = src[LAT_PATH][:]
+        lon_grid = src[LON_PATH][:]
+        index = GeoIndex.build(lat_grid, lon_grid)
+
+        grid_rows, grid_cols = index.shape
+        image_rows, image_cols = image_shape(src, index.shape)
+        row_step, col_step = grid_interval(src[LAT_PATH], index.shape, (image_rows, image_cols))
+
+        # 読み込み時は前後1格子分広げて画像ピクセルを取るため、切り出しにも含める
+        windows = []
+        for region in regions:
+            window = index.bbox_window(*region)
+            if window:
+                r0, r1, c0, c1 = window
+                windows.append((max(0, r0 - 1), min(grid_rows - 1, r1 + 1),
+                                max(0, c0 - 1), min(grid_cols - 1, c1 + 1)))
+
+        tiles = []
+        for tile, (r0, r1, c0, c1) in enumerate(cluster_windows(windows)):
+            grid_window = (slice(r0, r1 + 1), slice(c0, c1 + 1))
+            pixel_window = (
+                slice(r0 * row_step, min(image_rows, r1 * row_step + 1)),
+                slice(c0 * col_step, min(image_cols, c1 * col_step + 1)),
+            )
+            path = tile_path(dest_path, tile)
+            write_hdf5_subset(src, path, (grid_rows, grid_cols), (image_rows, image_cols),
+                              grid_window, pixel_window, {
+                                  'Subset_source': Path(src_path).name,
+                                  'Subset_grid_window': np.array([r0, r1, c0, c1]),
+                              })
+
+            lats = lat_grid[grid_window]
+            lons = lon_grid[grid_window]
+            tiles.append((path, [float(np.nanmin(lons)), float(np.nanmin(lats)),
+                                 float(np.nanmax(lons)), float(np.nanmax(lats))]))
+
+    return tiles
+
+
+def write_hdf5_subset(src, dest_path, grid_shape, image_shape, grid_window, pixel_window, attrs):
+    """
+    開いたHDF5の範囲を書き出す（緯度経度グリッドは grid_window、画像は pixel_window）
+
+    1次元の係数などはそのまま複製し、オーバービューは切り出し後の画像から作り直す。
+    attrs はルートに追加する属性。
+    """
+    with h5py.File(dest_path, 'w') as dest:
+        copy_attrs(src, dest)
+        for key, value in attrs.items():
+            dest.attrs[key] = value
+
+        def visit(name, obj):
+            # オーバービューは切り出し後の画像から作り直す
+            if name == OVERVIEW_GROUP or name.startswith(f'{OVERVIEW_GROUP}/'):
+                return
+
+            if isinstance(obj, h5py.Group):
+                copy_attrs(obj, dest.require_group(name))
+                return
+
+            if obj.shape[:2] == grid_shape and name.startswith('Geometry_data/'):
+                data = obj[grid_window]
+            elif obj.ndim >= 2 and obj.shape[:2] == image_shape:
+                data = obj[pixel_window]
+            else:
+                # 1次元の係数などはそのまま複製
+                src.copy(obj, dest, name=name)
+                return
+
+            ds = dest.create_dataset(
+                name, data=data,
+                chunks=chunk_shape(data.shape),
+                compression='gzip', compression_opts=COMPRESSION_LEVEL, shuffle=True
+            )
+            copy_attrs(obj, ds)
+
+        src.visititems(visit)
+
+        for data_path in image_datasets(dest):
+            write_overviews(dest, data_path)
+
+
+def subset_geotiff(src_path, dest_path, regions):
+    """
+    GeoTIFF（緯度経度座標系）を範囲で切り出し、タイル分割・圧縮して書き出す
+
+    近い範囲は1つのファイルにまとめ、離れた範囲は別のファイル（tile_path）に書き出す。
+
+    Returns:
+        [(書き出したファイル, 範囲 [lon_min, lat_min, lon_max, lat_max]), ...]（範囲外の場合は []）
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("rasterioがインストールされていません")
+
+    with rasterio.open(src_path) as src:
+        full = Window(0, 0, src.width, src.height)
+        windows = []
+        for lat_min, lat_max, lon_min, lon_max in regions:
+            try:
+                window = from_bounds(lon_min, lat_min, lon_max, lat_max, src.transform)
+                window = window.round_offsets().round_lengths().intersection(full)
+            except WindowError:
+                continue
+            windows.append((int(window.row_off), int(window.row_off + window.height) - 1,
+                            int(window.col_off), int(window.col_off + window.width) - 1))
+
+        tiles = []
+        for tile, (r0, r1, c0, c1) in enumerate(cluster_windows(windows)):
+            window = Window(c0, r0, c1 - c0 + 1, r1 - r0 + 1)
+            path = tile_path(dest_path, tile)
+            write_geotiff_subset(src, src_path, path, window)
+
+            left, bottom, right, top = window_bounds(window, src.transform)
+            tiles.append((path, [left, bottom, right, top]))
+
+    return tiles
+
+
+def write_geotiff_subset(src, src_path, dest_path, window):
+    """開いたGeoTIFFの範囲をタイル分割・DEFLATE圧縮して書き出す"""
+    data = src.read(window=window)
+    transform = src.window_transform(window)
+
+    profile = src.profile.copy()
+    profile.update(
+        driver='GTiff', width=int(window.width), height=int(window.height), transform=transform,
+        tiled=True, blockxsize=256, blockysize=256, compress='deflate',
+        predictor=3 if np.dtype(src.dtypes[0]).kind == 'f' else 2,
+    )
+    if window.width < 256 or window.height < 256:
+        # タイルより小さい切り出しはストリップのまま書き出す
+        profile.update(tiled=False)
+        profile.pop('blockxsize')
+        profile.pop('blockysize')
+
+    with rasterio.open(dest_path, 'w', **profile) as dest:
+        dest.write(data)
+        dest.update_tags(**src.tags(), SUBSET_SOURCE=Path(src_path).name)
+
+
+def subset_granule(src_path, dest_path, regions):
+    """
+    拡張子に応じてHDF5・GeoTIFFを切り出す
+
+    Returns:
+        [(書き出したファイル, 範囲), ...]（範囲外・対応していない形式は []）
+    """
+    suffix = Path(src_path).suffix.lower()
+    if suffix in ('.h5', '.he5', '.hdf5'):
+        return subset_hdf5(src_path, dest_path, regions)
+    if suffix in ('.tif', '.tiff'):
+        return subset_geotiff(src_path, dest_path, regions)
+    return []
+
+
+def remove_tiles(dest_path):
+    """書き出し途中のタイルを削除"""
+    tile = 0
+    while tile_path(dest_path, tile).exists():
+        tile_path(dest_path, tile).unlink()
+        tile += 1
+
+
+def ingest_file(path, farms, margin_km=INGEST_MARGIN_KM, delete_source=False, output_dir=None):
+    """
+    ファイルを圃場周辺に切り出す（グラニュール保存領域を使わない場合）
+
+    Args:
+        path: グラニュールのパス
+        farms: [(緯度, 経度), ...]
+        margin_km: 圃場の周囲に含めるマージン（km）
+        delete_source: 切り出し結果で元ファイルを置き換える
+        output_dir: 置き換えない場合の書き出し先（省略時は元ファイルと同じ場所に *_subset）
+
+    Returns:
+        切り出したファイルのパスのリスト（離れた圃場は *_T1 … の別ファイル、切り出せない場合は []）
+    """
+    path = Path(path)
+    if delete_source:
+        dest = path.with_name(f"{path.stem}.subset{path.suffix}")
+    else:
+        dest = Path(output_dir or path.parent) / f"{path.stem}_subset{path.suffix}"
+
+    try:
+        tiles = subset_granule(path, dest, [farm_region(lat, lon, margin_km) for lat, lon in farms])
+    except Exception:
+        remove_tiles(dest)
+        raise
+
+    paths = [tile for tile, _ in tiles]
+    if delete_source:
+        for tile, written in enumerate(paths):
+            os.replace(written, tile_path(path, tile))
+        paths = [tile_path(path, tile) for tile in range(len(paths))]
+    return paths
+
+
+def ingest_granule(store, product_id, farms, margin_km=INGEST_MARGIN_KM, delete_source=False):
+    """
+    保存領域のグラニュールを圃場周辺に切り出して置き換える
+
+    既に切り出し済みの場合は残してある元のグラニュールから切り出し直す。
+    離れた圃場の切り出しはタイルとして保存領域に索引する（GranuleStore.replace_tiles）。
+
+    Args:
+        store: GranuleStore
+        product_id: プロダクトID
+        farms: [(緯度, 経度), ...]
+        margin_km: 圃場の周囲に含めるマージン（km）
+        delete_source: 元のグラニュールを削除する
+
+    Returns:
+        切り出した各タイルの範囲 [[lon_min, lat_min, lon_max, lat_max], ...]（切り出せない場合は []）
+    """
+    found = store.get(product_id)
+    if found is None:
+        return []
+
+    source = store.source(product_id) or found[0]
+    dest = store.incoming_dir / f"{source.stem}.subset{source.suffix}"
+
+    try:
+        tiles = subset_granule(source, dest, [farm_region(lat, lon, margin_km) for lat, lon in farms])
+    except Exception as e:
+        remove_tiles(dest)
+        print(f"✗ 切り出しエラー ({product_id}): {e}", file=sys.stderr)
+        return []
+
+    if not tiles:
+        return []
+
+    before = source.stat().st_size
+    stored = store.replace_tiles(product_id, tiles, keep_source=not delete_source)
+    after = sum(path.stat().st_size for path in stored)
+    print(f"✓ 切り出し: {product_id} ({before / 1024 / 1024:.1f} MB → {after / 1024:.0f} KB、"
+          f"{len(stored)} ファイル)")
+    return [bbox for _, bbox in tiles]
+
+
+def parse_farm(value):
+    """"緯度,経度" を (緯度, 経度) に変換"""
+    lat, lon = value.split(',')
+    return float(lat), float(lon)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="グラニュールを圃場周辺に切り出して圧縮保存")
+    parser.add_argument("files", nargs="+", help="HDF5・GeoTIFFファイル")
+    parser.add_argument("--farm", type=parse_farm, action="append",
+                       help="圃場の座標 緯度,経度（複数指定可、省略時はNeo4jの登録済み圃場）")
+    parser.add_argument("--margin-km", type=float, default=INGEST_MARGIN_KM,
+                       help=f"圃場の周囲に含めるマージン（km、デフォルト: {INGEST_MARGIN_KM:g}）")
+    parser.add_argument("--delete-source", action="store_true",
+                       help="切り出し結果で元ファイルを置き換える")
+    parser.add_argument("--output-dir", type=str,
+                       help="置き換えない場合の書き出し先（デフォルト: 元ファイルと同じ場所）")
+
+    args = parser.parse_args()
+
+    farms = args.farm or registered_farms()
+    failed = False
+
+    for file_path in args.files:
+        before = Path(file_path).stat().st_size
+        paths = ingest_file(file_path, farms, args.margin_km, args.delete_source, args.output_dir)
+        if not paths:
+            print(f"⚠️  切り出せませんでした（圃場が範囲外、または形式が未対応）: {file_path}", file=sys.stderr)
+            failed = True
+            continue
+        for dest in paths:
+            print(f"✓ {dest} ({before / 1024 / 1024:.1f} MB → {dest.stat().st_size / 1024:.0f} KB)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
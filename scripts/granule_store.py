@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Granule Store
+圃場・プロダクト間で共有するグラニュールの保存領域（内容アドレス方式）
+
+グラニュールは内容のSHA-256で data/granules/objects/ に1つだけ保存し、
+プロダクトID・観測期間・フットプリントで索引する（SQLite）。
+data/geotiff/ にはプロダクト名でハードリンクを置くため、後段の処理は
+従来どおりファイル名で読める。取得処理は圃場ごとに保存済みのグラニュールを
+引き当て、ないものだけをダウンロードする。
+
+使い方:
+    # 保存件数と使用容量を表示
+    python scripts/granule_store.py
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+BASE_DIR = Path(__file__).parent.parent
+STORE_DIR = BASE_DIR / "data" / "granules"
+INDEX_PATH = BASE_DIR / "data" / "metadata" / "granule_store.db"
+
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    suffix TEXT NOT NULL,
+    stored_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS granules (
+    product_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    name TEXT NOT NULL,
+    product_type TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    lon_min REAL,
+    lat_min REAL,
+    lon_max REAL,
+    lat_max REAL,
+    source_sha256 TEXT,
+    download_url TEXT,
+    data_path TEXT
+);
+CREATE INDEX IF NOT EXISTS granules_footprint ON granules (lon_min, lon_max, lat_min, lat_max);
+CREATE TABLE IF NOT EXISTS tiles (
+    product_id TEXT NOT NULL REFERENCES granules (product_id),
+    tile INTEGER NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    lon_min REAL,
+    lat_min REAL,
+    lon_max REAL,
+    lat_max REAL,
+    PRIMARY KEY (product_id, tile)
+);
+CREATE INDEX IF NOT EXISTS tiles_sha256 ON tiles (sha256);
+"""
+
+GRANULE_COLUMNS = (
+    "product_id", "sha256", "name", "product_type", "start_time", "end_time",
+    "lon_min", "lat_min", "lon_max", "lat_max", "source_sha256", "download_url", "data_path",
+)
+
+# 後から追加した列（既存の索引には ALTER TABLE で追加する）
+ADDED_COLUMNS = {"download_url": "TEXT", "data_path": "TEXT"}
+
+
+def tile_name(name, tile):
+    """タイルのファイル名（0番目は元の名前、以降は *_T1.h5 のように番号を付ける）"""
+    if tile == 0:
+        return name
+    path = Path(name)
+    return f"{path.stem}_T{tile}{path.suffix}"
+
+
+def contains_bbox(footprint, bbox):
+    """フットプリント [lon_min, lat_min, lon_max, lat_max] が範囲を含むか"""
+    return footprint[0] <= bbox[0] and footprint[1] <= bbox[1] \
+        and footprint[2] >= bbox[2] and footprint[3] >= bbox[3]
+
+
+def content_hash(path):
+    """ファイル内容のSHA-256（16進）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_file(source, dest):
+    """
+    source を dest にハードリンク（別ファイルシステムの場合はコピー）
+
+    既に同じファイルを指している場合は何もしない。
+    """
+    source, dest = Path(source), Path(dest)
+    if dest.exists() and os.path.samefile(source, dest):
+        return dest
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + '.link')
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, dest)
+    return dest
+
+
+class GranuleStore:
+    """内容アドレス方式のグラニュール保存領域"""
+
+    def __init__(self, root=STORE_DIR, index_path=INDEX_PATH):
+        """
+        Args:
+            root: 保存先ディレクトリ
+            index_path: 索引（SQLite）ファイルのパス
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.incoming_dir = self.root / "incoming"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.index_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(granules)")}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE granules ADD COLUMN {column} {column_type}")
+        self.conn.commit()
+
+    def object_path(self, sha256, suffix):
+        """内容ハッシュに対応する保存パス"""
+        return self.objects_dir / sha256[:2] / f"{sha256}{suffix}"
+
+    def _store_blob(self, path):
+        """ファイルを内容ハッシュの保存パスに移動（保存済みなら取り込み元を削除）"""
+        path = Path(path)
+        sha256 = content_hash(path)
+        stored = self.object_path(sha256, path.suffix)
+
+        if stored.exists():
+            if not os.path.samefile(path, stored):
+                path.unlink()
+        else:
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(path, stored)
+            except OSError:
+                shutil.move(str(path), str(stored))
+
+        self.conn.execute(
+            "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)",
+            (sha256, stored.stat().st_size, path.suffix, datetime.now().isoformat())
+        )
+        return sha256, stored
+
+    def put(self, path, product_id, bbox=None, start_time=None, end_time=None, product_type=None,
+            name=None, download_url=None, data_path=None):
+        """
+        グラニュールを保存して索引に登録
+
+        同じ内容が保存済みなら取り込み元を削除して既存のものを使う。
+        ダウンロード元（URL・G-Portalのデータパス）は、元のグラニュールを削除した
+        後に切り出し直すときの再ダウンロードに使う。
+
+        Args:
+            path: 取り込むファイル（保存領域に移動される）
+            product_id: プロダクトID
+            bbox: フットプリント [lon_min, lat_min, lon_max, lat_max]
+            start_time, end_time: 観測期間（ISO 8601）
+            product_type: プロダクトタイプ
+            name: data/geotiff/ に置くときのファイル名（省略時は取り込み元の名前）
+            download_url: HTTP(S)のダウンロードURL
+            data_path: G-Portalのデータパス
+
+        Returns:
+            Path: 保存先のパス
+        """
+        path = Path(path)
+        bbox = bbox or [None] * 4
+
+        # 置き換える内容（切り出し結果・元のグラニュール・タイル）は参照がなくなれば削除する
+        row = self.conn.execute(
+            "SELECT sha256, source_sha256 FROM granules WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        previous = (set(row) - {None} if row else set()) | self._tile_hashes(product_id)
+
+        with self.conn:
+            sha256, stored = self._store_blob(path)
+            self.conn.execute("DELETE FROM tiles WHERE product_id = ?", (product_id,))
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO granules ({', '.join(GRANULE_COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (product_id, sha256, name or path.name, product_type, start_time, end_time, *bbox,
+                 download_url, data_path)
+            )
+
+        self._remove_unreferenced(previous - {sha256})
+        return stored
+
+    def replace(self, path, product_id, bbox=None, keep_source=True):
+        """
+        グラニュールの内容を切り出し結果・形式の変換結果などで置き換え
+
+        Args:
+            path: 新しい内容のファイル（保存領域に移動される）
+            product_id: 保存済みのプロダクトID
+            bbox: 新しい内容のフットプリント [lon_min, lat_min, lon_max, lat_max]
+                  （省略時は現在のフットプリントのまま）
+            keep_source: 元の内容を残すか（残した場合は source() で取得できる）
+
+        Returns:
+            Path: 保存先のパス
+        """
+        return self.replace_tiles(product_id, [(path, bbox)], keep_source)[0]
+
+    def replace_tiles(self, product_id, tiles, keep_source=True):
+        """
+        グラニュールの内容を1つ以上のタイル（離れた圃場ごとの切り出し結果）で置き換え
+
+        0番目のタイルをグラニュールの内容（get・link）とし、フットプリントは
+        全タイルを囲む範囲にする。2つ以上の場合は各タイルとそのフットプリントを
+        tiles に索引し、contains・find・link はタイル単位で判定する。
+
+        Args:
+            product_id: 保存済みのプロダクトID
+            tiles: [(ファイル, フットプリント), ...]（ファイルは保存領域に移動される。
+                   1つだけの場合はフットプリント省略時に現在のフットプリントのまま）
+            keep_source: 元の内容を残すか（残した場合は source() で取得できる）
+
+        Returns:
+            [Path, ...]: 各タイルの保存先のパス
+        """
+        row = self.conn.execute(
+            "SELECT sha256, source_sha256, lon_min, lat_min, lon_max, lat_max FROM granules "
+            "WHERE product_id = ?",
+            (product_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"保存されていないプロダクトです: {product_id}")
+
+        previous = {row[0]} | self._tile_hashes(product_id)
+        bboxes = [row[2:] if bbox is None else bbox for _, bbox in tiles]
+        bbox = bboxes[0] if len(bboxes) == 1 else [
+            min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes),
+        ]
+
+        # 切り出しを繰り返しても、元の内容は最初のグラニュールを指す
+        source_sha256 = row[1] or row[0]
+        with self.conn:
+            stored = [self._store_blob(path) for path, _ in tiles]
+            self.conn.execute(
+                "UPDATE granules SET sha256 = ?, lon_min = ?, lat_min = ?, lon_max = ?, lat_max = ?, "
+                "source_sha256 = ? WHERE product_id = ?",
+                (stored[0][0], *bbox, source_sha256 if keep_source else None, product_id)
+            )
+            self.conn.execute("DELETE FROM tiles WHERE product_id = ?", (product_id,))
+            if len(stored) > 1:
+                self.conn.executemany(
+                    "INSERT INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(product_id, tile, sha256, *tile_bbox)
+                     for tile, ((sha256, _), tile_bbox) in enumerate(zip(stored, bboxes))]
+                )
+
+        self._remove_unreferenced((previous | {source_sha256}) - {sha256 for sha256, _ in stored})
+        return [path for _, path in stored]
+
+    def _tile_hashes(self, product_id):
+        """グラニュールのタイルの内容ハッシュ"""
+        return {sha256 for (sha256,) in self.conn.execute(
+            "SELECT sha256 FROM tiles WHERE product_id = ?", (product_id,)
+        )}
+
+    def _remove_unreferenced(self, sha256s):
+        """どのグラニュールからも参照されなくなった保存ファイルを削除"""
+        for sha256 in sha256s:
+            referenced = self.conn.execute(
+                "SELECT 1 FROM granules WHERE sha256 = ? OR source_sha256 = ? "
+                "UNION ALL SELECT 1 FROM tiles WHERE sha256 = ? LIMIT 1",
+                (sha256, sha256, sha256)
+            ).fetchone()
+            if referenced:
+                continue
+
+            row = self.conn.execute("SELECT suffix FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                continue
+            self.object_path(sha256, row[0]).unlink(missing_ok=True)
+            with self.conn:
+                self.conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+
+    def source(self, product_id):
+        """
+        切り出し前の元のグラニュール
+
+        Returns:
+            Path またはNone（切り出していない・元を削除した場合）
+        """
+        row = self.conn.execute(
+            "SELECT g.source_sha256, b.suffix FROM granules g JOIN blobs b ON b.sha256 = g.source_sha256 "
+            "WHERE g.product_id = ?",
+            (product_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stored = self.object_path(row[0], row[1])
+        return stored if stored.exists() else None
+
+    def contains(self, product_id, bbox):
+        """
+        保存済みグラニュールのフットプリント（タイルに分けた場合はいずれかのタイル）が範囲を含むか
+
+        フットプリントが記録されていない場合は含むとみなす。
+        """
+        row = self.conn.execute(
+            "SELECT lon_min, lat_min, lon_max, lat_max FROM granules WHERE product_id = ?",
+            (product_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        if None in row:
+            return True
+
+        tiles = self.tiles(product_id)
+        if tiles:
+            return any(contains_bbox(footprint, bbox) for _, _, footprint in tiles)
+        return contains_bbox(row, bbox)
+
+    def tiles(self, product_id):
+        """
+        タイルに分けて保存したグラニュールのタイル
+
+        Returns:
+            [(保存先のパス, ファイル名, フットプリント), ...]（タイルに分けていない場合は []）
+        """
+        rows = self.conn.execute(
+            "SELECT t.tile, t.sha256, b.suffix, g.name, t.lon_min, t.lat_min, t.lon_max, t.lat_max "
+            "FROM tiles t JOIN blobs b USING (sha256) JOIN granules g USING (product_id) "
+            "WHERE t.product_id = ? ORDER BY t.tile",
+            (product_id,)
+        ).fetchall()
+        return [
+            (self.object_path(sha256, suffix), tile_name(name, tile), list(footprint))
+            for tile, sha256, suffix, name, *footprint in rows
+        ]
+
+    def get(self, product_id):
+        """
+        プロダクトIDに対応する保存済みグラニュール
+
+        Returns:
+            (保存先のパス, ファイル名) またはNone（未保存・ファイル消失）
+        """
+        row = self.conn.execute(
+            "SELECT g.sha256, b.suffix, g.name FROM granules g JOIN blobs b USING (sha256) "
+            "WHERE g.product_id = ?",
+            (product_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stored = self.object_path(row[0], row[1])
+        if not stored.exists():
+            return None
+        return stored, row[2]
+
+    def linked_product(self, path):
+        """
+        data/geotiff/ などに置いたリンクが指す保存済みグラニュールのプロダクトID
+
+        Returns:
+            プロダクトID（保存領域のファイルでない場合はNone）
+        """
+        path = Path(path)
+        rows = self.conn.execute("SELECT product_id FROM granules WHERE name = ?", (path.name,)).fetchall()
+        for (product_id,) in rows:
+            found = self.get(product_id)
+            if found and path.exists() and os.path.samefile(found[0], path):
+                return product_id
+        return None
+
+    def link(self, product_id, dest_dir, bbox=None):
+        """
+        保存済みグラニュールを dest_dir にファイル名でリンク
+
+        タイルに分けて保存した場合は全タイルをリンクする。
+
+        Args:
+            product_id: プロダクトID
+            dest_dir: リンク先のディレクトリ
+            bbox: 指定するとこの範囲を含むタイルのリンクを返す
+
+        Returns:
+            Path: リンクのパス（範囲を含むタイルがなければ0番目、未保存の場合はNone）
+        """
+        found = self.get(product_id)
+        if found is None:
+            return None
+
+        stored, name = found
+        linked = link_file(stored, Path(dest_dir) / name)
+
+        selected = None
+        for tile_path, tile_file, footprint in self.tiles(product_id):
+            if not tile_path.exists():
+                continue
+            tile_link = link_file(tile_path, Path(dest_dir) / tile_file)
+            if selected is None and bbox is not None and contains_bbox(footprint, bbox):
+                selected = tile_link
+        return selected or linked
+
+    def find(self, bbox, start_time=None, end_time=None, product_type=None):
+        """
+        範囲を含むフットプリントの保存済みグラニュールを検索
+
+        Args:
+            bbox: [lon_min, lat_min, lon_max, lat_max]
+            start_time, end_time: 観測期間（ISO 8601、省略時は期間で絞らない）
+            product_type: プロダクトタイプ
+
+        Returns:
+            グラニュール辞書のリスト（観測開始順）
+        """
+        lon_min, lat_min, lon_max, lat_max = bbox
+        # タイルに分けたグラニュールは、全体の範囲に加えていずれかのタイルが含むこと
+        sql = (
+            f"SELECT {', '.join(GRANULE_COLUMNS)} FROM granules g "
+            "WHERE lon_min <= ? AND lon_max >= ? AND lat_min <= ? AND lat_max >= ? "
+            "AND (NOT EXISTS (SELECT 1 FROM tiles t WHERE t.product_id = g.product_id) "
+            "OR EXISTS (SELECT 1 FROM tiles t WHERE t.product_id = g.product_id "
+            "AND t.lon_min <= ? AND t.lon_max >= ? AND t.lat_min <= ? AND t.lat_max >= ?))"
+        )
+        args = [lon_min, lon_max, lat_min, lat_max] * 2
+        if product_type is not None:
+            sql += " AND product_type = ?"
+            args.append(product_type)
+        if start_time is not None:
+            sql += " AND end_time >= ?"
+            args.append(start_time)
+        if end_time is not None:
+            sql += " AND start_time <= ?"
+            args.append(end_time)
+
+        rows = self.conn.execute(sql + " ORDER BY start_time, product_id", args).fetchall()
+        return [dict(zip(GRANULE_COLUMNS, row)) for row in rows]
+
+    def resolve(self, product_ids):
+        """
+        保存済みと未保存のプロダクトIDに振り分け（重複は1つにまとめる）
+
+        Returns:
+            (保存済み {product_id: (保存先のパス, ファイル名)}, 未保存のプロダクトIDのリスト)
+        """
+        present, missing = {}, []
+        for product_id in dict.fromkeys(product_ids):
+            found = self.get(product_id)
+            if found is None:
+                missing.append(product_id)
+            else:
+                present[product_id] = found
+        return present, missing
+
+    def summary(self):
+        """グラニュール数・保存ファイル数・使用容量（バイト）"""
+        granules = self.conn.execute("SELECT COUNT(*) FROM granules").fetchone()[0]
+        blobs, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"granules": granules, "blobs": blobs, "bytes": size}
+
+    def close(self):
+        """接続を閉じる"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="グラニュール保存領域の確認")
+    parser.add_argument("--root", type=str, default=str(STORE_DIR),
+                       help="保存先ディレクトリ（デフォルト: data/granules）")
+    parser.add_argument("--index", type=str, default=str(INDEX_PATH),
+                       help="索引ファイルのパス")
+
+    args = parser.parse_args()
+
+    with GranuleStore(args.root, args.index) as store:
+        summary = store.summary()
+
+    print(f"保存領域: {args.root}")
+    print(f"  グラニュール: {summary['granules']} 件")
+    print(f"  保存ファイル: {summary['blobs']} 件（{summary['bytes'] / 1024 / 1024:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
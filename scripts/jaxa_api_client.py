@@ -14,10 +14,19 @@ import argparse
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
+from download_manager import DEFAULT_WORKERS, DownloadError, DownloadManager
+from granule_ingest import INGEST_MARGIN_KM, ingest_granule, registered_farms
+from granule_store import GranuleStore
+from product_catalog import ProductCatalog
+from raster_convert import convert_granule, create_compressed_dataset, write_overviews
+
 # .envファイルから環境変数を読み込み
 load_dotenv()
 
@@ -70,7 +79,85 @@ def get_gportal_credentials():
     return username, password
 
 
-def search_gcom_c_data_real(lat, lon, start_date, end_date, product_type="LST"):
+@lru_cache(maxsize=None)
+def gportal_dataset_id(product_type):
+    """
+    プロダクトタイプに対応するG-PortalのデータセットID（未対応はNone）
+
+    データセット辞書の取得はプロセス内で1回だけ行う。
+    """
+    datasets = gportal.datasets()
+
+    # プロダクトタイプに応じたデータセットID取得
+    dataset_mapping = {
+        "LST": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-LST"],
+        "NDVI": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-VGI"],  # VGIにNDVI含む
+        "VGI": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-VGI"],
+    }
+
+    return dataset_mapping.get(product_type)
+
+
+def geometry_bbox(geometry):
+    """GeoJSONジオメトリの範囲 [lon_min, lat_min, lon_max, lat_max]（取得できない場合はNone）"""
+    if not isinstance(geometry, dict) or not geometry.get("coordinates"):
+        return None
+
+    points = []
+
+    def collect(coordinates):
+        if coordinates and isinstance(coordinates[0], (int, float)):
+            points.append(coordinates[:2])
+        else:
+            for item in coordinates:
+                collect(item)
+
+    collect(geometry["coordinates"])
+    if not points:
+        return None
+
+    lons = [point[0] for point in points]
+    lats = [point[1] for point in points]
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+def product_record(product, bbox=None):
+    """
+    gportal のプロダクトオブジェクトをカタログ用の辞書に変換
+
+    Args:
+        product: プロダクトオブジェクト
+        bbox: フットプリントが取得できない場合に使う検索範囲
+
+    Returns:
+        {"product_id", "dataset", "start_time", "end_time", "bbox",
+         "download_url", "data_path", "properties"}
+    """
+    properties = getattr(product, 'properties', None) or {}
+
+    def prop(*keys):
+        for key in keys:
+            value = properties.get(key) if isinstance(properties, dict) else None
+            if value is None:
+                value = getattr(product, key, None)
+            if value is not None:
+                return value
+        return None
+
+    start_time = str(prop('start_time', 'startTime', 'beginPosition') or datetime.now().isoformat())
+    return {
+        "product_id": str(prop('product_name', 'productName', 'id', 'identifier')),
+        "dataset": prop('dataset_id', 'datasetId') or 'GCOM-C/SGLI',
+        "start_time": start_time,
+        "end_time": str(prop('end_time', 'endTime', 'endPosition') or start_time),
+        "bbox": geometry_bbox(getattr(product, 'geometry', None)) or bbox,
+        "download_url": product_download_url(product),
+        "data_path": getattr(product, 'data_path', None),
+        "properties": properties if isinstance(properties, dict) else {},
+    }
+
+
+def search_gcom_c_data_real(lat, lon, start_date, end_date, product_type="LST", bbox=None):
     """
     GCOM-C/SGLIデータを実際のG-Portal APIで検索
 
@@ -80,32 +167,23 @@ def search_gcom_c_data_real(lat, lon, start_date, end_date, product_type="LST"):
         start_date: 開始日 (YYYY-MM-DD)
         end_date: 終了日 (YYYY-MM-DD)
         product_type: プロダクトタイプ ("LST", "NDVI", "VGI" 等)
+        bbox: 検索範囲（省略時は座標周辺 ±0.5度）
 
     Returns:
-        検索結果のプロダクトリスト
+        プロダクト辞書（product_record）のイテレーター（検索できない場合はNone）
     """
     if not GPORTAL_AVAILABLE:
         return None
 
     try:
-        # データセット辞書を取得
-        datasets = gportal.datasets()
-
-        # プロダクトタイプに応じたデータセットID取得
-        dataset_mapping = {
-            "LST": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-LST"],
-            "NDVI": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-VGI"],  # VGIにNDVI含む
-            "VGI": datasets["GCOM-C/SGLI"]["LEVEL2"]["Land area"]["L2-VGI"],
-        }
-
-        dataset_id = dataset_mapping.get(product_type)
+        dataset_id = gportal_dataset_id(product_type)
 
         if not dataset_id:
             print(f"⚠️  未対応のプロダクトタイプ: {product_type}", file=sys.stderr)
             return None
 
         # バウンディングボックス設定（座標周辺 ±0.5度）
-        bbox = [lon - 0.5, lat - 0.5, lon + 0.5, lat + 0.5]
+        bbox = bbox or [lon - 0.5, lat - 0.5, lon + 0.5, lat + 0.5]
 
         print(f"\n🔍 G-Portal検索:")
         print(f"   プロダクト: GCOM-C/SGLI {product_type}")
@@ -121,17 +199,53 @@ def search_gcom_c_data_real(lat, lon, start_date, end_date, product_type="LST"):
             params={}
         )
 
-        # productsはgeneratorなのでリストに変換
-        products = list(res.products())
-        print(f"✓ {len(products)} 件のプロダクトが見つかりました")
-
-        return products
+        # productsはページ単位で取得するgeneratorなので、そのまま順に変換する
+        return (product_record(product, bbox) for product in res.products())
 
     except Exception as e:
         print(f"✗ G-Portal検索エラー: {e}", file=sys.stderr)
         return None
 
 
+def search_gcom_c_data_catalog(lat, lon, start_date, end_date, product_type="LST", catalog=None):
+    """
+    ローカルカタログを使ってGCOM-C/SGLIデータを検索
+
+    カタログに同期されていない期間だけG-Portalに問い合わせ、
+    結果はカタログの索引から返す。
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        start_date: 開始日 (date)
+        end_date: 終了日 (date)
+        product_type: プロダクトタイプ
+        catalog: ProductCatalog（省略時は既定のカタログ）
+
+    Returns:
+        プロダクト辞書のリスト（観測開始順）
+    """
+    bbox = [lon - 0.5, lat - 0.5, lon + 0.5, lat + 0.5]
+
+    def fetch(cell_bbox, gap_start, gap_end):
+        return search_gcom_c_data_real(
+            lat, lon,
+            gap_start.isoformat(), gap_end.isoformat(),
+            product_type, bbox=cell_bbox
+        )
+
+    own_catalog = catalog is None
+    catalog = catalog or ProductCatalog()
+    try:
+        products = catalog.search(product_type, bbox, start_date, end_date, fetch)
+    finally:
+        if own_catalog:
+            catalog.close()
+
+    print(f"✓ {len(products)} 件のプロダクトが見つかりました（カタログ）")
+    return products
+
+
 def search_gcom_c_data_mock(lat, lon, start_date, end_date, product_type="LST"):
     """
     GCOM-C/SGLIデータ検索のモック実装
@@ -178,7 +292,7 @@ def download_product_real(product, output_dir, username, password):
     実際のG-Portal APIでプロダクトをダウンロード
 
     Args:
-        product: プロダクトオブジェクト
+        product: プロダクトオブジェクト or カタログのプロダクト辞書
         output_dir: 出力ディレクトリ
         username: G-Portalユーザー名
         password: G-Portalパスワード
@@ -194,10 +308,19 @@ def download_product_real(product, output_dir, username, password):
         gportal.username = username
         gportal.password = password
 
-        print(f"\n📥 ダウンロード中: {product.id}")
+        if isinstance(product, dict):
+            # カタログのプロダクトはデータパスで指定する
+            if not product.get("data_path"):
+                print(f"✗ ダウンロード元が不明です: {product['product_id']}", file=sys.stderr)
+                return None
+            target, name = product["data_path"], product["product_id"]
+        else:
+            target, name = product, product.id
+
+        print(f"\n📥 ダウンロード中: {name}")
 
         # ダウンロード実行
-        downloaded_files = gportal.download([product], local_dir=str(output_dir))
+        downloaded_files = gportal.download([target], local_dir=str(output_dir))
 
         if downloaded_files:
             print(f"✓ ダウンロード完了: {downloaded_files[0]}")
@@ -210,6 +333,58 @@ def download_product_real(product, output_dir, username, password):
         return None
 
 
+def product_download_url(product):
+    """
+    プロダクトのHTTP(S)ダウンロードURL（取得できない場合はNone）
+
+    gportal のプロダクトオブジェクトと辞書（モック）の両方に対応する。
+    """
+    for key in ("download_url", "data_url"):
+        url = product.get(key) if isinstance(product, dict) else getattr(product, key, None)
+        if isinstance(url, str) and url.startswith(("http://", "https://")):
+            return url
+    return None
+
+
+def download_products_real(products, output_dir, username, password, workers=DEFAULT_WORKERS):
+    """
+    複数のプロダクトを並列にダウンロード
+
+    HTTP(S)のURLがあるプロダクトは DownloadManager で転送し（.part からの
+    再開・サイズ検証つき）、ないものは gportal の転送を同じ並列度で実行する。
+
+    Args:
+        products: プロダクトオブジェクト（またはカタログのプロダクト辞書）のリスト
+        output_dir: 出力ディレクトリ
+        username: G-Portalユーザー名
+        password: G-Portalパスワード
+        workers: 同時転送数
+
+    Returns:
+        ダウンロードしたファイルパスのリスト（products と同じ順、失敗はNone）
+    """
+    manager = DownloadManager(workers=workers, auth=(username, password))
+
+    def fetch(product):
+        url = product_download_url(product)
+        if url is None:
+            return download_product_real(product, output_dir, username, password)
+
+        dest = Path(output_dir) / Path(urlparse(url).path).name
+        print(f"\n📥 ダウンロード中: {dest.name}")
+        try:
+            path = manager.download(url, dest)
+        except DownloadError as e:
+            print(f"✗ ダウンロードエラー: {e}", file=sys.stderr)
+            return None
+
+        print(f"✓ ダウンロード完了: {path}")
+        return path
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(fetch, products))
+
+
 def download_product_mock(product, output_dir):
     """
     プロダクトダウンロードのモック実装
@@ -254,8 +429,8 @@ def download_product_mock(product, output_dir):
             lon_range = np.linspace(lon_center - 0.5, lon_center + 0.5, 100)
             lon_grid, lat_grid = np.meshgrid(lon_range, lat_range)
 
-            geo_group.create_dataset('Latitude', data=lat_grid)
-            geo_group.create_dataset('Longitude', data=lon_grid)
+            create_compressed_dataset(geo_group, 'Latitude', lat_grid)
+            create_compressed_dataset(geo_group, 'Longitude', lon_grid)
 
             # Image_dataグループ
             img_group = f.create_group('Image_data')
@@ -270,7 +445,7 @@ def download_product_mock(product, output_dir):
                 data = np.clip(data, 273.0, 320.0)  # 0℃～47℃
 
             # データセット作成
-            ds = img_group.create_dataset(dataset_type, data=data)
+            ds = create_compressed_dataset(img_group, dataset_type, data)
 
             # 属性追加
             if dataset_type == 'NDVI':
@@ -280,6 +455,9 @@ def download_product_mock(product, output_dir):
                 ds.attrs['description'] = 'Land Surface Temperature'
                 ds.attrs['units'] = 'Kelvin'
 
+            # 縮小読み込み用のオーバービュー
+            write_overviews(f, f'Image_data/{dataset_type}')
+
         print(f"✓ ダウンロード完了 (モック): {output_path}")
         return output_path
 
@@ -312,6 +490,17 @@ def extract_metadata(product, file_path, is_mock=False):
             "download_time": datetime.now().isoformat(),
             "source": "mock"
         }
+    elif isinstance(product, dict):
+        # カタログのプロダクトからメタデータ抽出
+        metadata = {
+            "product_id": product["product_id"],
+            "dataset": product["dataset"],
+            "observation_date": product["start_time"],
+            "bbox": product["bbox"],
+            "file_path": str(file_path),
+            "download_time": datetime.now().isoformat(),
+            "source": "gportal"
+        }
     else:
         # 実際のプロダクトからメタデータ抽出
         metadata = {
@@ -348,6 +537,245 @@ def save_metadata_json(metadata, metadata_dir):
     return json_path
 
 
+def has_download_source(product):
+    """プロダクトにダウンロード元（HTTP(S)のURLまたはG-Portalのデータパス）があるか"""
+    if not isinstance(product, dict):
+        return True
+    return bool(product_download_url(product) or product.get("data_path"))
+
+
+def stored_product(granule):
+    """
+    保存領域の索引（GranuleStore.find の結果）をプロダクト辞書に変換
+
+    保存時に記録したダウンロード元を引き継ぐ（記録がない場合はNone）。
+    """
+    return {
+        "product_id": granule["product_id"],
+        "dataset": "GCOM-C/SGLI",
+        "start_time": granule["start_time"],
+        "end_time": granule["end_time"],
+        "bbox": [granule[key] for key in ("lon_min", "lat_min", "lon_max", "lat_max")],
+        "download_url": granule.get("download_url"),
+        "data_path": granule.get("data_path"),
+    }
+
+
+def fetch_products_for_farms(farms, days, product_type="LST", use_mock=False, download=True,
+                             max_products=3, workers=DEFAULT_WORKERS, store=None,
+                             ingest=False, margin_km=INGEST_MARGIN_KM, delete_source=False):
+    """
+    複数の圃場についてプロダクトを検索し、ダウンロードとメタデータ保存まで行う
+
+    検索結果はプロダクトIDで重複を除き、グラニュール保存領域にないものだけを
+    ダウンロードする。同じシーンに含まれる圃場・同じデータセットのプロダクト
+    （NDVIとVGI）は1回の転送・1つのファイルを共有する。
+
+    Args:
+        farms: [(緯度, 経度), ...]
+        days: 過去何日分
+        product_type: プロダクトタイプ
+        use_mock: モックモード
+        download: ダウンロードするか
+        max_products: 実APIで圃場ごとにダウンロードする最大件数
+        workers: 実APIでの同時ダウンロード数
+        store: GranuleStore（省略時は既定の保存領域）
+        ingest: ダウンロードしたグラニュールを登録済みの全圃場の周辺に切り出す
+        margin_km: 切り出し時に圃場の周囲に含めるマージン（km）
+        delete_source: 切り出し後に元のグラニュールを削除する
+
+    Returns:
+        圃場ごとのメタデータリスト（farms と同じ順）
+
+    Raises:
+        RuntimeError: 実APIモードで認証情報が不足している場合
+    """
+    ensure_directories()
+
+    # 検索期間の設定
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days)
+
+    # モックモードまたは実APIモード
+    is_mock = use_mock or not GPORTAL_AVAILABLE
+    if is_mock:
+        if not use_mock:
+            print("\n⚠️  gportal-pythonが利用できないため、モックモードで実行します")
+    else:
+        # 認証情報取得
+        username, password = get_gportal_credentials()
+
+        if not username or not password:
+            raise RuntimeError("認証情報が不足しています")
+
+    own_store = store is None
+    store = store or GranuleStore()
+    catalog = None if is_mock else ProductCatalog()
+
+    try:
+        # 1. 圃場ごとに検索
+        farm_products = []
+        for lat, lon in farms:
+            if is_mock:
+                products = search_gcom_c_data_mock(
+                    lat, lon,
+                    start_date.isoformat(), end_date.isoformat(),
+                    product_type
+                )
+            else:
+                # 実API検索（カタログに同期されていない期間だけ問い合わせる）
+                products = search_gcom_c_data_catalog(
+                    lat, lon, start_date, end_date, product_type, catalog=catalog
+                )
+                if not products:
+                    # 検索できない場合は保存済みのグラニュールをフットプリントで引き当てる
+                    products = [
+                        stored_product(granule) for granule in store.find(
+                            [lon - 0.5, lat - 0.5, lon + 0.5, lat + 0.5],
+                            start_date.isoformat(), f"{end_date.isoformat()}T23:59:59",
+                            product_type
+                        )
+                    ]
+                products = products[:max_products]
+            farm_products.append(products or [])
+
+        if not download:
+            return [[] for _ in farms]
+
+        # 2. 重複を除き、保存領域にないものだけダウンロード
+        distinct = {product["product_id"]: product for products in farm_products for product in products}
+        present, missing = store.resolve(distinct)
+
+        resubset = []
+        if ingest:
+            # 切り出し済みのグラニュールが圃場を含まない場合は、元のグラニュールから
+            # 切り出し直す（元を削除している場合は再ダウンロード）
+            needed = {}
+            for (lat, lon), products in zip(farms, farm_products):
+                for product in products:
+                    needed.setdefault(product["product_id"], []).append((lat, lon))
+
+            for product_id in list(present):
+                if all(store.contains(product_id, [lon, lat, lon, lat]) for lat, lon in needed[product_id]):
+                    continue
+                if store.source(product_id):
+                    resubset.append(product_id)
+                elif is_mock or has_download_source(distinct[product_id]):
+                    missing.append(product_id)
+                else:
+                    # 元を削除済みでダウンロード元も記録されていない（保存領域の索引のみ）
+                    print(f"⚠️  元のグラニュールもダウンロード元もないため切り出し直せません: {product_id}"
+                          "（保存済みの切り出し範囲を使用）")
+                    continue
+                del present[product_id]
+
+        if present:
+            print(f"✓ 保存済みのグラニュールを使用: {len(present)} 件")
+
+        targets = [distinct[product_id] for product_id in missing]
+        if is_mock:
+            file_paths = [download_product_mock(product, store.incoming_dir) for product in targets]
+        else:
+            # 実ダウンロード（並列）
+            file_paths = download_products_real(targets, store.incoming_dir, username, password, workers)
+
+        for product, file_path in zip(targets, file_paths):
+            if file_path:
+                start_time = product.get("start_time") or product.get("observation_date")
+                store.put(
+                    file_path, product["product_id"],
+                    bbox=product.get("bbox"),
+                    start_time=start_time,
+                    end_time=product.get("end_time") or start_time,
+                    product_type=product_type,
+                    download_url=product_download_url(product),
+                    data_path=product.get("data_path")
+                )
+                resubset.append(product["product_id"])
+
+        downloaded = [product["product_id"] for product, file_path in zip(targets, file_paths) if file_path]
+        subset = set()
+        if ingest and resubset:
+            # 登録済みの全圃場（今回の圃場を含む）の周辺に切り出す（切り出し結果は変換済み）
+            ingest_farms = list(dict.fromkeys([tuple(farm) for farm in farms] + registered_farms()))
+            for product_id in resubset:
+                if ingest_granule(store, product_id, ingest_farms, margin_km, delete_source):
+                    subset.add(product_id)
+
+        # 切り出さずに使うダウンロードは保存領域の中で読み込み向けの形式に変換する
+        for product_id in downloaded:
+            if product_id not in subset:
+                convert_granule(store, product_id)
+
+        # 3. data/geotiff/ にリンクしてダウンロード状況を記録
+        paths = {}
+        for product_id in distinct:
+            paths[product_id] = store.link(product_id, DATA_DIR)
+            if catalog is not None:
+                if paths[product_id]:
+                    catalog.mark_downloaded(product_id, paths[product_id])
+                elif product_id in missing:
+                    catalog.mark_failed(product_id)
+
+        # 4. 圃場ごとにメタデータ抽出・保存（離れた圃場ごとに切り出した場合は圃場を含むタイル）
+        results = []
+        for (lat, lon), products in zip(farms, farm_products):
+            farm_results = []
+            for product in products:
+                file_path = paths[product["product_id"]]
+                if file_path:
+                    file_path = store.link(product["product_id"], DATA_DIR, [lon, lat, lon, lat])
+                    metadata = extract_metadata(product, file_path, is_mock=is_mock)
+                    save_metadata_json(metadata, METADATA_DIR)
+                    farm_results.append(metadata)
+            results.append(farm_results)
+
+        return results
+
+    finally:
+        if catalog is not None:
+            catalog.close()
+        if own_store:
+            store.close()
+
+
+def fetch_products(lat, lon, days, product_type="LST", use_mock=False, download=True, max_products=3,
+                   workers=DEFAULT_WORKERS, store=None, ingest=False, margin_km=INGEST_MARGIN_KM,
+                   delete_source=False):
+    """
+    プロダクトを検索し、ダウンロードとメタデータ保存まで行う
+
+    ワークフローから同一プロセスで呼び出すためのライブラリ関数。
+    保存済みのグラニュールは再ダウンロードしない（fetch_products_for_farms）。
+
+    Args:
+        lat: 緯度
+        lon: 経度
+        days: 過去何日分
+        product_type: プロダクトタイプ
+        use_mock: モックモード
+        download: ダウンロードするか
+        max_products: 実APIでダウンロードする最大件数
+        workers: 実APIでの同時ダウンロード数
+        store: GranuleStore（省略時は既定の保存領域）
+        ingest: ダウンロードしたグラニュールを圃場周辺に切り出す（granule_ingest）
+        margin_km: 切り出し時に圃場の周囲に含めるマージン（km）
+        delete_source: 切り出し後に元のグラニュールを削除する
+
+    Returns:
+        ダウンロードしたプロダクトのメタデータリスト
+
+    Raises:
+        RuntimeError: 実APIモードで認証情報が不足している場合
+    """
+    return fetch_products_for_farms(
+        [(lat, lon)], days, product_type,
+        use_mock=use_mock, download=download, max_products=max_products,
+        workers=workers, store=store,
+        ingest=ingest, margin_km=margin_km, delete_source=delete_source
+    )[0]
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="JAXA G-PortalからGCOM-C/SGLIデータを取得"
@@ -363,73 +791,28 @@ def main():
                        help="モックモードで実行（API未登録時のテスト用）")
     parser.add_argument("--download", action="store_true",
                        help="データをダウンロードする")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help=f"同時ダウンロード数（デフォルト: {DEFAULT_WORKERS}）")
 
     args = parser.parse_args()
 
-    # ディレクトリ作成
-    ensure_directories()
-
-    # 検索期間の設定
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=args.days)
-
     print("\n" + "=" * 70)
     print("JAXA G-Portal データ取得")
     print("=" * 70)
 
-    # モックモードまたは実APIモード
-    if args.mock or not GPORTAL_AVAILABLE:
-        if not args.mock:
-            print("\n⚠️  gportal-pythonが利用できないため、モックモードで実行します")
-
-        # モック検索
-        products = search_gcom_c_data_mock(
-            args.lat, args.lon,
-            start_date.isoformat(), end_date.isoformat(),
-            args.product
-        )
-
-        if products and args.download:
-            for product in products:
-                # モックダウンロード
-                file_path = download_product_mock(product, DATA_DIR)
-
-                # メタデータ抽出・保存
-                metadata = extract_metadata(product, file_path, is_mock=True)
-                save_metadata_json(metadata, METADATA_DIR)
-
-                # 結果出力
-                print(f"\n📄 取得データ:")
-                print(json.dumps(metadata, indent=2, ensure_ascii=False))
-
-    else:
-        # 認証情報取得
-        username, password = get_gportal_credentials()
-
-        if not username or not password:
-            print("\n❌ 認証情報が不足しています", file=sys.stderr)
-            sys.exit(1)
-
-        # 実API検索
-        products = search_gcom_c_data_real(
-            args.lat, args.lon,
-            start_date.isoformat(), end_date.isoformat(),
-            args.product
+    try:
+        results = fetch_products(
+            args.lat, args.lon, args.days, args.product,
+            use_mock=args.mock, download=args.download, workers=args.workers
         )
-
-        if products and args.download:
-            for product in products[:3]:  # 最大3件まで
-                # 実ダウンロード
-                file_path = download_product_real(product, DATA_DIR, username, password)
-
-                if file_path:
-                    # メタデータ抽出・保存
-                    metadata = extract_metadata(product, file_path, is_mock=False)
-                    save_metadata_json(metadata, METADATA_DIR)
-
-                    # 結果出力
-                    print(f"\n📄 取得データ:")
-                    print(json.dumps(metadata, indent=2, ensure_ascii=False))
+    except RuntimeError as e:
+        print(f"\n❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for metadata in results:
+        # 結果出力
+        print(f"\n📄 取得データ:")
+        print(json.dumps(metadata, indent=2, ensure_ascii=False))
 
     print("\n" + "=" * 70)
     print("✓ 処理完了")
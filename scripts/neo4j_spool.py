@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Neo4j Write-Ahead Spool
+Neo4jへの書き込みを先にローカルのSQLiteキューへ追記するスプール
+
+ワークフローは観測をスプールに追記した時点で保存完了とみなし、
+Neo4jへの反映はドレイナーがバッチ単位（UNWIND 1トランザクション）で行う。
+Neo4jが停止していても計算済みの統計は失われず、接続が戻った時点で
+溜まった分をまとめて書き込む。
+
+使い方:
+    # スプールの件数を確認
+    python scripts/neo4j_spool.py --status
+
+    # 溜まった観測をNeo4jへ書き込む
+    python scripts/neo4j_spool.py --drain
+
+    # 60秒ごとに書き込みを試行し続ける
+    python scripts/neo4j_spool.py --drain --watch 60
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from save_weather import DEFAULT_BATCH_SIZE, SatelliteDataWriter
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+METADATA_DIR = Path(__file__).parent.parent / "data" / "metadata"
+SPOOL_PATH = METADATA_DIR / "neo4j_spool.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row TEXT NOT NULL,
+    enqueued_at TEXT NOT NULL
+)
+"""
+
+
+class ObservationSpool:
+    """観測行の追記専用キュー"""
+
+    def __init__(self, path=SPOOL_PATH):
+        """
+        Args:
+            path: SQLiteファイルのパス
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        # 追記と読み出しが並行しても待たされないようにWALモードで開く
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def append(self, rows):
+        """
+        観測行を追記（コミット後に返るため、戻った時点で永続化済み）
+
+        Args:
+            rows: observation_row の行辞書のリスト
+
+        Returns:
+            追記した件数
+        """
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO observations (row, enqueued_at) VALUES (?, ?)",
+                [(json.dumps(row, ensure_ascii=False), now) for row in rows]
+            )
+        return len(rows)
+
+    def peek(self, limit):
+        """
+        古い順に観測行を取得（キューからは削除しない）
+
+        Returns:
+            [(id, row), ...]
+        """
+        rows = self.conn.execute(
+            "SELECT id, row FROM observations ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        return [(entry_id, json.loads(row)) for entry_id, row in rows]
+
+    def ack(self, ids):
+        """書き込み済みの観測行を削除"""
+        with self.conn:
+            self.conn.executemany("DELETE FROM observations WHERE id = ?", [(i,) for i in ids])
+
+    def count(self):
+        """未書き込みの件数"""
+        return self.conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+    def drain(self, writer, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        スプールの観測をバッチ単位でNeo4jへ書き込む
+
+        バッチごとに書き込み後に削除するため、途中で失敗しても
+        書き込み済みのバッチは再送されない（再送されてもMERGEで重複しない）。
+
+        Args:
+            writer: SatelliteDataWriter
+            batch_size: 1トランザクションあたりの行数
+
+        Returns:
+            書き込んだ件数
+        """
+        written = 0
+        while True:
+            entries = self.peek(batch_size)
+            if not entries:
+                break
+
+            writer.save_batch([row for _, row in entries], batch_size=batch_size)
+            self.ack([entry_id for entry_id, _ in entries])
+            written += len(entries)
+
+        return written
+
+    def close(self):
+        """接続を閉じる"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def drain_once(spool, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Neo4jに接続してスプールを1回書き出す
+
+    Returns:
+        書き込んだ件数（接続・書き込みに失敗した場合はNone）
+    """
+    try:
+        with SatelliteDataWriter() as writer:
+            if not writer.is_available():
+                raise ConnectionError("Neo4jに接続できません")
+            return spool.drain(writer, batch_size=batch_size)
+    except Exception as e:
+        print(f"✗ Neo4j書き込み失敗（{spool.count()} 件をスプールに保持）: {e}", file=sys.stderr)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j書き込みスプールの確認・書き出し")
+    parser.add_argument("--spool", type=str, default=str(SPOOL_PATH),
+                       help="スプールファイルのパス")
+    parser.add_argument("--status", action="store_true",
+                       help="未書き込みの件数を表示")
+    parser.add_argument("--drain", action="store_true",
+                       help="溜まった観測をNeo4jへ書き込む")
+    parser.add_argument("--watch", type=int, metavar="SECONDS",
+                       help="指定秒ごとに書き出しを繰り返す（--drain と併用）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f"1トランザクションあたりの行数（デフォルト: {DEFAULT_BATCH_SIZE}）")
+
+    args = parser.parse_args()
+
+    with ObservationSpool(args.spool) as spool:
+        if not args.drain:
+            print(f"スプール: {args.spool}")
+            print(f"  未書き込み: {spool.count()} 件")
+            return
+
+        while True:
+            written = drain_once(spool, args.batch_size)
+            if written is not None:
+                print(f"✓ Neo4j書き込み: {written} 件（残り {spool.count()} 件）")
+
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+
+        if written is None:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
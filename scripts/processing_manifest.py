@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Processing Manifest
+処理済みグラニュールの台帳（SQLite）
+
+ファイルパス・データセット・処理パラメータごとに、処理時のファイルサイズと
+更新時刻、統計結果、Neo4jへの保存状況を記録する。ワークフローの再実行時は
+新規または変更されたグラニュールだけを処理・保存する。
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+METADATA_DIR = Path(__file__).parent.parent / "data" / "metadata"
+MANIFEST_PATH = METADATA_DIR / "processing_manifest.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    path TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    params TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    processed_at TEXT NOT NULL,
+    saved_at TEXT,
+    PRIMARY KEY (path, dataset, params)
+)
+"""
+
+
+def params_key(params):
+    """処理パラメータを比較可能な文字列に正規化"""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+
+class ProcessingManifest:
+    """処理済みグラニュールの台帳"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        """
+        Args:
+            path: SQLiteファイルのパス
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def is_current(self, file_path, dataset, params):
+        """
+        同じ内容・パラメータで処理済みかどうか
+
+        Args:
+            file_path: グラニュールのパス
+            dataset: データセット名
+            params: 処理パラメータ辞書
+
+        Returns:
+            bool: 処理後にファイルが変更されていなければTrue
+        """
+        file_path = Path(file_path).resolve()
+        st = file_path.stat()
+
+        row = self.conn.execute(
+            "SELECT size, mtime_ns FROM granules WHERE path = ? AND dataset = ? AND params = ?",
+            (str(file_path), dataset, params_key(params))
+        ).fetchone()
+
+        return row is not None and row == (st.st_size, st.st_mtime_ns)
+
+    def record_processed(self, file_path, dataset, params, stats):
+        """
+        処理結果を記録（保存状況はリセット）
+
+        Args:
+            file_path: グラニュールのパス
+            dataset: データセット名
+            params: 処理パラメータ辞書
+            stats: process_file の結果辞書
+        """
+        file_path = Path(file_path).resolve()
+        st = file_path.stat()
+
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO granules
+                (path, dataset, params, size, mtime_ns, stats, processed_at, saved_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+            """,
+            (str(file_path), dataset, params_key(params), st.st_size, st.st_mtime_ns,
+             json.dumps(stats, ensure_ascii=False), datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def pending_saves(self, params):
+        """
+        処理済みでNeo4j未保存（スプール未追記）のグラニュール
+
+        前回の実行で保存に失敗したものも含む。
+
+        Args:
+            params: 処理パラメータ辞書
+
+        Returns:
+            [(path, dataset, stats), ...]（パス順）
+        """
+        rows = self.conn.execute(
+            """
+            SELECT path, dataset, stats FROM granules
+            WHERE params = ? AND saved_at IS NULL
+            ORDER BY path
+            """,
+            (params_key(params),)
+        ).fetchall()
+
+        return [(path, dataset, json.loads(stats)) for path, dataset, stats in rows]
+
+    def mark_saved(self, file_path, dataset, params):
+        """Neo4jへの保存完了（スプールへの追記完了）を記録"""
+        self.conn.execute(
+            "UPDATE granules SET saved_at = ? WHERE path = ? AND dataset = ? AND params = ?",
+            (datetime.now().isoformat(), str(Path(file_path).resolve()), dataset, params_key(params))
+        )
+        self.conn.commit()
+
+    def summary(self):
+        """登録件数・未保存件数"""
+        total, unsaved = self.conn.execute(
+            "SELECT COUNT(*), COUNT(*) - COUNT(saved_at) FROM granules"
+        ).fetchone()
+        return {"total": total, "unsaved": unsaved}
+
+    def close(self):
+        """接続を閉じる"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="処理済みグラニュール台帳の確認")
+    parser.add_argument("--manifest", type=str, default=str(MANIFEST_PATH),
+                       help="台帳ファイルのパス")
+
+    args = parser.parse_args()
+
+    with ProcessingManifest(args.manifest) as manifest:
+        summary = manifest.summary()
+
+    print(f"台帳: {args.manifest}")
+    print(f"  登録グラニュール: {summary['total']}")
+    print(f"  Neo4j未保存: {summary['unsaved']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Product Catalog
+G-Portal検索結果のローカルカタログ（SQLite）
+
+プロダクトID・観測期間・フットプリント・ダウンロード状況を保存し、
+プロダクトタイプと緯度経度セル（CATALOG_CELL_DEG 度）ごとに
+同期済みの期間を記録する。検索は未同期の期間だけをリモートに問い合わせ、
+結果はローカルの索引から返すため、複数圃場の処理や再実行で
+リモートカタログを繰り返し検索しない。
+
+使い方:
+    # カタログの件数と同期済み期間を表示
+    python scripts/product_catalog.py
+"""
+
+import argparse
+import json
+import math
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+METADATA_DIR = Path(__file__).parent.parent / "data" / "metadata"
+CATALOG_PATH = METADATA_DIR / "product_catalog.db"
+
+# 同期済み期間を管理する緯度経度セルの大きさ（度）
+CATALOG_CELL_DEG = 1.0
+
+# 直近の観測は公開が遅れるため、同期からこの日数以内の期間は
+# CATALOG_REFRESH_HOURS を過ぎたら再度問い合わせる
+PUBLICATION_LAG_DAYS = 3
+CATALOG_REFRESH_HOURS = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    dataset TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    lon_min REAL NOT NULL,
+    lat_min REAL NOT NULL,
+    lon_max REAL NOT NULL,
+    lat_max REAL NOT NULL,
+    download_url TEXT,
+    data_path TEXT,
+    properties TEXT,
+    download_state TEXT NOT NULL DEFAULT 'pending',
+    file_path TEXT,
+    downloaded_at TEXT,
+    PRIMARY KEY (product_id, product_type)
+);
+CREATE INDEX IF NOT EXISTS products_type_time ON products (product_type, start_time);
+CREATE TABLE IF NOT EXISTS coverage (
+    product_type TEXT NOT NULL,
+    cell_lat INTEGER NOT NULL,
+    cell_lon INTEGER NOT NULL,
+    synced_from TEXT NOT NULL,
+    synced_until TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (product_type, cell_lat, cell_lon)
+);
+"""
+
+PRODUCT_COLUMNS = (
+    "product_id", "product_type", "dataset", "start_time", "end_time",
+    "lon_min", "lat_min", "lon_max", "lat_max", "download_url", "data_path",
+    "properties", "download_state", "file_path", "downloaded_at",
+)
+
+
+def cells_for_bbox(bbox, cell_deg=CATALOG_CELL_DEG):
+    """
+    範囲と重なる緯度経度セル
+
+    Args:
+        bbox: [lon_min, lat_min, lon_max, lat_max]
+
+    Returns:
+        [(cell_lat, cell_lon), ...]
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox
+    return [
+        (cell_lat, cell_lon)
+        for cell_lat in range(math.floor(lat_min / cell_deg), math.floor(lat_max / cell_deg) + 1)
+        for cell_lon in range(math.floor(lon_min / cell_deg), math.floor(lon_max / cell_deg) + 1)
+    ]
+
+
+def cell_bbox(cells, cell_deg=CATALOG_CELL_DEG):
+    """セルの集合を覆う範囲 [lon_min, lat_min, lon_max, lat_max]"""
+    lats = [cell_lat for cell_lat, _ in cells]
+    lons = [cell_lon for _, cell_lon in cells]
+    return [
+        min(lons) * cell_deg, min(lats) * cell_deg,
+        (max(lons) + 1) * cell_deg, (max(lats) + 1) * cell_deg,
+    ]
+
+
+def missing_ranges(start, end, synced):
+    """
+    同期済み期間に含まれない日付範囲
+
+    Args:
+        start, end: 検索期間（date、両端を含む）
+        synced: (synced_from, synced_until) または None
+
+    Returns:
+        [(start, end), ...]
+    """
+    if synced is None:
+        return [(start, end)]
+
+    synced_from, synced_until = synced
+    ranges = []
+    if start < synced_from:
+        ranges.append((start, min(end, synced_from - timedelta(days=1))))
+    if end > synced_until:
+        ranges.append((max(start, synced_until + timedelta(days=1)), end))
+    return ranges
+
+
+class ProductCatalog:
+    """G-Portalプロダクトのローカルカタログ"""
+
+    def __init__(self, path=CATALOG_PATH):
+        """
+        Args:
+            path: SQLiteファイルのパス
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _coverage(self, product_type, cell, now):
+        """
+        セルの同期済み期間（公開遅延の期間は同期から CATALOG_REFRESH_HOURS 以内のみ含める）
+
+        Returns:
+            (synced_from, synced_until) または None
+        """
+        row = self.conn.execute(
+            "SELECT synced_from, synced_until, synced_at FROM coverage "
+            "WHERE product_type = ? AND cell_lat = ? AND cell_lon = ?",
+            (product_type, *cell)
+        ).fetchone()
+        if row is None:
+            return None
+
+        synced_from, synced_until = date.fromisoformat(row[0]), date.fromisoformat(row[1])
+        synced_at = datetime.fromisoformat(row[2])
+        if now - synced_at > timedelta(hours=CATALOG_REFRESH_HOURS):
+            settled = synced_at.date() - timedelta(days=PUBLICATION_LAG_DAYS)
+            synced_until = min(synced_until, settled)
+            if synced_until < synced_from:
+                return None
+        return synced_from, synced_until
+
+    def sync(self, product_type, bbox, start, end, fetch, now=None):
+        """
+        未同期の期間だけリモートを検索してカタログに追加
+
+        同じ未同期期間を持つセルはまとめて1回の検索にする。
+        検索に失敗した期間は同期済みにせず、次回の検索で再度問い合わせる。
+
+        Args:
+            product_type: プロダクトタイプ
+            bbox: [lon_min, lat_min, lon_max, lat_max]
+            start, end: 検索期間（date、両端を含む）
+            fetch: fetch(bbox, start, end) -> プロダクト辞書のイテラブル（失敗時はNone）
+            now: 同期時刻（省略時は現在時刻）
+
+        Returns:
+            リモートに問い合わせた回数
+        """
+        now = now or datetime.now()
+
+        # 未同期期間ごとにセルをまとめる
+        gaps = {}
+        for cell in cells_for_bbox(bbox):
+            for gap in missing_ranges(start, end, self._coverage(product_type, cell, now)):
+                gaps.setdefault(gap, []).append(cell)
+
+        for (gap_start, gap_end), cells in sorted(gaps.items()):
+            try:
+                records = fetch(cell_bbox(cells), gap_start, gap_end)
+                if records is None:
+                    continue
+                self.upsert(product_type, records)
+            except Exception as e:
+                print(f"⚠️  カタログ同期エラー ({product_type} {gap_start} ～ {gap_end}): {e}",
+                      file=sys.stderr)
+                continue
+
+            self._extend_coverage(product_type, cells, gap_start, gap_end, now)
+
+        return len(gaps)
+
+    def _extend_coverage(self, product_type, cells, start, end, now):
+        with self.conn:
+            for cell in cells:
+                cell_start, cell_end = start, end
+                synced = self._coverage(product_type, cell, now)
+                # 隣接・重複する場合のみ連結（離れた期間は新しい方を残す）
+                if synced is not None and start <= synced[1] + timedelta(days=1) \
+                        and end >= synced[0] - timedelta(days=1):
+                    cell_start, cell_end = min(start, synced[0]), max(end, synced[1])
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?, ?)",
+                    (product_type, *cell, cell_start.isoformat(), cell_end.isoformat(), now.isoformat())
+                )
+
+    def upsert(self, product_type, records):
+        """
+        プロダクトを追加・更新（ダウンロード状況は保持）
+
+        Args:
+            product_type: プロダクトタイプ
+            records: {"product_id", "dataset", "start_time", "end_time", "bbox",
+                      "download_url", "data_path", "properties"} のイテラブル
+
+        Returns:
+            件数
+        """
+        rows = (
+            (
+                record["product_id"], product_type, record.get("dataset"),
+                record["start_time"], record.get("end_time") or record["start_time"],
+                *record["bbox"],
+                record.get("download_url"), record.get("data_path"),
+                json.dumps(record.get("properties") or {}, ensure_ascii=False, default=str),
+            )
+            for record in records
+        )
+        with self.conn:
+            cursor = self.conn.executemany(
+                """
+                INSERT INTO products (product_id, product_type, dataset, start_time, end_time,
+                                      lon_min, lat_min, lon_max, lat_max,
+                                      download_url, data_path, properties)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (product_id, product_type) DO UPDATE SET
+                    dataset = excluded.dataset,
+                    start_time = excluded.start_time,
+                    end_time = excluded.end_time,
+                    lon_min = excluded.lon_min,
+                    lat_min = excluded.lat_min,
+                    lon_max = excluded.lon_max,
+                    lat_max = excluded.lat_max,
+                    download_url = excluded.download_url,
+                    data_path = excluded.data_path,
+                    properties = excluded.properties
+                """,
+                rows
+            )
+        return cursor.rowcount
+
+    def query(self, product_type, bbox, start, end):
+        """
+        ローカルの索引から検索
+
+        Args:
+            product_type: プロダクトタイプ
+            bbox: [lon_min, lat_min, lon_max, lat_max]
+            start, end: 検索期間（date、両端を含む）
+
+        Returns:
+            プロダクト辞書のリスト（観測開始順）
+        """
+        lon_min, lat_min, lon_max, lat_max = bbox
+        rows = self.conn.execute(
+            f"""
+            SELECT {', '.join(PRODUCT_COLUMNS)} FROM products
+            WHERE product_type = ?
+              AND start_time <= ? AND end_time >= ?
+              AND lon_max >= ? AND lon_min <= ? AND lat_max >= ? AND lat_min <= ?
+            ORDER BY start_time, product_id
+            """,
+            (product_type, f"{end.isoformat()}T23:59:59", start.isoformat(),
+             lon_min, lon_max, lat_min, lat_max)
+        ).fetchall()
+
+        return [self._product(row) for row in rows]
+
+    def search(self, product_type, bbox, start, end, fetch, now=None):
+        """
+        未同期の期間を同期してからローカルの索引で検索
+
+        Returns:
+            プロダクト辞書のリスト（観測開始順）
+        """
+        self.sync(product_type, bbox, start, end, fetch, now=now)
+        return self.query(product_type, bbox, start, end)
+
+    @staticmethod
+    def _product(row):
+        product = dict(zip(PRODUCT_COLUMNS, row))
+        product["bbox"] = [product.pop(key) for key in ("lon_min", "lat_min", "lon_max", "lat_max")]
+        product["properties"] = json.loads(product["properties"] or "{}")
+        product["observation_date"] = product["start_time"]
+        return product
+
+    def mark_downloaded(self, product_id, file_path):
+        """ダウンロード完了を記録"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE products SET download_state = 'downloaded', file_path = ?, downloaded_at = ? "
+                "WHERE product_id = ?",
+                (str(file_path), datetime.now().isoformat(), product_id)
+            )
+
+    def mark_failed(self, product_id):
+        """ダウンロード失敗を記録（次回の実行で再試行される）"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE products SET download_state = 'failed' WHERE product_id = ?",
+                (product_id,)
+            )
+
+    def summary(self):
+        """プロダクトタイプ・ダウンロード状況ごとの件数と同期済みセル数"""
+        products = self.conn.execute(
+            "SELECT product_type, download_state, COUNT(*) FROM products "
+            "GROUP BY product_type, download_state ORDER BY product_type, download_state"
+        ).fetchall()
+        coverage = self.conn.execute(
+            "SELECT product_type, COUNT(*), MIN(synced_from), MAX(synced_until) FROM coverage "
+            "GROUP BY product_type ORDER BY product_type"
+        ).fetchall()
+        return {"products": products, "coverage": coverage}
+
+    def close(self):
+        """接続を閉じる"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G-Portalプロダクトカタログの確認")
+    parser.add_argument("--catalog", type=str, default=str(CATALOG_PATH),
+                       help="カタログファイルのパス")
+
+    args = parser.parse_args()
+
+    with ProductCatalog(args.catalog) as catalog:
+        summary = catalog.summary()
+
+    print(f"カタログ: {args.catalog}")
+    for product_type, state, count in summary["products"]:
+        print(f"  {product_type} {state}: {count} 件")
+    for product_type, cells, synced_from, synced_until in summary["coverage"]:
+        print(f"  {product_type} 同期済み: {cells} セル（{synced_from} ～ {synced_until}）")
+
+
+if __name__ == "__main__":
+    main()
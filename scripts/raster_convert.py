@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Raster Convert
+ラスターをウィンドウ読み込み向けの形式に変換
+
+- GeoTIFF → Cloud Optimized GeoTIFF（256×256タイル・DEFLATE圧縮・内部オーバービュー）
+- HDF5 → チャンク分割・gzip圧縮したHDF5（画像データセットの縮小版を
+  Overviews/<データセットのパス>/<倍率> に追加）
+
+geotiff_processor・tile_renderer は要求された出力解像度に合うオーバービューを
+選んで読むため、広い範囲・粗い解像度の読み込みでも原解像度の全チャンクは読まない。
+
+使い方:
+    # data/geotiff/ のファイルをその場で変換（グラニュール保存領域のリンクは
+    # 保存領域の内容を置き換えてリンクし直す）
+    python scripts/raster_convert.py data/geotiff/*.h5 data/geotiff/*.tif --in-place
+
+    # 別ディレクトリに書き出し
+    python scripts/raster_convert.py data/geotiff/GC1SG1_*.h5 --output-dir data/optimized
+"""
+
+import argparse
+import math
+import os
+import sys
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+import numpy as np
+
+from geotiff_processor import H5PY_AVAILABLE, OVERVIEW_GROUP, RASTERIO_AVAILABLE
+from granule_store import GranuleStore
+
+if H5PY_AVAILABLE:
+    import h5py
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    import rasterio.shutil
+    from rasterio.enums import Resampling
+
+# 圃場周辺（±5km ≒ 250m解像度で40ピクセル四方）の読み込みが4チャンク以内に収まる大きさ
+HDF5_CHUNK_SHAPE = (128, 128)
+COMPRESSION_LEVEL = 4
+
+# COGのタイルの大きさ。オーバービューはこの大きさに収まるまで作成する
+BLOCK_SIZE = 256
+
+
+def overview_factors(height, width, min_size=BLOCK_SIZE):
+    """
+    オーバービューの縮小倍率（2, 4, 8, ...、最後の段が min_size 以下に収まるまで）
+
+    画像が min_size 以下の場合は空リスト。
+    """
+    factors = []
+    factor = 2
+    while max(height, width) / (factor // 2) > min_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def hdf5_chunk_shape(shape):
+    """データセットの形状に収まるチャンク形状（3次元目以降は分割しない）"""
+    return tuple(min(size, chunk) for size, chunk in zip(shape, HDF5_CHUNK_SHAPE + tuple(shape[2:])))
+
+
+def create_compressed_dataset(parent, name, data, **kwargs):
+    """
+    チャンク分割・gzip圧縮したデータセットを作成
+
+    Args:
+        parent: h5py.File または h5py.Group
+        name: データセット名
+        data: 配列
+
+    Returns:
+        h5py.Dataset
+    """
+    data = np.asarray(data)
+    if data.ndim == 0:
+        return parent.create_dataset(name, data=data, **kwargs)
+
+    return parent.create_dataset(
+        name, data=data,
+        chunks=hdf5_chunk_shape(data.shape),
+        compression='gzip', compression_opts=COMPRESSION_LEVEL, shuffle=True,
+        **kwargs
+    )
+
+
+def downsample(data, factor):
+    """
+    画像を factor 分の1に縮小
+
+    浮動小数点はブロック平均（NaNを除く）、整数は代表値（左上）で間引く。
+    整数は係数変換前の値や欠損値コードを含むため平均しない。
+    """
+    if not np.issubdtype(data.dtype, np.floating):
+        return data[::factor, ::factor]
+
+    height, width = data.shape[:2]
+    out_h, out_w = math.ceil(height / factor), math.ceil(width / factor)
+    padded = np.full((out_h * factor, out_w * factor) + data.shape[2:], np.nan, dtype=data.dtype)
+    padded[:height, :width] = data
+
+    blocks = padded.reshape(out_h, factor, out_w, factor, *data.shape[2:])
+    with np.errstate(invalid='ignore'):
+        # 全てNaNのブロックはNaNのまま（RuntimeWarningは出さない）
+        counts = np.isfinite(blocks).sum(axis=(1, 3))
+        sums = np.nansum(blocks, axis=(1, 3))
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan).astype(data.dtype)
+
+
+def write_overviews(hdf_file, data_path, factors=None):
+    """
+    データセットのオーバービューを Overviews/<data_path>/<倍率> に書き出す
+
+    Args:
+        hdf_file: 書き込み可能な h5py.File
+        data_path: 画像データセットのパス
+        factors: 縮小倍率（省略時は overview_factors）
+
+    Returns:
+        作成した倍率のリスト
+    """
+    dataset = hdf_file[data_path]
+    if dataset.ndim < 2:
+        return []
+
+    factors = overview_factors(*dataset.shape[:2]) if factors is None else factors
+    if not factors:
+        return []
+
+    data = dataset[()]
+    group = hdf_file.require_group(f"{OVERVIEW_GROUP}/{data_path}")
+    for factor in factors:
+        if str(factor) in group:
+            del group[str(factor)]
+        overview = create_compressed_dataset(group, str(factor), downsample(data, factor))
+        for key, value in dataset.attrs.items():
+            overview.attrs[key] = value
+        overview.attrs['Overview_factor'] = factor
+
+    return factors
+
+
+def image_datasets(hdf_file):
+    """オーバービューを作る画像データセットのパス（Geometry_data・Overviews以外の2次元以上）"""
+    paths = []
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset) and obj.ndim >= 2 \
+                and not name.startswith(('Geometry_data/', f'{OVERVIEW_GROUP}/')):
+            paths.append(name)
+
+    hdf_file.visititems(visit)
+    return paths
+
+
+def convert_hdf5(src_path, dest_path):
+    """
+    HDF5をチャンク分割・gzip圧縮で書き直し、画像データセットのオーバービューを追加
+
+    Args:
+        src_path: 元のHDF5ファイル
+        dest_path: 書き出し先（src_path と異なるパス）
+
+    Returns:
+        {データセットのパス: 作成した倍率のリスト}
+    """
+    if not H5PY_AVAILABLE:
+        raise ImportError("h5pyがインストールされていません")
+
+    overviews = {}
+    with h5py.File(src_path, 'r') as src, h5py.File(dest_path, 'w') as dest:
+        for key, value in src.attrs.items():
+            dest.attrs[key] = value
+
+        def visit(name, obj):
+            # 既存のオーバービューは作り直す
+            if name == OVERVIEW_GROUP or name.startswith(f'{OVERVIEW_GROUP}/'):
+                return
+
+            if isinstance(obj, h5py.Group):
+                group = dest.require_group(name)
+                for key, value in obj.attrs.items():
+                    group.attrs[key] = value
+                return
+
+            if obj.ndim == 0 or obj.dtype.kind in ('O', 'S', 'U', 'V'):
+                src.copy(obj, dest, name=name)
+                return
+
+            ds = create_compressed_dataset(dest, name, obj[()])
+            for key, value in obj.attrs.items():
+                ds.attrs[key] = value
+
+        src.visititems(visit)
+
+        for data_path in image_datasets(dest):
+            overviews[data_path] = write_overviews(dest, data_path)
+
+    return overviews
+
+
+def convert_geotiff(src_path, dest_path, resampling="average"):
+    """
+    GeoTIFFをCloud Optimized GeoTIFFに変換
+
+    Args:
+        src_path: 元のGeoTIFF
+        dest_path: 書き出し先（src_path と異なるパス）
+        resampling: オーバービューの縮小方法（average, nearest 等）
+
+    Returns:
+        作成したオーバービューの倍率のリスト
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("rasterioがインストールされていません")
+
+    with rasterio.open(src_path) as src:
+        predictor = 'FLOATING_POINT' if np.dtype(src.dtypes[0]).kind == 'f' else 'STANDARD'
+
+    with rasterio.Env() as env:
+        cog_available = 'COG' in env.drivers()
+
+    if cog_available:
+        rasterio.shutil.copy(
+            src_path, dest_path, driver='COG',
+            BLOCKSIZE=BLOCK_SIZE, COMPRESS='DEFLATE', LEVEL=6, PREDICTOR=predictor,
+            OVERVIEWS='IGNORE_EXISTING', OVERVIEW_RESAMPLING=resampling.upper(),
+        )
+    else:
+        # COGドライバがない古いGDALでは、タイル分割GeoTIFFに内部オーバービューを追加する
+        with rasterio.open(src_path) as src:
+            profile = src.profile.copy()
+            profile.update(
+                driver='GTiff', tiled=True, blockxsize=BLOCK_SIZE, blockysize=BLOCK_SIZE,
+                compress='deflate', predictor=3 if predictor == 'FLOATING_POINT' else 2,
+            )
+            with rasterio.open(dest_path, 'w', **profile) as dest:
+                dest.write(src.read())
+                dest.update_tags(**src.tags())
+                dest.build_overviews(overview_factors(src.height, src.width), Resampling[resampling])
+
+    with rasterio.open(dest_path) as dest:
+        return dest.overviews(1)
+
+
+def convert_raster(src_path, dest_path=None):
+    """
+    拡張子に応じてGeoTIFF・HDF5を変換
+
+    Args:
+        src_path: 元のファイル
+        dest_path: 書き出し先（省略時は元のファイルを置き換える）
+
+    Returns:
+        Path: 変換後のファイル
+
+    Raises:
+        ValueError: 未対応の形式
+    """
+    src_path = Path(src_path)
+    suffix = src_path.suffix.lower()
+    in_place = dest_path is None or Path(dest_path).resolve() == src_path.resolve()
+    dest = src_path.with_name(src_path.name + '.convert') if in_place else Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        if suffix in ('.tif', '.tiff'):
+            convert_geotiff(src_path, dest)
+        elif suffix in ('.h5', '.he5', '.hdf5'):
+            convert_hdf5(src_path, dest)
+        else:
+            raise ValueError(f"未対応のファイル形式: {suffix}")
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+
+    if in_place:
+        os.replace(dest, src_path)
+        return src_path
+    return dest
+
+
+def convert_granule(store, product_id):
+    """
+    保存領域のグラニュールを変換して置き換える
+
+    data/geotiff/ のリンクは保存領域のファイルを指すため、リンクだけを
+    置き換えると次の store.link() で変換前の内容に戻る。変換結果を保存領域に
+    登録し、以降のリンクが変換後の内容を指すようにする。
+
+    Args:
+        store: GranuleStore
+        product_id: プロダクトID
+
+    Returns:
+        Path: 変換後の保存先のパス（変換できない場合はNone）
+    """
+    found = store.get(product_id)
+    if found is None:
+        return None
+
+    stored = found[0]
+    dest = store.incoming_dir / f"{stored.stem}.convert{stored.suffix}"
+    try:
+        convert_raster(stored, dest)
+    except Exception as e:
+        dest.unlink(missing_ok=True)
+        print(f"✗ 変換エラー ({product_id}): {e}", file=sys.stderr)
+        return None
+
+    # 切り出し前の元のグラニュールを残している場合はそのまま残す
+    return store.replace(dest, product_id, keep_source=store.source(product_id) is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GeoTIFF・HDF5をCOG・チャンク分割HDF5（オーバービュー付き）に変換")
+    parser.add_argument("files", nargs="+", help="GeoTIFF・HDF5ファイル")
+    parser.add_argument("--output-dir", type=str, help="書き出し先ディレクトリ")
+    parser.add_argument("--in-place", action="store_true", help="元のファイルを置き換える")
+
+    args = parser.parse_args()
+
+    if not args.in_place and not args.output_dir:
+        parser.error("--output-dir または --in-place を指定してください")
+
+    failed = False
+    store = GranuleStore() if args.in_place else None
+    try:
+        for file_path in args.files:
+            file_path = Path(file_path)
+            before = file_path.stat().st_size
+            dest = None if args.in_place else Path(args.output_dir) / file_path.name
+            product_id = store.linked_product(file_path) if store else None
+
+            try:
+                if product_id:
+                    # 保存領域の内容を置き換えてからリンクし直す
+                    if convert_granule(store, product_id) is None:
+                        failed = True
+                        continue
+                    dest = store.link(product_id, file_path.parent)
+                else:
+                    dest = convert_raster(file_path, dest)
+            except Exception as e:
+                print(f"✗ {file_path}: {e}", file=sys.stderr)
+                failed = True
+                continue
+
+            print(f"✓ {dest} ({before / 1024 / 1024:.1f} MB → {dest.stat().st_size / 1024 / 1024:.1f} MB)")
+    finally:
+        if store is not None:
+            store.close()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,31 @@
 """
 Weather Data Saver Script
 衛星データをNeo4jに保存するスクリプト
+
+使い方:
+    # 1件保存
+    python scripts/save_weather.py --date 2026-01-08 --temperature 18.4 --humidity 65 --ndvi-avg 0.75
+
+    # JSON-linesを一括保存（バッチごとに UNWIND で1トランザクション）
+    python scripts/save_weather.py --jsonl observations.jsonl
+    cat observations.jsonl | python scripts/save_weather.py --jsonl -
+
+    # キー導入前の観測を移行し、一意制約と集計ノードを作成（初回書き込み時にも自動で実行）
+    python scripts/save_weather.py --migrate
+
+    # 日次・週次・月次の集計ノード（ObservationAggregate）を作り直す
+    python scripts/save_weather.py --rebuild-aggregates
+
+観測の保存時には、その日を含む集計ノードも同じトランザクションで更新する。
 """
 
 import argparse
+import json
 import os
 import sys
-from datetime import datetime
+from datetime import date as date_type, datetime, timedelta
+
+from data_version import bump_version
 
 # Windows環境でのUTF-8出力設定
 if sys.platform == 'win32':
@@ -18,13 +37,495 @@ if sys.platform == 'win32':
 
 try:
     from neo4j import GraphDatabase
+    from neo4j.exceptions import ClientError, DatabaseError
     NEO4J_AVAILABLE = True
 except ImportError:
     NEO4J_AVAILABLE = False
     print("Warning: neo4j package is not installed", file=sys.stderr)
 
 
-def save_satellite_data_to_neo4j(date, temperature, humidity, ndvi_avg, uri, user, password):
+# Neo4j接続設定
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_USER = "neo4j"
+NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD", "nAnAkA0629")
+
+# 1トランザクションあたりの行数
+DEFAULT_BATCH_SIZE = 1000
+
+# 観測を保存する圃場（Farm.name と作成時の座標）
+DEFAULT_FARM = {"name": "Nanaka Farm", "latitude": 32.8032, "longitude": 130.7075}
+
+# 衛星データの種類を指定しない観測（温度・NDVIをまとめた記録）
+DEFAULT_PRODUCT = "SGLI"
+
+# 一意制約とインデックス（IF NOT EXISTS のため何度実行してもよい）
+SCHEMA_QUERIES = [
+    "CREATE CONSTRAINT farm_name IF NOT EXISTS "
+    "FOR (f:Farm) REQUIRE f.name IS UNIQUE",
+    "CREATE CONSTRAINT satellite_data_key IF NOT EXISTS "
+    "FOR (s:SatelliteData) REQUIRE (s.farm, s.date, s.product) IS UNIQUE",
+    "CREATE RANGE INDEX satellite_data_date IF NOT EXISTS "
+    "FOR (s:SatelliteData) ON (s.date)",
+    "CREATE CONSTRAINT observation_aggregate_key IF NOT EXISTS "
+    "FOR (a:ObservationAggregate) REQUIRE (a.farm, a.period, a.start) IS UNIQUE",
+    "CREATE RANGE INDEX observation_aggregate_start IF NOT EXISTS "
+    "FOR (a:ObservationAggregate) ON (a.period, a.start)",
+]
+
+# 制約の有無（satellite_data_key がなければ重複が残っている可能性がある）
+CONSTRAINT_EXISTS_QUERY = "SHOW CONSTRAINTS YIELD name WHERE name = $name RETURN count(*) AS found"
+
+# 移行・集計ノードの作成が必要か（キーのない観測、日次集計ノードのない観測日の有無）
+SCHEMA_STATUS_QUERY = """
+OPTIONAL MATCH (legacy:SatelliteData)
+WHERE legacy.farm IS NULL OR legacy.product IS NULL
+WITH legacy LIMIT 1
+OPTIONAL MATCH (s:SatelliteData {farm: $farm})
+WHERE NOT EXISTS {
+    MATCH (:ObservationAggregate {farm: $farm, period: 'day', start: s.date})
+}
+WITH legacy, s LIMIT 1
+RETURN legacy IS NOT NULL AS unkeyed,
+       s IS NOT NULL AS unaggregated
+"""
+
+# キー導入前に CREATE で保存された観測の移行（queries/schema.cypher と同じ）
+# 1. キー項目を補完（同じキーの観測が既にあれば古い方を削除し、制約に違反しない）
+BACKFILL_KEYS_QUERY = """
+MATCH (f:Farm)-[:HAS_OBSERVATION]->(s:SatelliteData)
+WHERE s.farm IS NULL OR s.product IS NULL
+WITH coalesce(s.farm, f.name) AS farm, s.date AS date, coalesce(s.product, $product) AS product, s
+ORDER BY coalesce(s.updated_at, s.created_at) DESC
+WITH farm, date, product, collect(s) AS legacy
+OPTIONAL MATCH (keyed:SatelliteData {farm: farm, date: date, product: product})
+WITH farm, product, legacy, count(keyed) > 0 AS has_keyed
+WITH farm, product,
+     CASE WHEN has_keyed THEN [] ELSE legacy[0..1] END AS kept,
+     CASE WHEN has_keyed THEN legacy ELSE legacy[1..] END AS duplicates
+FOREACH (s IN kept | SET s.farm = farm, s.product = product)
+FOREACH (duplicate IN duplicates | DETACH DELETE duplicate)
+RETURN coalesce(sum(size(kept)), 0) AS backfilled,
+       coalesce(sum(size(duplicates)), 0) AS removed
+"""
+
+# 2. 同じキーの重複を最新の1件に集約
+DEDUPLICATE_QUERY = """
+MATCH (s:SatelliteData)
+WHERE s.farm IS NOT NULL AND s.product IS NOT NULL
+WITH s.farm AS farm, s.date AS date, s.product AS product, s
+ORDER BY coalesce(s.updated_at, s.created_at) DESC
+WITH farm, date, product, collect(s) AS nodes
+WHERE size(nodes) > 1
+WITH nodes[1..] AS duplicates
+FOREACH (duplicate IN duplicates | DETACH DELETE duplicate)
+RETURN coalesce(sum(size(duplicates)), 0) AS removed
+"""
+
+# (圃場, 日付, プロダクト) をキーにしたMERGEで、再実行しても観測が重複しない
+SAVE_SATELLITE_DATA_QUERY = """
+MERGE (f:Farm {name: $farm})
+ON CREATE SET f.latitude = $latitude, f.longitude = $longitude
+
+WITH f
+UNWIND $rows AS row
+
+MERGE (s:SatelliteData {farm: f.name, date: date(row.date), product: row.product})
+ON CREATE SET s.created_at = datetime()
+SET s.temperature = row.temperature,
+    s.humidity = row.humidity,
+    s.ndvi_avg = row.ndvi_avg,
+    s.pixel_count = row.pixel_count,
+    s.ndvi_std = row.ndvi_std,
+    s.ndvi_min = row.ndvi_min,
+    s.ndvi_max = row.ndvi_max,
+    s.ndvi_sketch = row.ndvi_sketch,
+    s.lst_sketch = row.lst_sketch,
+    s.updated_at = datetime()
+
+MERGE (f)-[r:HAS_OBSERVATION]->(s)
+
+RETURN count(s) AS written
+"""
+
+
+# 日次・週次・月次の集計ノードを、対象期間の観測から作り直す
+# 件数・合計・二乗和・最小・最大を持つため、期間をまたいだ平均・標準偏差は
+# 集計ノード同士を足し合わせて求められる（観測ノードを走査しない）
+REFRESH_AGGREGATES_QUERY = """
+MATCH (f:Farm {name: $farm})
+UNWIND $periods AS p
+
+OPTIONAL MATCH (s:SatelliteData {farm: f.name})
+WHERE s.date >= date(p.start) AND s.date < date(p.end)
+
+WITH f, p,
+     count(s.ndvi_avg) AS ndvi_count,
+     sum(s.ndvi_avg) AS ndvi_sum,
+     sum(s.ndvi_avg * s.ndvi_avg) AS ndvi_sumsq,
+     min(s.ndvi_avg) AS ndvi_min,
+     max(s.ndvi_avg) AS ndvi_max,
+     count(s.temperature) AS temp_count,
+     sum(s.temperature) AS temp_sum,
+     sum(s.temperature * s.temperature) AS temp_sumsq,
+     min(s.temperature) AS temp_min,
+     max(s.temperature) AS temp_max
+
+MERGE (a:ObservationAggregate {farm: f.name, period: p.period, start: date(p.start)})
+SET a.end = date(p.end),
+    a.ndvi_count = ndvi_count,
+    a.ndvi_sum = ndvi_sum,
+    a.ndvi_sumsq = ndvi_sumsq,
+    a.ndvi_min = ndvi_min,
+    a.ndvi_max = ndvi_max,
+    a.temp_count = temp_count,
+    a.temp_sum = temp_sum,
+    a.temp_sumsq = temp_sumsq,
+    a.temp_min = temp_min,
+    a.temp_max = temp_max,
+    a.updated_at = datetime()
+
+MERGE (f)-[:HAS_AGGREGATE]->(a)
+
+RETURN count(a) AS refreshed
+"""
+
+# 集計ノードを再構築するため、保存済みの観測日を列挙する
+OBSERVATION_DATES_QUERY = """
+MATCH (s:SatelliteData {farm: $farm})
+RETURN DISTINCT toString(s.date) AS date
+"""
+
+
+def aggregate_periods(dates):
+    """
+    観測日を含む日・週（月曜始まり）・月の期間を列挙
+
+    Args:
+        dates: 観測日 (YYYY-MM-DD形式) のイテラブル
+
+    Returns:
+        [{"period": "day"|"week"|"month", "start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}, ...]
+        （end は含まない）
+    """
+    periods = set()
+
+    for value in dates:
+        day = date_type.fromisoformat(str(value))
+        week = day - timedelta(days=day.weekday())
+        month = day.replace(day=1)
+        next_month = (month + timedelta(days=32)).replace(day=1)
+
+        periods.add(("day", day, day + timedelta(days=1)))
+        periods.add(("week", week, week + timedelta(days=7)))
+        periods.add(("month", month, next_month))
+
+    return [
+        {"period": period, "start": start.isoformat(), "end": end.isoformat()}
+        for period, start, end in sorted(periods)
+    ]
+
+
+def observation_row(date, temperature, humidity, ndvi_avg, ndvi_stats=None, product=DEFAULT_PRODUCT,
+                    lst_stats=None):
+    """
+    UNWINDに渡す1観測分の行を作成
+
+    Args:
+        date: 観測日 (YYYY-MM-DD形式)
+        temperature: 温度 (℃)
+        humidity: 湿度 (%)
+        ndvi_avg: NDVI平均値
+        ndvi_stats: NDVIの統計情報辞書（calculate_statisticsの結果、スケッチ付き）
+        product: プロダクト（LST, NDVI など。日付とともに観測のキーになる）
+        lst_stats: LSTの統計情報辞書（スケッチはピクセル値のまま、単位K）
+
+    Returns:
+        行辞書
+    """
+    # ピクセル分布（期間・圃場をまたいだマージ用）
+    ndvi_stats = ndvi_stats or {}
+    sketch = ndvi_stats.get("sketch")
+    lst_sketch = (lst_stats or {}).get("sketch")
+
+    return {
+        "date": date,
+        "product": product,
+        "temperature": temperature,
+        "humidity": humidity,
+        "ndvi_avg": ndvi_avg,
+        "pixel_count": ndvi_stats.get("valid_pixels"),
+        "ndvi_std": ndvi_stats.get("std"),
+        "ndvi_min": ndvi_stats.get("min"),
+        "ndvi_max": ndvi_stats.get("max"),
+        "ndvi_sketch": json.dumps(sketch) if sketch else None,
+        "lst_sketch": json.dumps(lst_sketch) if lst_sketch else None,
+    }
+
+
+def read_observations(lines):
+    """
+    JSON-lines形式の観測データを行辞書に変換
+
+    1行に1観測（product・ndvi_stats・lst_stats は省略可）:
+        {"date": "2026-01-08", "product": "NDVI", "temperature": 18.4,
+         "humidity": 65.0, "ndvi_avg": 0.75, "ndvi_stats": {...}}
+
+    Args:
+        lines: 行のイテラブル（ファイルオブジェクト・標準入力）
+
+    Yields:
+        行辞書
+
+    Raises:
+        ValueError: JSONまたは日付形式が不正な場合
+    """
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            record = json.loads(line)
+            datetime.strptime(record["date"], "%Y-%m-%d")
+            yield observation_row(
+                record["date"],
+                record["temperature"],
+                record["humidity"],
+                record["ndvi_avg"],
+                ndvi_stats=record.get("ndvi_stats"),
+                product=record.get("product", DEFAULT_PRODUCT),
+                lst_stats=record.get("lst_stats")
+            )
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{line_no}行目を解析できません: {e}") from e
+
+
+def _write_rows(tx, rows, farm):
+    """
+    1バッチ分の行をUNWINDで書き込むトランザクション関数
+
+    同じトランザクション内で、書き込んだ日を含む集計ノードも更新する。
+    """
+    written = tx.run(
+        SAVE_SATELLITE_DATA_QUERY,
+        rows=rows,
+        farm=farm["name"],
+        latitude=farm["latitude"],
+        longitude=farm["longitude"]
+    ).single()["written"]
+
+    _refresh_aggregates(tx, [row["date"] for row in rows], farm)
+
+    return written
+
+
+def _refresh_aggregates(tx, dates, farm):
+    """指定日を含む日次・週次・月次の集計ノードを作り直すトランザクション関数"""
+    return tx.run(
+        REFRESH_AGGREGATES_QUERY,
+        periods=aggregate_periods(dates),
+        farm=farm["name"]
+    ).single()["refreshed"]
+
+
+def _migrate_observations(tx):
+    """キー項目の補完と重複の集約を行うトランザクション関数"""
+    backfill = tx.run(BACKFILL_KEYS_QUERY, product=DEFAULT_PRODUCT).single()
+    removed = tx.run(DEDUPLICATE_QUERY).single()["removed"]
+    return backfill["backfilled"], backfill["removed"] + removed
+
+
+def _rebuild_all_aggregates(tx, farm):
+    """保存済みの全観測日について集計ノードを作り直すトランザクション関数"""
+    dates = [record["date"] for record in tx.run(OBSERVATION_DATES_QUERY, farm=farm["name"])]
+    if not dates:
+        return 0
+    return _refresh_aggregates(tx, dates, farm)
+
+
+class SatelliteDataWriter:
+    """
+    衛星データのNeo4jライター
+
+    1つのドライバ（Bolt接続プール）を使い回し、複数の観測を
+    UNWINDでまとめて1トランザクション（1往復）で書き込む。
+    初回書き込み時に既存の観測を移行し、一意制約・インデックスと
+    不足している集計ノードを作成する。
+    """
+
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, farm=None):
+        """
+        Args:
+            uri: Neo4j接続URI
+            user: Neo4jユーザー名
+            password: Neo4jパスワード
+            farm: 圃場（name, latitude, longitude。省略時は DEFAULT_FARM）
+        """
+        if not NEO4J_AVAILABLE:
+            raise RuntimeError("neo4jパッケージがインストールされていません")
+
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.farm = farm or DEFAULT_FARM
+        self._schema_ready = False
+
+    def ensure_schema(self):
+        """
+        一意制約とインデックスを作成
+
+        (圃場, 日付, プロダクト) の一意制約がまだない場合や、キーのない観測が
+        残っている場合は、先にキー導入前の観測を移行（migrate）する。移行後も
+        制約を作成できない場合は、制約なしで重複を書き込み続けないよう例外を
+        送出する。
+
+        日次集計ノードのない観測日がある場合（集計ノード導入前の観測。API・
+        ダッシュボードは集計ノードだけを読む）や、移行で観測が変わった場合は、
+        全期間の集計ノードを作り直す。
+
+        Raises:
+            RuntimeError: 制約・インデックスを作成できない場合
+        """
+        if self._schema_ready:
+            return
+
+        with self.driver.session() as session:
+            found = session.run(CONSTRAINT_EXISTS_QUERY, name="satellite_data_key").single()["found"]
+            status = session.run(SCHEMA_STATUS_QUERY, farm=self.farm["name"]).single()
+
+        migrated = False
+        if not found or status["unkeyed"]:
+            backfilled, removed = self.migrate()
+            migrated = bool(backfilled or removed)
+            if migrated:
+                print(f"✓ 既存の観測を移行: キー補完 {backfilled} 件、重複削除 {removed} 件")
+
+        with self.driver.session() as session:
+            for query in SCHEMA_QUERIES:
+                try:
+                    session.run(query).consume()
+                except (ClientError, DatabaseError) as e:
+                    raise RuntimeError(f"制約・インデックスを作成できません（{query}）: {e}") from e
+
+            refreshed = 0
+            if migrated or status["unaggregated"]:
+                refreshed = session.execute_write(_rebuild_all_aggregates, self.farm)
+                print(f"✓ 既存の観測から集計ノードを作成: {refreshed} 件")
+
+        self._schema_ready = True
+
+        if refreshed:
+            bump_version()
+
+    def migrate(self):
+        """
+        キー導入前に保存された観測を移行
+
+        Farm からの HAS_OBSERVATION をもとに farm・product（DEFAULT_PRODUCT）を
+        補完し、同じ (圃場, 日付, プロダクト) の重複を最新の1件に集約する。
+        何度実行してもよい。
+
+        Returns:
+            (キーを補完した件数, 削除した重複の件数)
+        """
+        with self.driver.session() as session:
+            return session.execute_write(_migrate_observations)
+
+    def is_available(self):
+        """
+        Neo4jに接続できるかどうか
+
+        書き込みのリトライ（既定で最大30秒）を待たずに停止中を判定するために使う。
+        """
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception:
+            return False
+
+    def save(self, date, temperature, humidity, ndvi_avg, ndvi_stats=None, product=DEFAULT_PRODUCT):
+        """
+        衛星データを1件保存
+
+        Args:
+            date: 観測日 (YYYY-MM-DD形式)
+            temperature: 温度 (℃)
+            humidity: 湿度 (%)
+            ndvi_avg: NDVI平均値
+            ndvi_stats: NDVIの統計情報辞書（calculate_statisticsの結果、スケッチ付き）
+            product: プロダクト
+
+        Returns:
+            bool: 保存されたかどうか
+        """
+        row = observation_row(date, temperature, humidity, ndvi_avg, ndvi_stats=ndvi_stats, product=product)
+        return self.save_batch([row]) == 1
+
+    def save_batch(self, rows, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        複数の観測を一括保存
+
+        Args:
+            rows: observation_row の行辞書のイテラブル（ジェネレータ可）
+            batch_size: 1トランザクションあたりの行数
+
+        Returns:
+            保存した件数
+        """
+        self.ensure_schema()
+
+        written = 0
+        batch = []
+
+        with self.driver.session() as session:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    written += session.execute_write(_write_rows, batch, self.farm)
+                    batch = []
+
+            if batch:
+                written += session.execute_write(_write_rows, batch, self.farm)
+
+        # APIサーバーのレスポンスキャッシュを無効化
+        if written:
+            try:
+                bump_version()
+            except OSError as e:
+                print(f"⚠️  データバージョンを更新できませんでした: {e}", file=sys.stderr)
+
+        return written
+
+    def rebuild_aggregates(self):
+        """
+        集計ノードを全期間について作り直す
+
+        集計ノード導入前のデータや、手動で観測を修正した場合に使う。
+
+        Returns:
+            更新した集計ノード数
+        """
+        self.ensure_schema()
+
+        with self.driver.session() as session:
+            refreshed = session.execute_write(_rebuild_all_aggregates, self.farm)
+
+        if refreshed:
+            bump_version()
+
+        return refreshed
+
+    def close(self):
+        """ドライバを閉じる"""
+        self.driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def save_satellite_data_to_neo4j(date, temperature, humidity, ndvi_avg, uri, user, password, ndvi_stats=None,
+                                 product=DEFAULT_PRODUCT):
     """
     Neo4jに衛星データを保存
 
@@ -36,51 +537,23 @@ def save_satellite_data_to_neo4j(date, temperature, humidity, ndvi_avg, uri, use
         uri: Neo4j接続URI
         user: Neo4jユーザー名
         password: Neo4jパスワード
+        ndvi_stats: NDVIの統計情報辞書（calculate_statisticsの結果、スケッチ付き）
+        product: プロダクト
 
     Returns:
         bool: 成功したかどうか
     """
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-
-        with driver.session() as session:
-            # Farmノードを取得または作成し、SatelliteDataノードを作成してリレーションを設定
-            result = session.run(
-                """
-                MERGE (f:Farm {name: 'Nanaka Farm'})
-                ON CREATE SET f.latitude = 32.8032, f.longitude = 130.7075
-
-                CREATE (s:SatelliteData {
-                    date: date($date),
-                    temperature: $temperature,
-                    humidity: $humidity,
-                    ndvi_avg: $ndvi_avg,
-                    created_at: datetime()
-                })
-
-                CREATE (f)-[r:HAS_OBSERVATION]->(s)
-
-                RETURN s.date as date, s.temperature as temp,
-                       s.humidity as hum, s.ndvi_avg as ndvi
-                """,
-                date=date,
-                temperature=temperature,
-                humidity=humidity,
-                ndvi_avg=ndvi_avg
-            )
-
-            record = result.single()
-
-            if record:
-                print(f"✓ データ保存成功:")
-                print(f"  日付: {record['date']}")
-                print(f"  温度: {record['temp']}℃")
-                print(f"  湿度: {record['hum']}%")
-                print(f"  NDVI平均: {record['ndvi']}")
-                driver.close()
-                return True
+        with SatelliteDataWriter(uri, user, password) as writer:
+            saved = writer.save(date, temperature, humidity, ndvi_avg, ndvi_stats=ndvi_stats, product=product)
 
-        driver.close()
+        if saved:
+            print(f"✓ データ保存成功:")
+            print(f"  日付: {date}")
+            print(f"  温度: {temperature}℃")
+            print(f"  湿度: {humidity}%")
+            print(f"  NDVI平均: {ndvi_avg}")
+            return True
 
     except Exception as e:
         print(f"✗ Neo4j保存エラー: {e}", file=sys.stderr)
@@ -89,33 +562,107 @@ def save_satellite_data_to_neo4j(date, temperature, humidity, ndvi_avg, uri, use
     return False
 
 
+def save_observations_jsonl(lines, uri, user, password, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    JSON-lines形式の観測データを一括保存
+
+    Args:
+        lines: 行のイテラブル（ファイルオブジェクト・標準入力）
+        uri: Neo4j接続URI
+        user: Neo4jユーザー名
+        password: Neo4jパスワード
+        batch_size: 1トランザクションあたりの行数
+
+    Returns:
+        保存した件数（失敗時はNone）
+    """
+    try:
+        with SatelliteDataWriter(uri, user, password) as writer:
+            written = writer.save_batch(read_observations(lines), batch_size=batch_size)
+
+        print(f"✓ 一括保存成功: {written} 件")
+        return written
+
+    except Exception as e:
+        print(f"✗ Neo4j一括保存エラー: {e}", file=sys.stderr)
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(description="衛星データをNeo4jに保存します")
-    parser.add_argument("--date", type=str, required=True,
+    parser.add_argument("--date", type=str,
                        help="観測日 (YYYY-MM-DD形式)")
-    parser.add_argument("--temperature", type=float, required=True,
+    parser.add_argument("--temperature", type=float,
                        help="温度 (℃)")
-    parser.add_argument("--humidity", type=float, required=True,
+    parser.add_argument("--humidity", type=float,
                        help="湿度 (%%)")
-    parser.add_argument("--ndvi-avg", type=float, required=True,
+    parser.add_argument("--ndvi-avg", type=float,
                        help="NDVI平均値")
+    parser.add_argument("--stats-json", type=str,
+                       help="NDVIの統計情報JSON（geotiff_processorの statistics、スケッチ付き）")
+    parser.add_argument("--product", type=str, default=DEFAULT_PRODUCT,
+                       help=f"プロダクト（日付とともに観測のキー、デフォルト: {DEFAULT_PRODUCT}）")
+    parser.add_argument("--jsonl", type=str,
+                       help="JSON-lines形式の観測データを一括保存（'-' で標準入力）")
+    parser.add_argument("--migrate", action="store_true",
+                       help="キー導入前の観測を移行し、一意制約・インデックスと集計ノードを作成する")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                       help="日次・週次・月次の集計ノードを全期間について作り直す")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f"一括保存時の1トランザクションあたりの行数（デフォルト: {DEFAULT_BATCH_SIZE}）")
 
     args = parser.parse_args()
 
-    # Neo4j接続情報
-    neo4j_uri = "bolt://localhost:7687"
-    neo4j_user = "neo4j"
-    neo4j_password = os.environ.get("NEO4J_PASSWORD", "nAnAkA0629")
+    if not args.jsonl and not args.migrate and not args.rebuild_aggregates and None in (args.date, args.temperature, args.humidity, args.ndvi_avg):
+        parser.error("--date, --temperature, --humidity, --ndvi-avg、または --jsonl を指定してください")
 
     if not NEO4J_AVAILABLE:
         print("✗ エラー: neo4jパッケージがインストールされていません", file=sys.stderr)
         print("  pip install neo4j を実行してください", file=sys.stderr)
         sys.exit(1)
 
-    if not neo4j_password:
+    if not NEO4J_PASSWORD:
         print("✗ エラー: NEO4J_PASSWORD環境変数が設定されていません", file=sys.stderr)
         sys.exit(1)
 
+    # 既存データの移行・制約の作成・集計ノードの再構築
+    if args.migrate:
+        try:
+            with SatelliteDataWriter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD) as writer:
+                backfilled, removed = writer.migrate()
+                writer.ensure_schema()
+                refreshed = writer.rebuild_aggregates()
+        except Exception as e:
+            print(f"✗ 移行エラー: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"✓ 移行完了: キー補完 {backfilled} 件、重複削除 {removed} 件、集計ノード {refreshed} 件")
+        return
+
+    # 集計ノードの再構築
+    if args.rebuild_aggregates:
+        try:
+            with SatelliteDataWriter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD) as writer:
+                refreshed = writer.rebuild_aggregates()
+        except Exception as e:
+            print(f"✗ 集計ノードの再構築エラー: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"✓ 集計ノード再構築: {refreshed} 件")
+        return
+
+    # JSON-linesの一括保存
+    if args.jsonl:
+        if args.jsonl == '-':
+            written = save_observations_jsonl(sys.stdin, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, args.batch_size)
+        else:
+            with open(args.jsonl, 'r', encoding='utf-8') as f:
+                written = save_observations_jsonl(f, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, args.batch_size)
+
+        if written is None:
+            sys.exit(1)
+        return
+
     # 日付形式のバリデーション
     try:
         datetime.strptime(args.date, "%Y-%m-%d")
@@ -124,15 +671,25 @@ def main():
         print("  YYYY-MM-DD形式で指定してください", file=sys.stderr)
         sys.exit(1)
 
+    ndvi_stats = None
+    if args.stats_json:
+        try:
+            ndvi_stats = json.loads(args.stats_json)
+        except json.JSONDecodeError as e:
+            print(f"✗ エラー: 統計情報JSONを解析できません: {e}", file=sys.stderr)
+            sys.exit(1)
+
     # データ保存
     success = save_satellite_data_to_neo4j(
         args.date,
         args.temperature,
         args.humidity,
         args.ndvi_avg,
-        neo4j_uri,
-        neo4j_user,
-        neo4j_password
+        NEO4J_URI,
+        NEO4J_USER,
+        NEO4J_PASSWORD,
+        ndvi_stats=ndvi_stats,
+        product=args.product
     )
 
     if not success:
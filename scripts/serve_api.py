@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API Server Launcher
+本番用のAPIサーバー起動スクリプト
+
+ASGI版（api_server_async.py）を uvicorn のマルチワーカーで起動する。
+各ワーカーはNeo4j非同期ドライバでリクエストを処理し、独立した接続プール
+（NEO4J_POOL_SIZE）を持つため、
+Neo4j側の最大接続数は ワーカー数 × NEO4J_POOL_SIZE を目安に設定する。
+
+使い方:
+    # CPUコア数のワーカーで起動
+    python scripts/serve_api.py
+
+    # ワーカー数・ポートを指定
+    python scripts/serve_api.py --workers 4 --port 5000
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+try:
+    import uvicorn
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+SCRIPTS_DIR = Path(__file__).parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="APIサーバー（ASGI・マルチワーカー）の起動")
+    parser.add_argument("--host", type=str, default=os.getenv('API_HOST', '0.0.0.0'),
+                       help="待ち受けアドレス（デフォルト: 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=int(os.getenv('API_PORT', '5000')),
+                       help="ポート番号（デフォルト: 5000）")
+    parser.add_argument("--workers", type=int,
+                       default=int(os.getenv('API_WORKERS', str(os.cpu_count() or 1))),
+                       help="ワーカープロセス数（デフォルト: CPUコア数）")
+    parser.add_argument("--backlog", type=int, default=2048,
+                       help="接続待ちキューの長さ（デフォルト: 2048）")
+    parser.add_argument("--log-level", type=str, default="warning",
+                       help="ログレベル（デフォルト: warning）")
+
+    args = parser.parse_args()
+
+    if not UVICORN_AVAILABLE:
+        print("✗ uvicorn がインストールされていません: pip install uvicorn", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"🚀 API Server (ASGI): http://{args.host}:{args.port}  workers={args.workers}")
+
+    uvicorn.run(
+        "api_server_async:app",
+        app_dir=str(SCRIPTS_DIR),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        log_level=args.log_level,
+        # 終了時にドライバをクローズする
+        lifespan="on",
+        # SSE接続を保持するためキープアライブを長めに取る
+        timeout_keep_alive=30
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Statistics Engine
+ラスタ統計のストリーミング計算エンジン
+
+- 件数・平均・分散・最小・最大はチャンクごとに1パスで求め、
+  Chan らの並列アルゴリズム（Welford法の一般化）でマージする
+- パーセンタイルは配列入力なら1回の np.partition で全て求め、
+  チャンクイテレータ入力ならマージ可能なKLLスケッチで近似する
+- 結果にはKLLスケッチを含め、ファイル・日付・圃場をまたいだ分布を
+  ラスタを再読み込みせずに merge_statistics で集計できる
+- 複数の圃場・地点の統計は labelled_statistics でラベルごとに一括計算する
+
+チャンクイテレータを渡せば、グラニュール全体を一度にメモリへ
+載せずに統計を計算できる。
+"""
+
+import math
+
+import numpy as np
+
+# 1回に処理する要素数（キャッシュに収まる程度）
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+DEFAULT_PERCENTILES = (25, 50, 75)
+
+
+class RunningMoments:
+    """件数・平均・偏差平方和・最小・最大の逐次集計"""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=math.inf, maximum=-math.inf):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+        self.min = float(minimum)
+        self.max = float(maximum)
+
+    def update(self, values):
+        """
+        チャンクを追加
+
+        Args:
+            values: 有効値のみの1次元配列
+        """
+        n = len(values)
+        if n == 0:
+            return
+
+        values = np.asarray(values, dtype=np.float64)
+        mean = float(values.mean())
+        delta = values - mean
+        m2 = float(np.dot(delta, delta))
+
+        self._merge(n, mean, m2, float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        """別の集計結果をマージ"""
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _merge(self, n_b, mean_b, m2_b, min_b, max_b):
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+        self.min = min(self.min, min_b)
+        self.max = max(self.max, max_b)
+
+    @classmethod
+    def from_statistics(cls, stats):
+        """
+        calculate_statistics の結果辞書から復元
+
+        valid_pixels・mean・std・min・max から偏差平方和を逆算する。
+        """
+        count = stats.get("valid_pixels", 0)
+        if not count or stats.get("mean") is None:
+            return cls()
+
+        std = stats.get("std") or 0.0
+        return cls(
+            count=count,
+            mean=stats["mean"],
+            m2=std * std * count,
+            minimum=stats.get("min", stats["mean"]),
+            maximum=stats.get("max", stats["mean"]),
+        )
+
+    @property
+    def variance(self):
+        """母分散（np.var と同じ ddof=0）"""
+        return self.m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        """母標準偏差（np.std と同じ ddof=0）"""
+        return math.sqrt(self.variance) if self.count else math.nan
+
+
+class KLLSketch:
+    """
+    マージ可能な分位点スケッチ（KLL）
+
+    レベル h のコンパクタには重み 2^h の要素を保持する。容量を超えたレベルは
+    ソートして1つおきに上位レベルへ昇格させる。誤差は順位でおよそ 1/k 程度。
+    コンパクションが一度も起きていなければ全要素を保持しているため厳密。
+    """
+
+    def __init__(self, k=200):
+        self.k = int(k)
+        self.compactors = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        # コンパクション時に残す要素の偶奇（レベルごとに交互）
+        self._offsets = [0]
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def update(self, values):
+        """
+        値を追加
+
+        Args:
+            values: 有効値のみの1次元配列
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        n = len(values)
+        if n == 0:
+            return
+
+        if n <= 4 * self.k:
+            self.compactors[0] = np.concatenate((self.compactors[0], values))
+        else:
+            self._bulk_insert(values)
+
+        self.count += n
+        self._compress()
+
+    def _bulk_insert(self, values):
+        """
+        大きな配列を直接上位レベルへ挿入
+
+        全体をソートしてコンパクションを繰り返す代わりに、np.partition で
+        2^L 個おきの順位の要素だけを選び、レベル L の要素として追加する
+        （繰り返しコンパクションの結果と同じ順位の要素になる）。
+        端数の最大側の要素はレベル0に追加する。values は並べ替えられる。
+        """
+        plan = self._bulk_plan(len(values))
+        values.partition(np.append(plan[1], min(plan[2], len(values) - 1)))
+        self._bulk_add(values, plan)
+
+    def _bulk_plan(self, n):
+        """一括挿入の (レベル, 選択する順位, 端数の開始位置)"""
+        level = max(0, int(math.ceil(math.log2(n / self.k))))
+        step = 1 << level
+        m = n // step
+        return level, np.arange(m, dtype=np.int64) * step + (step // 2), m * step
+
+    def _bulk_add(self, values, plan):
+        """_bulk_plan の順位で分割済みの配列から要素を追加"""
+        level, ranks, tail = plan
+
+        while len(self.compactors) <= level:
+            self.compactors.append(np.empty(0, dtype=np.float64))
+            self._offsets.append(0)
+
+        self.compactors[level] = np.concatenate((self.compactors[level], values[ranks]))
+        self.compactors[0] = np.concatenate((self.compactors[0], values[tail:]))
+
+    def merge(self, other):
+        """別のスケッチをマージ"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0, dtype=np.float64))
+            self._offsets.append(0)
+
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate((self.compactors[level], items))
+
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0, dtype=np.float64))
+                    self._offsets.append(0)
+
+                items = np.sort(items)
+                # 奇数個のときは最大値を1つ残して偶数個をコンパクション
+                keep = items[len(items) - len(items) % 2:]
+                paired = items[:len(items) - len(items) % 2]
+
+                offset = self._offsets[level]
+                self._offsets[level] ^= 1
+
+                self.compactors[level + 1] = np.concatenate((self.compactors[level + 1], paired[offset::2]))
+                self.compactors[level] = keep
+
+            level += 1
+
+    @property
+    def is_exact(self):
+        """コンパクションが起きていない（全要素を保持している）か"""
+        return len(self.compactors) == 1
+
+    def quantiles(self, percentiles):
+        """
+        パーセンタイルを計算
+
+        Args:
+            percentiles: パーセンタイル（0～100）のリスト
+
+        Returns:
+            値のリスト
+        """
+        if self.count == 0:
+            return [math.nan for _ in percentiles]
+
+        if self.is_exact:
+            return exact_quantiles(self.compactors[0].copy(), percentiles)
+
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([
+            np.full(len(c), 1 << level, dtype=np.float64) for level, c in enumerate(self.compactors)
+        ])
+
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cum = np.cumsum(weights[order])
+        total = cum[-1]
+
+        # 重み付き順位で (n-1)*q の位置を探す
+        ranks = [(total - 1) * p / 100.0 for p in percentiles]
+        idx = np.searchsorted(cum, np.asarray(ranks) + 1, side='left')
+        return [float(items[min(i, len(items) - 1)]) for i in idx]
+
+    def to_dict(self):
+        """JSON保存用の辞書に変換"""
+        return {
+            "type": "kll",
+            "k": self.k,
+            "count": self.count,
+            "levels": [c.tolist() for c in self.compactors],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """to_dict の結果から復元"""
+        sketch = cls(k=data.get("k", 200))
+        sketch.compactors = [np.asarray(level, dtype=np.float64) for level in data["levels"]] or \
+            [np.empty(0, dtype=np.float64)]
+        sketch._offsets = [0] * len(sketch.compactors)
+        sketch.count = int(data["count"])
+        return sketch
+
+
+def exact_quantiles(values, percentiles):
+    """
+    パーセンタイルを1回の np.partition でまとめて計算
+
+    np.percentile（線形補間）と同じ結果を返す。values は並べ替えられる。
+
+    Args:
+        values: 有効値のみの1次元配列（破壊的に並べ替える）
+        percentiles: パーセンタイル（0～100）のリスト
+
+    Returns:
+        値のリスト
+    """
+    if len(values) == 0:
+        return [math.nan for _ in percentiles]
+
+    positions, kth = _quantile_plan(len(values), percentiles)
+    values.partition(kth)
+    return _read_quantiles(values, positions)
+
+
+def _quantile_plan(n, percentiles):
+    """パーセンタイルの位置と、partition に渡す順位"""
+    positions = [(n - 1) * p / 100.0 for p in percentiles]
+    kth = {int(math.floor(pos)) for pos in positions} | {int(math.ceil(pos)) for pos in positions}
+    return positions, sorted(kth)
+
+
+def _read_quantiles(values, positions):
+    """分割済みの配列からパーセンタイルを線形補間で読み取る"""
+    results = []
+    for pos in positions:
+        lo = int(math.floor(pos))
+        hi = int(math.ceil(pos))
+        results.append(float(values[lo] + (values[hi] - values[lo]) * (pos - lo)))
+    return results
+
+
+def valid_values(data):
+    """
+    マスク・NaNを除いた有効値を1次元配列で取り出す（コピーは1回）
+
+    Args:
+        data: numpy配列またはマスク配列
+    """
+    values = np.ma.getdata(data)
+    valid = ~np.isnan(values) if np.issubdtype(values.dtype, np.floating) else np.ones(values.shape, dtype=bool)
+
+    if isinstance(data, np.ma.MaskedArray):
+        valid &= ~np.ma.getmaskarray(data)
+
+    return values[valid]
+
+
+def iter_chunks(dataset, chunk_rows=None):
+    """
+    2次元データセットを行ブロックごとに読み込むイテレータ
+
+    h5py.Dataset を渡した場合は各ブロックだけがメモリに読み込まれる。
+
+    Args:
+        dataset: 2次元配列またはh5py.Dataset
+        chunk_rows: 1ブロックの行数（省略時は約 DEFAULT_CHUNK_SIZE 要素）
+    """
+    n_rows = dataset.shape[0]
+    row_size = int(np.prod(dataset.shape[1:])) or 1
+
+    if chunk_rows is None:
+        chunks = getattr(dataset, 'chunks', None)
+        chunk_rows = max(1, DEFAULT_CHUNK_SIZE // row_size)
+        # HDF5のチャンク境界に揃える
+        if chunks:
+            chunk_rows = max(chunks[0], chunk_rows - chunk_rows % chunks[0])
+
+    for start in range(0, n_rows, chunk_rows):
+        yield dataset[start:start + chunk_rows]
+
+
+def summarize(data, percentiles=DEFAULT_PERCENTILES, sketch_k=200):
+    """
+    配列またはチャンクイテレータの統計を計算
+
+    Args:
+        data: numpy配列・マスク配列、またはそれらのチャンクのイテレータ
+        percentiles: 計算するパーセンタイル
+        sketch_k: チャンクイテレータ入力時のKLLスケッチの精度パラメータ
+
+    Returns:
+        (RunningMoments, {パーセンタイル: 値}, KLLSketch)
+    """
+    moments = RunningMoments()
+    sketch = KLLSketch(k=sketch_k)
+
+    if isinstance(data, np.ndarray):
+        values = valid_values(data)
+
+        # 平均・分散・最小・最大はチャンク単位で1パス
+        for start in range(0, len(values), DEFAULT_CHUNK_SIZE):
+            moments.update(values[start:start + DEFAULT_CHUNK_SIZE])
+
+        # パーセンタイルとスケッチの要素を全て1回の partition から求める
+        # （values は valid_values で作った自前のコピー）
+        n = len(values)
+        quantiles = [math.nan] * (len(percentiles) + 1)
+
+        if n:
+            positions, kth = _quantile_plan(n, list(percentiles) + [50])
+            plan = sketch._bulk_plan(n) if n > 4 * sketch.k else None
+            if plan:
+                kth = np.union1d(kth, np.append(plan[1], min(plan[2], n - 1)))
+
+            values.partition(kth)
+            quantiles = _read_quantiles(values, positions)
+
+            if plan:
+                sketch._bulk_add(values, plan)
+                sketch.count += n
+                sketch._compress()
+            else:
+                sketch.update(values)
+    else:
+        for chunk in data:
+            values = valid_values(np.asanyarray(chunk))
+            moments.update(values)
+            sketch.update(values)
+
+        quantiles = sketch.quantiles(list(percentiles) + [50])
+
+    return moments, dict(zip(list(percentiles) + ['median'], quantiles)), sketch
+
+
+def labelled_statistics(values, labels, n_labels, percentiles=DEFAULT_PERCENTILES, sketch_k=200):
+    """
+    ラベルごとの統計を一括計算
+
+    件数・平均・標準偏差は np.bincount、最小・最大・パーセンタイルは
+    (ラベル, 値) による1回のソートから求める（ラベルごとのループなし）。
+    KLLスケッチはソート済みのラベルごとの区間から作る。
+
+    Args:
+        values: 有効値のみの1次元配列
+        labels: values と同じ長さのラベル配列（1～n_labels、0は集計しない）
+        n_labels: ラベル数
+        percentiles: 計算するパーセンタイル
+        sketch_k: KLLスケッチの精度パラメータ
+
+    Returns:
+        ラベル1～n_labels の統計辞書のリスト（calculate_statistics と同じ形式、スケッチ付き）
+    """
+    val = np.asarray(values, dtype=np.float64)
+    lab = np.asarray(labels, dtype=np.int64)
+
+    counts = np.bincount(lab, minlength=n_labels + 1)
+    sums = np.bincount(lab, weights=val, minlength=n_labels + 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        sq_dev = np.bincount(lab, weights=(val - means[lab]) ** 2, minlength=n_labels + 1)
+        stds = np.sqrt(sq_dev / counts)
+
+    # ラベル→値の順にソートすると各ラベルの値が昇順の連続区間になる
+    order = np.lexsort((val, lab))
+    sorted_val = val[order]
+    starts = np.concatenate(([0], np.cumsum(counts)))[:-1]
+
+    def quantile(q):
+        # np.percentile（線形補間）と同じ位置
+        pos = starts + (counts - 1) * (q / 100.0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        has = counts > 0
+        out = np.full(n_labels + 1, np.nan)
+        out[has] = sorted_val[lo[has]] + (sorted_val[hi[has]] - sorted_val[lo[has]]) * (pos[has] - lo[has])
+        return out
+
+    q_values = {q: quantile(q) for q in sorted(set(percentiles) | {0, 50, 100})}
+
+    results = []
+    for i in range(1, n_labels + 1):
+        if counts[i] == 0:
+            results.append({
+                "valid_pixels": 0,
+                "error": "有効なデータがありません"
+            })
+            continue
+
+        # 期間・圃場をまたいだマージ用（merge_statistics）
+        sketch = KLLSketch(k=sketch_k)
+        sketch.update(sorted_val[starts[i]:starts[i] + counts[i]])
+
+        results.append({
+            "valid_pixels": int(counts[i]),
+            "mean": float(means[i]),
+            "median": float(q_values[50][i]),
+            "std": float(stds[i]),
+            "min": float(q_values[0][i]),
+            "max": float(q_values[100][i]),
+            "percentiles": {str(q): float(q_values[q][i]) for q in percentiles},
+            "sketch": sketch.to_dict()
+        })
+
+    return results
+
+
+def merge_statistics(stats_list, percentiles=DEFAULT_PERCENTILES):
+    """
+    calculate_statistics の結果を複数マージ
+
+    ピクセル数で重み付けしたモーメントと、スケッチをマージした
+    パーセンタイルを返す（ラスタの再読み込みは不要）。
+    スケッチを持たない結果はパーセンタイルの計算から除外される。
+
+    Args:
+        stats_list: 統計情報辞書のリスト
+        percentiles: 計算するパーセンタイル
+
+    Returns:
+        統計情報辞書（calculate_statistics と同じ形式、スケッチ付き）
+    """
+    moments = RunningMoments()
+    sketch = None
+
+    for stats in stats_list:
+        if not stats or not stats.get("valid_pixels"):
+            continue
+
+        moments.merge(RunningMoments.from_statistics(stats))
+
+        if stats.get("sketch"):
+            other = KLLSketch.from_dict(stats["sketch"])
+            if sketch is None:
+                sketch = other
+            else:
+                sketch.merge(other)
+
+    if moments.count == 0:
+        return {
+            "valid_pixels": 0,
+            "error": "有効なデータがありません"
+        }
+
+    quantiles = sketch.quantiles(list(percentiles) + [50]) if sketch else [None] * (len(percentiles) + 1)
+
+    merged = {
+        "valid_pixels": moments.count,
+        "mean": moments.mean,
+        "median": quantiles[-1],
+        "std": moments.std,
+        "min": moments.min,
+        "max": moments.max,
+        "percentiles": {str(p): q for p, q in zip(percentiles, quantiles)},
+    }
+
+    if sketch:
+        merged["sketch"] = sketch.to_dict()
+
+    return merged
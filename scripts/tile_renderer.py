@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile Renderer
+NDVI/LSTラスタのXYZタイル（Webメルカトル、256px PNG）を生成
+
+グラニュールから各タイルの範囲だけを読み込み（GeoTIFFはウィンドウ読み込み、
+HDF5はハイパースラブ）、ズームアウト時は間引いて読む（GeoTIFFは内部の
+オーバービュー、HDF5はストライド読み込み）。カラーマップを適用したPNGは
+data/tiles/ にLRUで保存し、2回目以降はディスクから返す。
+
+使い方:
+    # 1タイルを描画して保存
+    python scripts/tile_renderer.py NDVI 2026-01-08 13 7180 3302 -o tile.png
+"""
+
+import argparse
+import io
+import math
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from geo_index import file_signature
+from geotiff_processor import (
+    H5PY_AVAILABLE, MATPLOTLIB_AVAILABLE, RASTERIO_AVAILABLE, find_hdf5_dataset, grid_interval,
+    hdf5_overview_levels, select_overview
+)
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.warp import transform as warp_transform, transform_bounds
+    from rasterio.windows import Window
+
+if H5PY_AVAILABLE:
+    import h5py
+
+if MATPLOTLIB_AVAILABLE:
+    from matplotlib import colormaps
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "geotiff"
+TILE_CACHE_DIR = Path(__file__).parent.parent / "data" / "tiles"
+TILE_CACHE_MAX_BYTES = int(float(os.getenv('TILE_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+TILE_SIZE = 256
+MAX_ZOOM = 22
+
+# プロダクトごとのカラーマップと表示範囲
+COLORMAPS = {
+    'NDVI': ('RdYlGn', 0.0, 1.0),
+    'LST': ('RdYlBu_r', 260.0, 320.0),  # Kelvin
+}
+
+RASTER_SUFFIXES = ('.h5', '.he5', '.tif', '.tiff')
+
+# ファイル名中のプロダクト表記（NDVIはL2 VGIプロダクトに含まれる。
+# jaxa_api_client.gportal_dataset_id と同じ対応）
+PRODUCT_FILE_TAGS = {
+    'NDVI': ('NDVI', 'VGI'),
+    'LST': ('LST',),
+}
+
+# グラニュールのフットプリント {パス: (ファイルの識別情報, フットプリント)}
+_FOOTPRINT_CACHE = {}
+
+
+def tile_lonlat(z, x, y, size=TILE_SIZE):
+    """
+    タイルの各ピクセル中心の経度・緯度
+
+    Returns:
+        (lons, lats) いずれも (size, size) の配列
+    """
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return np.meshgrid(lons, lats)
+
+
+def tile_bounds(z, x, y):
+    """タイルの範囲 [lon_min, lat_min, lon_max, lat_max]"""
+    n = 2 ** z
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return [lon_min, lat_min, lon_max, lat_max]
+
+
+def validate_tile(z, x, y):
+    """
+    タイル座標を検証
+
+    Raises:
+        ValueError: ズーム・タイル番号が範囲外
+    """
+    if not 0 <= z <= MAX_ZOOM:
+        raise ValueError(f"ズームレベルは0〜{MAX_ZOOM}で指定してください: {z}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"タイル番号が範囲外です: {z}/{x}/{y}")
+
+
+def normalize_date(date):
+    """YYYY-MM-DD / YYYYMMDD を YYYYMMDD に（latest はそのまま）"""
+    if date == 'latest':
+        return date
+    compact = date.replace('-', '')
+    if not re.fullmatch(r'\d{8}', compact):
+        raise ValueError(f"日付は YYYY-MM-DD で指定してください: {date}")
+    return compact
+
+
+def product_pattern(product):
+    """ファイル名がプロダクトを表すかを判定する正規表現（_VGI_ などの区切りで一致）"""
+    tags = PRODUCT_FILE_TAGS.get(product, (product,))
+    return re.compile(rf"(?<![A-Z0-9])({'|'.join(map(re.escape, tags))})(?![A-Z0-9])")
+
+
+def raster_footprint(file_path):
+    """
+    グラニュールのフットプリント
+
+    GeoTIFFは範囲を緯度経度に変換し、HDF5は緯度経度グリッドの空間索引
+    （geo_index、ファイルごとに保存済み）の範囲を使う。ファイルが
+    更新されるまでプロセス内で再利用する。
+
+    Returns:
+        [lon_min, lat_min, lon_max, lat_max]（求められない場合はNone）
+    """
+    path = Path(file_path).resolve()
+    signature = file_signature(path)
+
+    cached = _FOOTPRINT_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    footprint = None
+    try:
+        if path.suffix.lower() in ('.tif', '.tiff'):
+            if RASTERIO_AVAILABLE:
+                with rasterio.open(path) as src:
+                    if src.crs is not None:
+                        footprint = list(transform_bounds(src.crs, 'EPSG:4326', *src.bounds))
+        elif H5PY_AVAILABLE:
+            from geo_index import get_geo_index
+
+            with h5py.File(path, 'r') as f:
+                if 'Geometry_data/Latitude' in f and 'Geometry_data/Longitude' in f:
+                    index = get_geo_index(f)
+                    footprint = [float(index.lons.min()), float(index.lats.min()),
+                                 float(index.lons.max()), float(index.lats.max())]
+    except Exception as e:
+        print(f"⚠️  フットプリントを取得できません: {path.name}: {e}", file=sys.stderr)
+
+    _FOOTPRINT_CACHE[path] = (signature, footprint)
+    return footprint
+
+
+def overlap_area(footprint, bbox):
+    """フットプリントと範囲の重なりの面積（度²、重ならない場合は0）"""
+    width = min(footprint[2], bbox[2]) - max(footprint[0], bbox[0])
+    height = min(footprint[3], bbox[3]) - max(footprint[1], bbox[1])
+    return max(0.0, width) * max(0.0, height)
+
+
+def find_source(product, date, data_dir=DATA_DIR, bbox=None):
+    """
+    プロダクト・観測日のグラニュールを検索
+
+    ファイル名にプロダクト名（NDVIはVGIも。例: _NDVI、_L2SG_VGI_）と
+    観測日（YYYYMMDD）を含むファイルを探す。bbox を指定した場合は
+    フットプリントが重なるものだけを対象とし、同じ観測日に複数ある場合
+    （別のシーン・タイル）は重なりが最も大きいものを選ぶ。フットプリントを
+    求められないファイルは重なりが最小とみなす。
+    date が latest の場合は観測日（なければ更新時刻）が最も新しいもの。
+
+    Args:
+        product: プロダクト名（NDVI / LST）
+        date: 観測日（YYYY-MM-DD / YYYYMMDD / latest）
+        data_dir: グラニュールの保存先
+        bbox: タイルの範囲 [lon_min, lat_min, lon_max, lat_max]
+
+    Returns:
+        Path（見つからない場合はNone）
+    """
+    date = normalize_date(date)
+    pattern = product_pattern(product.upper())
+
+    candidates = [
+        path for path in Path(data_dir).glob('*')
+        if path.suffix.lower() in RASTER_SUFFIXES and pattern.search(path.name.upper())
+    ]
+
+    if date != 'latest':
+        candidates = [path for path in candidates if date in path.name]
+
+    def coverage(path):
+        if bbox is None:
+            return 0.0
+        footprint = raster_footprint(path)
+        return -1.0 if footprint is None else overlap_area(footprint, bbox)
+
+    scored = [(coverage(path), path) for path in candidates]
+    scored = [(area, path) for area, path in scored if area != 0.0 or bbox is None]
+    if not scored:
+        return None
+
+    if date != 'latest':
+        # 重なりが最も大きいもの（同じならファイル名順で先のもの）
+        return min(scored, key=lambda item: (-item[0], item[1]))[1]
+
+    def observed(item):
+        area, path = item
+        found = re.search(r'(\d{8})', path.name)
+        return (found.group(1) if found else '', path.stat().st_mtime_ns, area)
+
+    return max(scored, key=observed)[1]
+
+
+def sample_nearest(data, rows, cols, shape):
+    """
+    間引き読み込みした配列から最近傍でサンプリング
+
+    Args:
+        data: 読み込んだ配列（マスク付き可）
+        rows, cols: 読み込み範囲内の行・列の小数座標（元解像度）
+        shape: 読み込み範囲の元解像度での形状 (行数, 列数)
+
+    Returns:
+        タイル形状の float 配列（範囲外・欠損は NaN）
+    """
+    ri = np.floor(rows * data.shape[0] / shape[0]).astype(np.int64)
+    ci = np.floor(cols * data.shape[1] / shape[1]).astype(np.int64)
+    inside = (ri >= 0) & (ri < data.shape[0]) & (ci >= 0) & (ci < data.shape[1])
+
+    values = np.full(rows.shape, np.nan)
+    filled = np.ma.filled(np.ma.asarray(data, dtype=np.float64), np.nan)
+    values[inside] = filled[ri[inside], ci[inside]]
+    return values
+
+
+def decimated_shape(height, width, size=TILE_SIZE):
+    """タイル描画に十分な読み込みサイズ（タイルの2倍まで）"""
+    return max(1, min(height, size * 2)), max(1, min(width, size * 2))
+
+
+def read_tile_geotiff(file_path, lons, lats):
+    """
+    GeoTIFFからタイル範囲をウィンドウ読み込み
+
+    縮小読み込み（out_shape）にするとGDALが内部のオーバービューを使うため、
+    ズームアウトしてもグラニュール全体は読まない。
+
+    Returns:
+        タイル形状の float 配列（データなしはNone）
+    """
+    with rasterio.open(file_path) as src:
+        xs, ys = lons, lats
+        if src.crs is not None and not src.crs.is_geographic:
+            xs, ys = warp_transform('EPSG:4326', src.crs, lons.ravel(), lats.ravel())
+            xs = np.asarray(xs).reshape(lons.shape)
+            ys = np.asarray(ys).reshape(lats.shape)
+
+        cols, rows = ~src.transform * (xs, ys)
+
+        r0 = max(0, int(np.floor(rows.min())))
+        r1 = min(src.height, int(np.ceil(rows.max())) + 1)
+        c0 = max(0, int(np.floor(cols.min())))
+        c1 = min(src.width, int(np.ceil(cols.max())) + 1)
+        if r0 >= r1 or c0 >= c1:
+            return None
+
+        data = src.read(
+            1,
+            window=Window(c0, r0, c1 - c0, r1 - r0),
+            out_shape=decimated_shape(r1 - r0, c1 - c0),
+            resampling=Resampling.nearest,
+            masked=True
+        )
+
+    return sample_nearest(data, rows - r0, cols - c0, (r1 - r0, c1 - c0))
+
+
+def read_tile_hdf5(file_path, dataset_name, lons, lats):
+    """
+    GCOM-C/SGLI HDF5からタイル範囲のハイパースラブを読み込み
+
+    タイル範囲の緯度経度格子からピクセル座標へのアフィン変換を推定して
+    タイルのピクセルを対応付ける。ズームアウト時はオーバービュー（raster_convert）が
+    あればそれを使い、ストライド読み込みで間引く。
+
+    Returns:
+        タイル形状の float 配列（データなしはNone）
+    """
+    from geo_index import get_geo_index
+
+    lat_path = 'Geometry_data/Latitude'
+    lon_path = 'Geometry_data/Longitude'
+
+    with h5py.File(file_path, 'r') as f:
+        data_path = find_hdf5_dataset(f, dataset_name)
+        if not data_path or lat_path not in f or lon_path not in f:
+            return None
+
+        dataset = f[data_path]
+        index = get_geo_index(f, lat_path=lat_path, lon_path=lon_path)
+
+        grid = index.bbox_window(lats.min(), lats.max(), lons.min(), lons.max())
+        if grid is None:
+            # タイルが格子間隔より小さい場合は最寄りの格子点
+            hit = index.nearest(float(lats.mean()), float(lons.mean()))
+            if hit is None:
+                return None
+            grid = (hit[0], hit[0], hit[1], hit[1])
+
+        # 変換の推定に2×2以上の格子点を使うため1格子分広げる
+        g_rows, g_cols = index.shape
+        gr0, gr1 = max(0, grid[0] - 1), min(g_rows, grid[1] + 2)
+        gc0, gc1 = max(0, grid[2] - 1), min(g_cols, grid[3] + 2)
+
+        grid_lats = f[lat_path][gr0:gr1, gc0:gc1].astype(np.float64)
+        grid_lons = f[lon_path][gr0:gr1, gc0:gc1].astype(np.float64)
+        row_step, col_step = grid_interval(f[lat_path], index.shape, dataset.shape)
+
+        pixel_rows, pixel_cols = np.mgrid[gr0:gr1, gc0:gc1]
+        valid = np.isfinite(grid_lats) & np.isfinite(grid_lons)
+        if valid.sum() < 3:
+            return None
+
+        design = np.column_stack([grid_lats[valid], grid_lons[valid], np.ones(valid.sum())])
+        targets = np.column_stack([pixel_rows[valid] * row_step, pixel_cols[valid] * col_step])
+        coef, *_ = np.linalg.lstsq(design, targets, rcond=None)
+
+        tile_points = np.stack([lats, lons, np.ones_like(lats)], axis=-1)
+        rows, cols = np.moveaxis(tile_points @ coef, -1, 0)
+
+        height, width = dataset.shape[:2]
+        r0 = max(0, int(np.floor(rows.min())))
+        r1 = min(height, int(np.ceil(rows.max())) + 1)
+        c0 = max(0, int(np.floor(cols.min())))
+        c1 = min(width, int(np.ceil(cols.max())) + 1)
+        if r0 >= r1 or c0 >= c1:
+            return None
+
+        out_h, out_w = decimated_shape(r1 - r0, c1 - c0)
+        step_r = math.ceil((r1 - r0) / out_h)
+        step_c = math.ceil((c1 - c0) / out_w)
+
+        # 間引き間隔以下で最も粗いオーバービューがあれば、そこから残りを間引く
+        levels = hdf5_overview_levels(f, data_path)
+        level = select_overview(levels, min(step_r, step_c))
+        if level > 1:
+            dataset = f[levels[level]]
+            rows, cols = rows / level, cols / level
+            r0, r1 = r0 // level, math.ceil(r1 / level)
+            c0, c1 = c0 // level, math.ceil(c1 / level)
+            step_r, step_c = max(1, step_r // level), max(1, step_c // level)
+
+        data = dataset[r0:r1:step_r, c0:c1:step_c]
+
+    # ストライド読み込みの末尾は範囲の端まで届かないため、間隔から座標を換算する
+    return sample_nearest(data, (rows - r0) / step_r, (cols - c0) / step_c, data.shape)
+
+
+def colorize(values, product):
+    """
+    カラーマップを適用したRGBA配列（NaNは透明）
+
+    Args:
+        values: タイル形状の float 配列
+        product: プロダクト名（COLORMAPS のキー）
+    """
+    cmap_name, vmin, vmax = COLORMAPS.get(product, ('viridis', np.nanmin(values), np.nanmax(values)))
+    lut = (colormaps[cmap_name](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+
+    valid = np.isfinite(values)
+    scaled = np.zeros(values.shape, dtype=np.int64)
+    if vmax > vmin:
+        scaled[valid] = np.clip((values[valid] - vmin) / (vmax - vmin) * 255, 0, 255).astype(np.int64)
+
+    rgba = lut[scaled]
+    rgba[~valid, 3] = 0
+    return rgba
+
+
+def encode_png(rgba):
+    """RGBA配列をPNGにエンコード"""
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buffer, format='PNG', optimize=False)
+    return buffer.getvalue()
+
+
+def render_tile(file_path, product, z, x, y):
+    """
+    1タイルを描画
+
+    Args:
+        file_path: グラニュールのパス
+        product: プロダクト名（NDVI / LST）
+        z, x, y: タイル座標
+
+    Returns:
+        PNGのバイト列（範囲外は透明タイル）
+    """
+    if not (MATPLOTLIB_AVAILABLE and PIL_AVAILABLE):
+        raise ImportError("タイル描画には matplotlib と Pillow が必要です")
+
+    lons, lats = tile_lonlat(z, x, y)
+
+    if Path(file_path).suffix.lower() in ('.tif', '.tiff'):
+        if not RASTERIO_AVAILABLE:
+            raise ImportError("rasterioがインストールされていません")
+        values = read_tile_geotiff(file_path, lons, lats)
+    else:
+        if not H5PY_AVAILABLE:
+            raise ImportError("h5pyがインストールされていません")
+        values = read_tile_hdf5(file_path, product, lons, lats)
+
+    if values is None:
+        values = np.full(lons.shape, np.nan)
+
+    return encode_png(colorize(values, product))
+
+
+def source_signature(file_path):
+    """グラニュールの識別子（更新されたらタイルを作り直す）"""
+    st = Path(file_path).stat()
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+class TileCache:
+    """
+    描画済みタイルのディスクLRUキャッシュ
+
+    読み込み時にファイルの更新時刻を現在時刻に更新し、合計サイズが
+    上限を超えたら更新時刻の古いファイルから削除する。
+    """
+
+    def __init__(self, cache_dir=TILE_CACHE_DIR, max_bytes=TILE_CACHE_MAX_BYTES):
+        """
+        Args:
+            cache_dir: 保存先ディレクトリ
+            max_bytes: 合計サイズの上限（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path_for(self, key):
+        """キー（パス要素のタプル）に対応するファイルパス"""
+        return self.cache_dir.joinpath(*[str(part) for part in key[:-1]], f"{key[-1]}.png")
+
+    def get(self, key):
+        """保存済みのタイル（なければNone）"""
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key, data):
+        """タイルを保存（上限を超えたら古いものから削除）"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 読み込み側が書き込み途中のファイルを読まないよう一時ファイル経由で置き換える
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._size += len(data)
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        return self.cache_dir.rglob('*.png')
+
+    def _evict(self):
+        """合計サイズが上限の9割になるまで古いタイルを削除"""
+        entries = []
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        self._size = total
+
+
+tile_cache = TileCache()
+
+
+def get_tile(product, date, z, x, y, data_dir=DATA_DIR, cache=None):
+    """
+    タイルを取得（キャッシュになければ描画して保存）
+
+    Args:
+        product: プロダクト名（NDVI / LST）
+        date: 観測日（YYYY-MM-DD / YYYYMMDD / latest）
+        z, x, y: タイル座標
+        data_dir: グラニュールの保存先
+        cache: TileCache（省略時は tile_cache）
+
+    Returns:
+        (PNGのバイト列, ETag)。タイルと重なるグラニュールがない場合はNone
+
+    Raises:
+        ValueError: 不正なタイル座標・日付
+    """
+    validate_tile(z, x, y)
+    product = product.upper()
+    cache = tile_cache if cache is None else cache
+
+    # タイルと重なるグラニュール（同じ日の別シーンを取り違えない）
+    source = find_source(product, date, data_dir, bbox=tile_bounds(z, x, y))
+    if source is None:
+        return None
+
+    # 元ファイルが更新されたら別キーになり、古いタイルはLRUで消える
+    key = (product, source.stem, source_signature(source), z, x, y)
+    etag = '-'.join(str(part) for part in key[1:])
+
+    data = cache.get(key)
+    if data is None:
+        data = render_tile(source, product, z, x, y)
+        cache.set(key, data)
+
+    return data, etag
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NDVI/LSTのXYZタイルを描画")
+    parser.add_argument("product", help="プロダクト名（NDVI / LST）")
+    parser.add_argument("date", help="観測日（YYYY-MM-DD、latest で最新）")
+    parser.add_argument("z", type=int, help="ズームレベル")
+    parser.add_argument("x", type=int, help="タイルX")
+    parser.add_argument("y", type=int, help="タイルY")
+    parser.add_argument("-o", "--output", type=str, default="tile.png",
+                       help="出力PNGファイル（デフォルト: tile.png）")
+    parser.add_argument("--data-dir", type=str, default=str(DATA_DIR),
+                       help="グラニュールの保存先")
+
+    args = parser.parse_args()
+
+    result = get_tile(args.product, args.date, args.z, args.x, args.y, data_dir=args.data_dir)
+    if result is None:
+        print(f"✗ グラニュールが見つかりません: {args.product} {args.date}", file=sys.stderr)
+        sys.exit(1)
+
+    Path(args.output).write_bytes(result[0])
+    print(f"✓ タイル保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
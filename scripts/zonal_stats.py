@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zonal Statistics
+圃場ポリゴン単位のゾーン統計
+
+正方形バッファではなく圃場の境界ポリゴン（GeoJSON または Neo4j の
+Farm.boundary）でピクセルを集計する。
+
+- ポリゴンはラスタ格子ごとに一度だけラベル配列（0=圃場外, i=i番目の圃場）へ
+  ラスタライズし、メモリと data/metadata/ にキャッシュする
+- 全圃場の統計は np.bincount と1回のソートでまとめて計算する
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Windows環境でのUTF-8出力設定
+if sys.platform == 'win32':
+    import codecs
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+import numpy as np
+
+from geotiff_processor import (
+    H5PY_AVAILABLE,
+    RASTERIO_AVAILABLE,
+    find_hdf5_dataset,
+    grid_interval,
+)
+from stats_engine import labelled_statistics
+
+if H5PY_AVAILABLE:
+    import h5py
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    from rasterio.windows import Window
+
+# 1度あたりの距離（km、緯度方向）
+KM_PER_DEG = 111.32
+
+# メモリ上のラベル配列キャッシュ（最大件数）
+LABEL_CACHE_SIZE = 32
+_LABEL_CACHE = OrderedDict()
+
+
+# ---------------------------------------------------------------------------
+# 圃場ポリゴンの読み込み
+# ---------------------------------------------------------------------------
+
+def point_to_polygon(lat, lon, buffer_km):
+    """
+    地点を緯度補正した正方形ポリゴンに変換
+
+    経度方向の1度の長さは cos(緯度) 倍になるため、経度の幅を補正する。
+    """
+    dlat = buffer_km / KM_PER_DEG
+    dlon = buffer_km / (KM_PER_DEG * np.cos(np.radians(lat)))
+    return [[
+        (lon - dlon, lat - dlat),
+        (lon + dlon, lat - dlat),
+        (lon + dlon, lat + dlat),
+        (lon - dlon, lat + dlat),
+        (lon - dlon, lat - dlat),
+    ]]
+
+
+def geometry_to_polygons(geometry, default_buffer_km=0.5):
+    """
+    GeoJSONジオメトリをポリゴンのリストに変換
+
+    Returns:
+        [ポリゴン, ...]。ポリゴンはリングのリスト（先頭が外周、以降は穴）
+    """
+    geom_type = geometry.get("type")
+    coords = geometry.get("coordinates")
+
+    if geom_type == "Polygon":
+        return [coords]
+    if geom_type == "MultiPolygon":
+        return list(coords)
+    if geom_type == "Point":
+        lon, lat = coords[:2]
+        return [point_to_polygon(lat, lon, default_buffer_km)]
+
+    raise ValueError(f"未対応のジオメトリ: {geom_type}")
+
+
+def load_fields_geojson(geojson_path, default_buffer_km=0.5):
+    """
+    GeoJSONから圃場ポリゴンを読み込み
+
+    Pointフィーチャーはプロパティ buffer_km（なければ default_buffer_km）の
+    正方形ポリゴンとして扱う。
+
+    Args:
+        geojson_path: GeoJSONファイルパス（exports/nanaka_farm_fields.geojson 等）
+        default_buffer_km: Pointフィーチャーのバッファ距離（km）
+
+    Returns:
+        [{"name", "polygons"}, ...]
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    fields = []
+    for i, feature in enumerate(geojson.get("features", [])):
+        properties = feature.get("properties") or {}
+        buffer_km = float(properties.get("buffer_km") or default_buffer_km)
+
+        fields.append({
+            "name": properties.get("name") or f"field_{i}",
+            "polygons": geometry_to_polygons(feature["geometry"], buffer_km),
+        })
+
+    return fields
+
+
+def load_fields_neo4j(uri, user, password, default_buffer_km=0.5):
+    """
+    Neo4jのFarmノードから圃場ポリゴンを読み込み
+
+    Farm.boundary（GeoJSONジオメトリ文字列）があればそれを、
+    なければ緯度経度を中心とした正方形ポリゴンを使用する。
+
+    Returns:
+        [{"name", "polygons"}, ...]
+    """
+    from neo4j import GraphDatabase
+
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        with driver.session() as session:
+            result = session.run(
+                """
+                MATCH (f:Farm)
+                RETURN f.name AS name, f.boundary AS boundary,
+                       f.latitude AS lat, f.longitude AS lon
+                ORDER BY f.name
+                """
+            )
+
+            fields = []
+            for record in result:
+                if record["boundary"]:
+                    polygons = geometry_to_polygons(json.loads(record["boundary"]), default_buffer_km)
+                elif record["lat"] is not None and record["lon"] is not None:
+                    polygons = [point_to_polygon(record["lat"], record["lon"], default_buffer_km)]
+                else:
+                    continue
+
+                fields.append({"name": record["name"], "polygons": polygons})
+
+            return fields
+    finally:
+        driver.close()
+
+
+def fields_bounds(fields):
+    """全圃場を包含する (経度最小, 緯度最小, 経度最大, 緯度最大)"""
+    coords = np.concatenate([
+        np.asarray(ring, dtype=np.float64)[:, :2]
+        for field in fields for polygon in field["polygons"] for ring in polygon
+    ])
+    return coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max()
+
+
+def fields_hash(fields):
+    """圃場ポリゴンのハッシュ（ラベル配列キャッシュのキー）"""
+    payload = json.dumps([[field["name"], field["polygons"]] for field in fields], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# ラスタライズ
+# ---------------------------------------------------------------------------
+
+def points_in_polygon(lon, lat, polygon):
+    """
+    ピクセル中心がポリゴン内にあるかを判定（偶奇規則、全ピクセル一括）
+
+    Args:
+        lon: 経度配列
+        lat: 緯度配列
+        polygon: リングのリスト（穴は偶奇規則で除外される）
+
+    Returns:
+        ブール配列
+    """
+    inside = np.zeros(lon.shape, dtype=bool)
+
+    for ring in polygon:
+        ring = np.asarray(ring, dtype=np.float64)[:, :2]
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            if ay == by:
+                continue
+            crosses = (ay > lat) != (by > lat)
+            x_cross = ax + (lat - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (lon < x_cross)
+
+    return inside
+
+
+def rasterize_fields(fields, lon, lat):
+    """
+    圃場ポリゴンをラベル配列にラスタライズ
+
+    重なりがある場合は後の圃場が優先される。
+    各ポリゴンは外接矩形内のピクセルだけを判定する。
+
+    Args:
+        fields: [{"name", "polygons"}, ...]
+        lon: ピクセル中心の経度（2次元）
+        lat: ピクセル中心の緯度（2次元）
+
+    Returns:
+        int32ラベル配列（0=圃場外, i=fields[i-1]）
+    """
+    labels = np.zeros(lon.shape, dtype=np.int32)
+
+    for label, field in enumerate(fields, start=1):
+        for polygon in field["polygons"]:
+            outer = np.asarray(polygon[0], dtype=np.float64)
+            box = (
+                (lon >= outer[:, 0].min()) & (lon <= outer[:, 0].max())
+                & (lat >= outer[:, 1].min()) & (lat <= outer[:, 1].max())
+            )
+            if not box.any():
+                continue
+
+            rows = np.flatnonzero(box.any(axis=1))
+            cols = np.flatnonzero(box.any(axis=0))
+            sub = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+
+            inside = points_in_polygon(lon[sub], lat[sub], polygon)
+            labels[sub][inside] = label
+
+    return labels
+
+
+def _load_labels(cache_key, cache_dir, build):
+    """
+    ラベル配列をキャッシュ（メモリ → data/metadata/）から取得、なければ構築
+
+    Args:
+        cache_key: 格子と圃場ポリゴンから求めたキー
+        cache_dir: ディスクキャッシュの保存先
+        build: () -> (window, labels) を返す構築関数
+
+    Returns:
+        (window, labels)。window は ((行開始, 行終了), (列開始, 列終了))
+    """
+    cached = _LABEL_CACHE.get(cache_key)
+    if cached is not None:
+        _LABEL_CACHE.move_to_end(cache_key)
+        return cached
+
+    cache_path = Path(cache_dir) / f"labels_{cache_key[:20]}.npz"
+    entry = None
+
+    if cache_path.exists():
+        try:
+            with np.load(cache_path) as z:
+                entry = (tuple(map(tuple, z['window'])), z['labels'])
+        except Exception as e:
+            print(f"⚠️  ラベル配列キャッシュの読み込みに失敗しました: {e}", file=sys.stderr)
+
+    if entry is None:
+        entry = build()
+        if entry is None:
+            return None
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, window=np.array(entry[0]), labels=entry[1])
+            tmp_path.replace(cache_path)
+        except OSError as e:
+            print(f"⚠️  ラベル配列キャッシュを保存できませんでした: {e}", file=sys.stderr)
+
+    _LABEL_CACHE[cache_key] = entry
+    if len(_LABEL_CACHE) > LABEL_CACHE_SIZE:
+        _LABEL_CACHE.popitem(last=False)
+
+    return entry
+
+
+def _cache_key(grid_descriptor, fields):
+    """格子の記述と圃場ポリゴンからキャッシュキーを作成"""
+    payload = json.dumps(grid_descriptor, sort_keys=True) + fields_hash(fields)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _interp_grid(grid, row_pos, col_pos):
+    """粗い緯度経度格子を画像ピクセル位置へ双線形補間"""
+    n_rows, n_cols = grid.shape
+
+    r0 = np.clip(np.floor(row_pos).astype(int), 0, max(n_rows - 2, 0))
+    c0 = np.clip(np.floor(col_pos).astype(int), 0, max(n_cols - 2, 0))
+    r1 = np.minimum(r0 + 1, n_rows - 1)
+    c1 = np.minimum(c0 + 1, n_cols - 1)
+    fr = (row_pos - r0)[:, None]
+    fc = (col_pos - c0)[None, :]
+
+    top = grid[np.ix_(r0, c0)] * (1 - fc) + grid[np.ix_(r0, c1)] * fc
+    bottom = grid[np.ix_(r1, c0)] * (1 - fc) + grid[np.ix_(r1, c1)] * fc
+    return top * (1 - fr) + bottom * fr
+
+
+def hdf5_labels(hdf_file, data_shape, fields, cache_dir):
+    """
+    HDF5（SGLI曲線格子）上のラベル配列と読み込みウィンドウを取得
+
+    Returns:
+        (window, labels)。圃場がグラニュール外の場合はNone
+    """
+    from geo_index import file_signature, get_geo_index
+
+    lat_ds = hdf_file['Geometry_data/Latitude']
+    lon_ds = hdf_file['Geometry_data/Longitude']
+    file_path = Path(hdf_file.filename).resolve()
+
+    grid_descriptor = {
+        "file": str(file_path),
+        "source": file_signature(file_path),
+        "shape": list(data_shape),
+    }
+
+    def build():
+        index = get_geo_index(hdf_file)
+        lon_min, lat_min, lon_max, lat_max = fields_bounds(fields)
+
+        # 格子間隔分の余白を付けて全圃場を包含する格子範囲を求める
+        margin = index.spacing_deg
+        bounds = index.bbox_window(lat_min - margin, lat_max + margin, lon_min - margin, lon_max + margin)
+        if bounds is None:
+            return None
+
+        r0, r1, c0, c1 = bounds
+        row_step, col_step = grid_interval(lat_ds, index.shape, data_shape)
+
+        rows = (max(0, r0 * row_step), min(data_shape[0], (r1 + 1) * row_step))
+        cols = (max(0, c0 * col_step), min(data_shape[1], (c1 + 1) * col_step))
+
+        # ウィンドウ内の画像ピクセル中心の緯度経度
+        row_pos = np.arange(*rows) / row_step
+        col_pos = np.arange(*cols) / col_step
+        g_rows = slice(int(row_pos[0]), min(index.shape[0], int(np.ceil(row_pos[-1])) + 1))
+        g_cols = slice(int(col_pos[0]), min(index.shape[1], int(np.ceil(col_pos[-1])) + 1))
+
+        lat = _interp_grid(lat_ds[g_rows, g_cols], row_pos - g_rows.start, col_pos - g_cols.start)
+        lon = _interp_grid(lon_ds[g_rows, g_cols], row_pos - g_rows.start, col_pos - g_cols.start)
+
+        return (rows, cols), rasterize_fields(fields, lon, lat)
+
+    return _load_labels(_cache_key(grid_descriptor, fields), cache_dir, build)
+
+
+def geotiff_labels(src, fields, cache_dir):
+    """
+    GeoTIFF（緯度経度の規則格子）上のラベル配列と読み込みウィンドウを取得
+
+    同じ格子（CRS・変換行列・サイズ）のファイル間でラベル配列を共有する。
+
+    Returns:
+        (window, labels)。圃場がラスタ外の場合はNone
+    """
+    grid_descriptor = {
+        "crs": str(src.crs),
+        "transform": list(src.transform)[:6],
+        "shape": [src.height, src.width],
+    }
+
+    def build():
+        lon_min, lat_min, lon_max, lat_max = fields_bounds(fields)
+
+        r_a, c_a = src.index(lon_min, lat_max)
+        r_b, c_b = src.index(lon_max, lat_min)
+        rows = (max(0, min(r_a, r_b)), min(src.height, max(r_a, r_b) + 1))
+        cols = (max(0, min(c_a, c_b)), min(src.width, max(c_a, c_b) + 1))
+
+        if rows[0] >= rows[1] or cols[0] >= cols[1]:
+            return None
+
+        # ピクセル中心の座標
+        rr, cc = np.meshgrid(np.arange(*rows) + 0.5, np.arange(*cols) + 0.5, indexing='ij')
+        t = src.transform
+        lon = t.a * cc + t.b * rr + t.c
+        lat = t.d * cc + t.e * rr + t.f
+
+        return (rows, cols), rasterize_fields(fields, lon, lat)
+
+    return _load_labels(_cache_key(grid_descriptor, fields), cache_dir, build)
+
+
+# ---------------------------------------------------------------------------
+# 集計
+# ---------------------------------------------------------------------------
+
+def zonal_statistics(data, labels, n_fields, percentiles=(25, 50, 75), sketch_k=200):
+    """
+    ラベル配列で全圃場の統計を一括計算
+
+    件数・平均・標準偏差は np.bincount、最小・最大・パーセンタイルは
+    (ラベル, 値) による1回のソートから求める（圃場ごとのループなし、
+    stats_engine.labelled_statistics）。
+
+    Args:
+        data: 値の2次元配列（マスク配列・NaN対応）
+        labels: ラベル配列（0=圃場外）
+        n_fields: 圃場数
+        percentiles: 計算するパーセンタイル
+        sketch_k: KLLスケッチの精度パラメータ
+
+    Returns:
+        圃場ごとの統計辞書のリスト（calculate_statisticsと同じ形式、スケッチ付き）
+    """
+    values = np.ma.getdata(data).astype(np.float64, copy=False)
+    valid = (labels > 0) & np.isfinite(values)
+    if isinstance(data, np.ma.MaskedArray):
+        valid &= ~np.ma.getmaskarray(data)
+
+    return labelled_statistics(values[valid], labels[valid], n_fields, percentiles, sketch_k)
+
+
+def process_file_zonal(file_path, fields, dataset_name="NDVI", cache_dir=None):
+    """
+    ファイルを1回読み込んで全圃場のゾーン統計を計算
+
+    Args:
+        file_path: GeoTIFF/HDF5ファイルパス
+        fields: [{"name", "polygons"}, ...]
+        dataset_name: データセット名（HDF5用）
+        cache_dir: ラベル配列キャッシュの保存先（省略時は data/metadata/）
+
+    Returns:
+        結果辞書（fields に圃場ごとの統計）
+    """
+    file_path = Path(file_path)
+
+    if not file_path.exists():
+        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+    if cache_dir is None:
+        cache_dir = file_path.parent.parent / "metadata"
+
+    print(f"\n📊 ゾーン統計: {file_path.name}")
+    print(f"   圃場数: {len(fields)}")
+
+    suffix = file_path.suffix.lower()
+
+    try:
+        if suffix in ['.tif', '.tiff']:
+            if not RASTERIO_AVAILABLE:
+                raise ImportError("rasterioがインストールされていません")
+
+            with rasterio.open(file_path) as src:
+                entry = geotiff_labels(src, fields, cache_dir)
+                if entry is None:
+                    raise ValueError("圃場がラスタの範囲外です")
+
+                (rows, cols), labels = entry
+                data = src.read(1, window=Window.from_slices(rows, cols))
+                if src.nodata is not None:
+                    data = np.ma.masked_equal(data, src.nodata)
+
+        elif suffix in ['.h5', '.hdf5']:
+            if not H5PY_AVAILABLE:
+                raise ImportError("h5pyがインストールされていません")
+
+            with h5py.File(file_path, 'r') as f:
+                data_path = find_hdf5_dataset(f, dataset_name)
+                if not data_path:
+                    raise ValueError(f"データセットが見つかりません: {dataset_name}")
+
+                dataset = f[data_path]
+                entry = hdf5_labels(f, dataset.shape, fields, cache_dir)
+                if entry is None:
+                    raise ValueError("圃場がグラニュールの範囲外です")
+
+                (rows, cols), labels = entry
+                data = dataset[slice(*rows), slice(*cols)]
+
+        else:
+            raise ValueError(f"未対応のファイル形式: {suffix}")
+
+        stats = zonal_statistics(data, labels, len(fields))
+
+        return {
+            "file": str(file_path),
+            "processing_time": datetime.now().isoformat(),
+            "window": {
+                "row_off": int(rows[0]),
+                "col_off": int(cols[0]),
+                "height": int(rows[1] - rows[0]),
+                "width": int(cols[1] - cols[0]),
+            },
+            "fields": [
+                {"name": field["name"], "statistics": field_stats}
+                for field, field_stats in zip(fields, stats)
+            ]
+        }
+
+    except Exception as e:
+        return {
+            "file": str(file_path),
+            "error": str(e),
+            "processing_time": datetime.now().isoformat()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="圃場ポリゴン単位のゾーン統計を計算"
+    )
+    parser.add_argument("file", type=str, help="GeoTIFF/HDF5ファイルパス")
+    parser.add_argument("--fields", type=str,
+                       help="圃場ポリゴンのGeoJSON（例: exports/nanaka_farm_fields.geojson）")
+    parser.add_argument("--neo4j", action="store_true",
+                       help="Neo4jのFarmノードから圃場ポリゴンを取得")
+    parser.add_argument("--buffer", type=float, default=0.5,
+                       help="境界のない圃場（Point）のバッファ距離（km、デフォルト: 0.5）")
+    parser.add_argument("--dataset", type=str, default="NDVI",
+                       help="データセット名（HDF5用、デフォルト: NDVI）")
+    parser.add_argument("--output", type=str,
+                       help="結果JSONの出力先（指定しない場合は標準出力）")
+
+    args = parser.parse_args()
+
+    if args.neo4j:
+        fields = load_fields_neo4j(
+            os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+            os.getenv("NEO4J_USER", "neo4j"),
+            os.getenv("NEO4J_PASSWORD", "nAnAkA0629"),
+            default_buffer_km=args.buffer
+        )
+    elif args.fields:
+        fields = load_fields_geojson(args.fields, default_buffer_km=args.buffer)
+    else:
+        parser.error("--fields または --neo4j を指定してください")
+
+    if not fields:
+        print("❌ 圃場ポリゴンがありません", file=sys.stderr)
+        sys.exit(1)
+
+    result = process_file_zonal(args.file, fields, args.dataset)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ 結果保存: {args.output}")
+    else:
+        print("\n📄 処理結果:")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -112,3 +112,447 @@ def test_cors_headers():
     response = client.get('/api/health')
 
     assert 'Access-Control-Allow-Origin' in response.headers
+
+
+def test_ndvi_distribution_endpoint_merges_sketches():
+    """NDVI分布エンドポイントが観測ごとのスケッチをマージする"""
+    import json
+    import numpy as np
+    from unittest.mock import MagicMock
+    from geotiff_processor import calculate_statistics
+    import api_server
+
+    rng = np.random.default_rng(0)
+    chunks = [rng.uniform(0.5, 0.9, (40, 40)) for _ in range(3)]
+
+    records = []
+    for chunk in chunks:
+        stats = calculate_statistics(chunk)
+        records.append({
+            'count': stats['valid_pixels'],
+            'mean': stats['mean'],
+            'std': stats['std'],
+            'min': stats['min'],
+            'max': stats['max'],
+            'sketch': json.dumps(stats['sketch'])
+        })
+
+    session = MagicMock()
+    session.__enter__.return_value.run.return_value = iter(records)
+
+    api_server.response_cache.clear()
+    with patch.object(api_server, 'get_neo4j_session', return_value=session):
+        response = api_server.app.test_client().get('/api/ndvi-distribution?days=30')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    values = np.concatenate([c.ravel() for c in chunks])
+    assert data['observations'] == 3
+    assert data['pixelCount'] == values.size
+    assert data['mean'] == pytest.approx(values.mean())
+    assert data['std'] == pytest.approx(values.std())
+    assert data['percentiles']['50'] == pytest.approx(np.median(values), abs=0.01)
+
+
+def test_response_cache_hits_until_data_version_changes(tmp_path, monkeypatch):
+    """同じリクエストはNeo4jに問い合わせずキャッシュから返し、データ更新で破棄する"""
+    from unittest.mock import MagicMock
+    import api_server
+    import data_version
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    api_server.response_cache.clear()
+
+    session = MagicMock()
+    session.__enter__.return_value.run.side_effect = lambda *args, **kwargs: iter([])
+
+    with patch.object(api_server, 'get_neo4j_session', return_value=session) as get_session:
+        client = api_server.app.test_client()
+
+        first = client.get('/api/ndvi-trend?days=3')
+        second = client.get('/api/ndvi-trend?days=3')
+        assert first.status_code == second.status_code == 200
+        assert first.get_json() == second.get_json()
+        assert get_session.call_count == 1
+
+        # クエリ引数が異なれば別エントリ
+        client.get('/api/ndvi-trend?days=5')
+        assert get_session.call_count == 2
+
+        # 書き込み側がバージョンを上げると再問い合わせ
+        data_version.bump_version()
+        client.get('/api/ndvi-trend?days=3')
+        assert get_session.call_count == 3
+
+
+def test_response_cache_lru_and_ttl(monkeypatch):
+    """最大件数を超えると最も古く使われたエントリから削除され、TTL経過で失効する"""
+    from api_server import ResponseCache
+
+    now = [1000.0]
+    monkeypatch.setattr('api_server.time.monotonic', lambda: now[0])
+
+    cache = ResponseCache(maxsize=2, ttl=60)
+    cache.set('a', 1, 'A')
+    cache.set('b', 1, 'B')
+    assert cache.get('a', 1) == 'A'
+    cache.set('c', 1, 'C')
+
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) == 'A'
+    assert cache.get('a', 2) is None
+
+    now[0] += 61
+    assert cache.get('c', 1) is None
+
+
+def test_dashboard_endpoint_reads_all_panels_in_one_query():
+    """ダッシュボードの4パネル分を1回の読み取りトランザクション・1クエリで返す"""
+    from unittest.mock import MagicMock
+    import api_server
+    from dashboard_queries import DASHBOARD_QUERY, read_dashboard
+
+    record = {
+        'totalFields': 2,
+        'totalArea': 15000,
+        'avgNDVI': 0.61234,
+        'trend': [{'date': '2026-01-01', 'avgNdvi': 0.6}],
+        'farmNames': ['圃場A', '圃場B'],
+        'fields': [
+            {'id': 1, 'name': '圃場A', 'lat': 32.8, 'lon': 130.7, 'area': 10000, 'ndvi': 0.75},
+            {'id': 2, 'name': '圃場B', 'lat': 32.9, 'lon': 130.8, 'area': 5000, 'ndvi': None}
+        ]
+    }
+    tx = MagicMock()
+    tx.run.return_value.single.return_value = record
+
+    session = MagicMock()
+    session.__enter__.return_value.execute_read.side_effect = lambda func, days: func(tx, days)
+
+    api_server.response_cache.clear()
+    with patch.object(api_server, 'get_neo4j_session', return_value=session):
+        response = api_server.app.test_client().get('/api/dashboard?days=8')
+
+    assert response.status_code == 200
+    tx.run.assert_called_once_with(DASHBOARD_QUERY, days=8)
+    session.__enter__.return_value.execute_read.assert_called_once_with(read_dashboard, 8)
+
+    data = response.get_json()
+    assert data['summary']['totalFields'] == 2
+    assert data['summary']['avgNDVI'] == 0.6123
+    assert data['ndviTrend'] == [{'date': '2026-01-01', 'ndvi': 0.6}]
+    assert [w['field'] for w in data['workHours']] == ['圃場A', '圃場B']
+    assert [f['status'] for f in data['fields']] == ['healthy', 'very_poor']
+
+
+def test_dashboard_stream_pushes_only_on_new_data_version(tmp_path, monkeypatch):
+    """SSEは接続時と書き込み側がバージョンを上げたときだけNeo4jに問い合わせて送る"""
+    import json
+    from unittest.mock import MagicMock
+    import api_server
+    import data_version
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    monkeypatch.setattr(api_server, 'STREAM_HEARTBEAT', 0)
+    monkeypatch.setattr(api_server.time, 'sleep', lambda seconds: None)
+    api_server.response_cache.clear()
+
+    session = MagicMock()
+    execute_read = session.__enter__.return_value.execute_read
+    execute_read.side_effect = lambda func, days: {'summary': {'totalFields': execute_read.call_count}}
+
+    with patch.object(api_server, 'get_neo4j_session', return_value=session):
+        events = api_server.dashboard_events(days=8)
+
+        first = next(events)
+        assert first.startswith("id: 0\nevent: dashboard\n")
+        assert json.loads(first.split("data: ", 1)[1]) == {'summary': {'totalFields': 1}}
+
+        # 更新がなければハートビートのみ
+        assert next(events) == ": keepalive\n\n"
+        assert execute_read.call_count == 1
+
+        data_version.bump_version()
+        pushed = next(events)
+        assert pushed.startswith("id: 1\nevent: dashboard\n")
+        assert execute_read.call_count == 2
+
+        # 再接続時は受信済みのバージョンを再送しない
+        resumed = api_server.dashboard_events(days=8, last_version=1)
+        assert next(resumed) == ": keepalive\n\n"
+
+
+def test_etag_conditional_get_and_gzip(tmp_path, monkeypatch):
+    """If-None-Match が一致すれば問い合わせずに304を返し、大きなレスポンスはgzipで返す"""
+    import gzip
+    from unittest.mock import MagicMock
+    import api_server
+    import data_version
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    monkeypatch.setattr(api_server, 'API_COMPRESS_MIN_SIZE', 100)
+    api_server.response_cache.clear()
+
+    fields = [
+        {'id': i, 'name': f'圃場{i}', 'lat': 32.8, 'lon': 130.7, 'area': 1000, 'ndvi': 0.6}
+        for i in range(20)
+    ]
+    session = MagicMock()
+    session.__enter__.return_value.run.side_effect = lambda *args, **kwargs: iter(fields)
+
+    with patch.object(api_server, 'get_neo4j_session', return_value=session) as get_session:
+        client = api_server.app.test_client()
+
+        plain = client.get('/api/fields')
+        etag = plain.headers['ETag']
+        assert plain.status_code == 200
+        assert 'Content-Encoding' not in plain.headers
+
+        compressed = client.get('/api/fields', headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert compressed.headers['ETag'] == etag[:-1] + '-gzip"'
+        assert gzip.decompress(compressed.get_data()) == plain.get_data()
+        assert get_session.call_count == 1
+
+        api_server.response_cache.clear()
+        for tag in (etag, compressed.headers['ETag']):
+            not_modified = client.get('/api/fields', headers={'If-None-Match': tag})
+            assert not_modified.status_code == 304
+            assert not_modified.headers['ETag'] == etag
+        assert get_session.call_count == 1
+
+        # データ更新後は古いETagでは304にならない
+        data_version.bump_version()
+        refreshed = client.get('/api/fields', headers={'If-None-Match': etag})
+        assert refreshed.status_code == 200
+        assert refreshed.headers['ETag'] != etag
+        assert get_session.call_count == 2
+
+
+def test_asgi_app_awaits_async_neo4j_queries(tmp_path, monkeypatch):
+    """ASGI版はNeo4j非同期ドライバのクエリを await し、Flask版と同じレスポンス（ETag・304・NDJSON・SSE）を返す"""
+    import asyncio
+    import json
+    import time
+    pytest.importorskip('a2wsgi')
+    import api_server
+    import api_server_async
+    import data_version
+    from dashboard_queries import DASHBOARD_QUERY, FIELDS_QUERY, NDVI_TREND_QUERY
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    monkeypatch.setattr(api_server, 'STREAM_POLL_INTERVAL', 0)
+    api_server.response_cache.clear()
+
+    field = {'id': 1, 'name': '圃場A', 'lat': 32.8, 'lon': 130.7, 'area': 1000, 'ndvi': 0.55}
+    rows = {
+        FIELDS_QUERY: [field],
+        NDVI_TREND_QUERY: [],
+        DASHBOARD_QUERY: [{
+            'totalFields': 1, 'totalArea': 1000, 'avgNDVI': 0.55, 'trend': [],
+            'farmNames': ['圃場A'], 'fields': [field]
+        }]
+    }
+    awaited = []
+
+    class AsyncResult:
+        def __init__(self, records):
+            self.records = records
+
+        async def single(self):
+            return self.records[0] if self.records else None
+
+        async def __aiter__(self):
+            for record in self.records:
+                yield record
+
+    class AsyncSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def run(self, query, **params):
+            # 応答待ちの間は他のリクエストに処理を譲る
+            await asyncio.sleep(0.05)
+            awaited.append(query)
+            return AsyncResult(rows[query])
+
+        async def execute_read(self, work, *args):
+            return await work(self, *args)
+
+    class AsyncDriver:
+        def session(self):
+            return AsyncSession()
+
+    async def call(path, headers=(), disconnect_after=None):
+        messages = []
+        requested = asyncio.Event()
+
+        async def receive():
+            if not requested.is_set():
+                requested.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # ストリームは最初のイベントを受け取ったら切断する
+            while len(messages) < disconnect_after:
+                await asyncio.sleep(0.01)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'root_path': '', 'query_string': query.encode(), 'headers': list(headers)
+        }
+        await asyncio.wait_for(api_server_async.app(scope, receive, send), timeout=10)
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return start['status'], dict(start['headers']), body
+
+    async def concurrent(count):
+        started = time.monotonic()
+        await asyncio.gather(*(call(f'/api/dashboard?days={days}') for days in range(count)))
+        return time.monotonic() - started
+
+    monkeypatch.setattr(api_server_async, 'get_driver', lambda: AsyncDriver())
+    # 同期ドライバ（Flask版のスレッド）は使わない
+    with patch.object(api_server, 'get_neo4j_session', side_effect=AssertionError):
+        status, headers, body = asyncio.run(call('/api/fields'))
+        assert status == 200
+        assert headers[b'access-control-allow-origin'] == b'*'
+        assert json.loads(body) == [dict(field, status='moderate')]
+        assert awaited == [FIELDS_QUERY]
+
+        api_server.response_cache.clear()
+        status, _, body = asyncio.run(call('/api/fields', [(b'if-none-match', headers[b'etag'])]))
+        assert status == 304 and body == b''
+        assert awaited == [FIELDS_QUERY]
+
+        status, headers, body = asyncio.run(call('/api/ndvi-trend?days=2', [(b'accept', b'application/x-ndjson')]))
+        assert headers[b'content-type'] == b'application/x-ndjson'
+        assert len(body.decode('utf-8').splitlines()) == 2
+        assert awaited[-1] == NDVI_TREND_QUERY
+
+        assert asyncio.run(call('/api/fields?limit=0'))[0] == 400
+
+        # 50件の同時リクエストはスレッド数に制限されず、応答待ちが重なる
+        assert asyncio.run(concurrent(50)) < 50 * 0.05 / 2
+        assert awaited.count(DASHBOARD_QUERY) == 50
+
+        status, headers, body = asyncio.run(call('/api/stream?days=8', disconnect_after=2))
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'text/event-stream')
+        event = body.decode('utf-8')
+        assert event.startswith("id: 0\nevent: dashboard\n")
+        assert json.loads(event.split("data: ", 1)[1])['summary']['totalFields'] == 1
+
+        status, _, _ = asyncio.run(call('/api/unknown'))
+        assert status == 404
+
+
+def test_neo4j_driver_is_created_on_first_use(monkeypatch):
+    """ドライバはimport時ではなく最初のセッション取得時にプロセスごとに1回だけ作る"""
+    import api_server
+
+    monkeypatch.setattr(api_server, '_driver', None)
+    with patch.object(api_server.GraphDatabase, 'driver') as create_driver:
+        api_server.get_neo4j_session()
+        api_server.get_neo4j_session()
+        assert create_driver.call_count == 1
+        assert create_driver.call_args.kwargs['max_connection_pool_size'] == api_server.NEO4J_POOL_SIZE
+
+        api_server.close_neo4j_driver()
+        create_driver.return_value.close.assert_called_once()
+        assert api_server._driver is None
+
+
+def test_fields_keyset_pagination_and_ndjson(tmp_path, monkeypatch):
+    """limit・cursor でキーセットページ分割し、NDJSONでは1行1レコードで返す"""
+    import json
+    from unittest.mock import MagicMock
+    import api_server
+    import data_version
+    from dashboard_queries import FIELDS_PAGE_QUERY, FIELDS_QUERY
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    api_server.response_cache.clear()
+
+    rows = [
+        {'id': i, 'name': f'圃場{i}', 'lat': 32.8, 'lon': 130.7, 'area': 1000, 'ndvi': 0.8}
+        for i in range(3)
+    ]
+    session = MagicMock()
+    run = session.__enter__.return_value.run
+    run.side_effect = lambda query, **params: iter(rows[:params.get('limit', len(rows))])
+
+    with patch.object(api_server, 'get_neo4j_session', return_value=session):
+        client = api_server.app.test_client()
+
+        first = client.get('/api/fields?limit=2').get_json()
+        assert [item['id'] for item in first['items']] == [0, 1]
+        assert first['nextCursor']
+        run.assert_called_with(FIELDS_PAGE_QUERY, limit=3, afterName=None, afterId=None)
+
+        client.get(f"/api/fields?limit=2&cursor={first['nextCursor']}")
+        run.assert_called_with(FIELDS_PAGE_QUERY, limit=3, afterName='圃場1', afterId=1)
+
+        assert client.get('/api/fields?limit=2&cursor=!!!').status_code == 400
+        assert client.get('/api/fields?limit=0').status_code == 400
+
+        streamed = client.get('/api/fields', headers={'Accept': 'application/x-ndjson'})
+        assert streamed.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+        assert [line['id'] for line in lines] == [0, 1, 2]
+        run.assert_called_with(FIELDS_QUERY)
+
+        paged = client.get('/api/fields?limit=2', headers={'Accept': 'application/x-ndjson'})
+        lines = [json.loads(line) for line in paged.get_data(as_text=True).splitlines()]
+        assert [line.get('id') for line in lines[:2]] == [0, 1]
+        assert lines[2] == {'nextCursor': first['nextCursor']}
+
+
+def test_ndvi_trend_keyset_pagination_and_ndjson(tmp_path, monkeypatch):
+    """NDVI時系列を日付カーソルでページ分割し、NDJSONでは1行1レコードで返す"""
+    import json
+    from unittest.mock import MagicMock
+    from neo4j.time import Date
+    import api_server
+    import data_version
+    from dashboard_queries import NDVI_TREND_PAGE_QUERY
+
+    monkeypatch.setattr(data_version, 'VERSION_PATH', tmp_path / "data_version.json")
+    api_server.response_cache.clear()
+
+    # ページクエリは $limit 日分の日付を選んでからその日だけを集計する
+    assert NDVI_TREND_PAGE_QUERY.index('LIMIT $limit') < NDVI_TREND_PAGE_QUERY.index('sum(')
+
+    rows = [{'date': Date(2026, 1, day), 'avgNdvi': 0.6 + day / 100} for day in (1, 2, 3)]
+    session = MagicMock()
+    run = session.__enter__.return_value.run
+    run.side_effect = lambda query, **params: iter(rows[:params.get('limit', len(rows))])
+
+    with patch.object(api_server, 'get_neo4j_session', return_value=session):
+        client = api_server.app.test_client()
+
+        first = client.get('/api/ndvi-trend?days=30&limit=2').get_json()
+        assert first['items'] == [{'date': '01/01', 'ndvi': 0.61}, {'date': '01/02', 'ndvi': 0.62}]
+        assert first['nextCursor']
+        run.assert_called_with(NDVI_TREND_PAGE_QUERY, days=30, limit=3, after=None)
+
+        client.get(f"/api/ndvi-trend?days=30&limit=2&cursor={first['nextCursor']}")
+        run.assert_called_with(NDVI_TREND_PAGE_QUERY, days=30, limit=3, after='2026-01-02')
+
+        assert client.get('/api/ndvi-trend?limit=2&cursor=!!!').status_code == 400
+        assert client.get('/api/ndvi-trend?limit=1001').status_code == 400
+
+        paged = client.get('/api/ndvi-trend?days=30&limit=2', headers={'Accept': 'application/x-ndjson'})
+        assert paged.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in paged.get_data(as_text=True).splitlines()]
+        assert lines == first['items'] + [{'nextCursor': first['nextCursor']}]
+
+        # 最終ページは nextCursor なし
+        last = client.get('/api/ndvi-trend?days=30&limit=3').get_json()
+        assert len(last['items']) == 3 and last['nextCursor'] is None
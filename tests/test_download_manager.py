@@ -0,0 +1,148 @@
+"""
+並列・再開可能ダウンロードのテスト（ローカルHTTPサーバー）
+"""
+
+import sys
+import os
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+requests = pytest.importorskip('requests')
+
+
+class GranuleServer(ThreadingHTTPServer):
+    """Range対応のローカルHTTPサーバー（指定回数だけ転送途中で切断する）"""
+
+    daemon_threads = True
+
+    def __init__(self, files, drops=0):
+        super().__init__(('127.0.0.1', 0), GranuleHandler)
+        self.files = files
+        self.drops = drops
+        self.ranges = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class GranuleHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.files.get(self.path.lstrip('/'))
+        if body is None:
+            self.send_error(404)
+            return
+
+        start = 0
+        requested = self.headers.get('Range')
+        with self.server.lock:
+            self.server.ranges.append(requested)
+            drop = self.server.drops > 0
+            self.server.drops -= 1
+
+        if requested:
+            start = int(requested[len('bytes='):].split('-')[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        else:
+            self.send_response(200)
+
+        payload = body[start:]
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+
+        if drop:
+            # 半分だけ送って接続を切る
+            self.wfile.write(payload[:len(payload) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(files, drops=0):
+        server = GranuleServer(files, drops)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_resumes_from_part_file_after_dropped_connection(serve, tmp_path):
+    """切断されたら .part の続きからRangeで再開し、検証後に置き換える"""
+    from download_manager import download_file
+
+    body = os.urandom(300_000)
+    server = serve({'GC1SG1_NDVI.h5': body}, drops=2)
+    dest = tmp_path / "GC1SG1_NDVI.h5"
+
+    path = download_file(f"{server.url}/GC1SG1_NDVI.h5", dest, backoff=0,
+                         checksum=f"sha256:{hashlib.sha256(body).hexdigest()}")
+
+    assert path == dest
+    assert dest.read_bytes() == body
+    assert not (tmp_path / "GC1SG1_NDVI.h5.part").exists()
+    # 1回目は全体、2回目以降は受信済みの位置から
+    assert server.ranges[0] is None
+    offsets = [int(r[len('bytes='):-1]) for r in server.ranges[1:]]
+    assert 0 < offsets[0] < offsets[1] < len(body)
+    assert len(server.ranges) == 3
+
+
+def test_verification_failure_keeps_destination_clean(serve, tmp_path):
+    """チェックサムが一致しなければ最終ファイルを作らず .part も破棄する"""
+    from download_manager import DownloadError, download_file
+
+    server = serve({'bad.h5': b'x' * 1000})
+    dest = tmp_path / "bad.h5"
+
+    with pytest.raises(DownloadError):
+        download_file(f"{server.url}/bad.h5", dest, checksum="md5:00", backoff=0)
+
+    assert not dest.exists()
+    assert not (tmp_path / "bad.h5.part").exists()
+
+
+def test_download_all_runs_concurrently_and_reports_failures(serve, tmp_path):
+    """複数ファイルを並列に取得し、失敗したものはエラーとして同じ順で返す"""
+    from download_manager import DownloadManager
+
+    files = {f"granule_{i}.h5": os.urandom(50_000) for i in range(6)}
+    server = serve(files, drops=3)
+
+    tasks = [{"url": f"{server.url}/{name}", "dest": tmp_path / name} for name in files]
+    tasks.append({"url": f"{server.url}/missing.h5", "dest": tmp_path / "missing.h5"})
+
+    results = DownloadManager(workers=4, backoff=0).download_all(tasks)
+
+    for name, result in zip(files, results):
+        assert result["error"] is None
+        assert result["path"].read_bytes() == files[name]
+    assert results[-1]["path"] is None
+    assert "404" in results[-1]["error"]
+    assert list(tmp_path.glob("*.part")) == []
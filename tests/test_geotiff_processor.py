@@ -0,0 +1,276 @@
+"""
+GeoTIFF/HDF5プロセッサのテスト
+"""
+
+import sys
+import os
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+np = pytest.importorskip('numpy')
+h5py = pytest.importorskip('h5py')
+
+
+def assert_same_statistics(actual, expected):
+    """一括計算の統計が1地点ずつの calculate_statistics と（浮動小数点の誤差を除き）一致する"""
+    assert actual["valid_pixels"] == expected["valid_pixels"]
+    for key in ("mean", "median", "std", "min", "max"):
+        assert actual[key] == pytest.approx(expected[key], rel=1e-9)
+    assert actual["percentiles"] == pytest.approx(expected["percentiles"], rel=1e-9)
+
+    # スケッチは同じ要素を持つ（レベル内の並び順は問わない）
+    assert actual["sketch"]["count"] == expected["sketch"]["count"]
+    assert [sorted(level) for level in actual["sketch"]["levels"]] == \
+        [sorted(level) for level in expected["sketch"]["levels"]]
+
+
+@pytest.fixture
+def sgli_hdf5(tmp_path):
+    """値=行番号*1000+列番号 の200x200 SGLI形式HDF5ファイル"""
+    (tmp_path / "geotiff").mkdir()
+    path = tmp_path / "geotiff" / "GC1SG1_TEST_NDVI.h5"
+    size = 200
+
+    rows, cols = np.mgrid[0:size, 0:size]
+    lat_grid = 33.3032 - rows * 0.005
+    lon_grid = 130.2075 + cols * 0.005
+
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=(rows * 1000 + cols).astype('float64'))
+        f.create_dataset('Geometry_data/Latitude', data=lat_grid)
+        f.create_dataset('Geometry_data/Longitude', data=lon_grid)
+
+    return path
+
+
+def test_read_hdf5_reads_window_around_point(sgli_hdf5):
+    """指定座標周辺のウィンドウのみ読み込まれる"""
+    from geotiff_processor import read_hdf5_gcom_c
+
+    data, metadata, stats = read_hdf5_gcom_c(sgli_hdf5, 32.8032, 130.7075, buffer_km=2.2, dataset_name="NDVI")
+
+    # 0.022度 / 0.005度 → ±4ピクセル
+    assert data.shape == (9, 9)
+    assert metadata["shape"] == (200, 200)
+    assert metadata["window"] == {"row_off": 96, "col_off": 96, "height": 9, "width": 9}
+    assert stats["mean"] == pytest.approx(100 * 1000 + 100)
+
+
+def test_read_hdf5_outside_granule_raises(sgli_hdf5):
+    """グラニュール範囲外の座標はエラー"""
+    from geotiff_processor import read_hdf5_gcom_c
+
+    with pytest.raises(RuntimeError):
+        read_hdf5_gcom_c(sgli_hdf5, 10.0, 10.0, buffer_km=2, dataset_name="NDVI")
+
+
+def test_geo_index_matches_bruteforce_nearest():
+    """索引による最寄り格子点検索が全探索と一致する"""
+    from geo_index import GeoIndex
+
+    rows, cols = np.mgrid[0:120, 0:150]
+    # 回転・歪みを含む曲線格子
+    lat_grid = 32.0 + rows * 0.01 + cols * 0.002 + 0.0005 * np.sin(cols / 10)
+    lon_grid = 130.0 + cols * 0.01 - rows * 0.003
+
+    index = GeoIndex.build(lat_grid, lon_grid)
+    rng = np.random.default_rng(0)
+
+    for lat, lon in zip(rng.uniform(32.3, 33.2, 50), rng.uniform(130.2, 131.0, 50)):
+        dist = np.hypot(lat_grid - lat, lon_grid - lon)
+        expected = np.unravel_index(np.argmin(dist), dist.shape)
+
+        row, col, _ = index.nearest(lat, lon)
+        assert (row, col) == expected
+
+    assert index.nearest(10.0, 10.0) is None
+
+
+def test_geo_index_persisted_in_metadata_dir(sgli_hdf5):
+    """索引が data/metadata/ 相当のディレクトリに保存され再利用される"""
+    import geo_index
+
+    with h5py.File(sgli_hdf5, 'r') as f:
+        index = geo_index.get_geo_index(f)
+
+    index_path = sgli_hdf5.parent.parent / "metadata" / "GC1SG1_TEST_NDVI_geoindex.npz"
+    assert index_path.exists()
+
+    geo_index._INDEX_CACHE.clear()
+    loaded = geo_index.GeoIndex.load(index_path)
+    assert loaded.source == index.source
+    assert loaded.window(32.8032, 130.7075, 0.022) == index.window(32.8032, 130.7075, 0.022)
+
+
+def test_process_file_batch_matches_single_point(sgli_hdf5, tmp_path):
+    """一括処理の地点別統計が1地点ずつの処理と一致する"""
+    import json
+    from geotiff_processor import load_points_geojson, process_file_batch, read_hdf5_gcom_c
+
+    geojson_path = tmp_path / "farms.geojson"
+    geojson_path.write_text(json.dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [130.7075, 32.8032]},
+             "properties": {"name": "A"}},
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [130.6575, 32.9032]},
+             "properties": {"name": "B", "buffer_km": 1.2}},
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [10.0, 10.0]},
+             "properties": {"name": "outside"}},
+        ]
+    }), encoding='utf-8')
+
+    points = load_points_geojson(geojson_path, default_buffer_km=2.2)
+    result = process_file_batch(sgli_hdf5, points, "NDVI")
+
+    fields = {field["name"]: field for field in result["fields"]}
+    assert "error" in fields["outside"]
+
+    for point in points[:2]:
+        _, _, expected = read_hdf5_gcom_c(sgli_hdf5, point["lat"], point["lon"], point["buffer_km"], "NDVI")
+        assert_same_statistics(fields[point["name"]]["statistics"], expected)
+
+
+def test_process_file_batch_without_geolocation_reads_full_extent(tmp_path):
+    """緯度経度グリッドのないグラニュールは1地点の処理と同じく全体の統計を返す"""
+    from geotiff_processor import process_file_batch, read_hdf5_gcom_c
+
+    path = tmp_path / "GC1SG1_TEST_NOGEO_NDVI.h5"
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=np.linspace(0.1, 0.9, 60 * 80).reshape(60, 80))
+
+    points = [{"name": "A", "lat": 32.8032, "lon": 130.7075, "buffer_km": 2.0},
+              {"name": "B", "lat": 32.9032, "lon": 130.6575, "buffer_km": 1.0}]
+    result = process_file_batch(path, points, "NDVI")
+
+    _, _, expected = read_hdf5_gcom_c(path, 32.8032, 130.7075, 2.0, "NDVI")
+    for field in result["fields"]:
+        assert_same_statistics(field["statistics"], expected)
+
+
+def test_zonal_statistics_polygons(sgli_hdf5):
+    """ポリゴン単位のゾーン統計が全ピクセル判定と一致し、ラベル配列がキャッシュされる"""
+    import zonal_stats
+    from stats_engine import KLLSketch, merge_statistics
+
+    fields = [
+        {"name": "square", "polygons": [[[(130.68, 32.78), (130.72, 32.78), (130.72, 32.82),
+                                          (130.68, 32.82), (130.68, 32.78)]]]},
+        {"name": "triangle", "polygons": [[[(130.60, 32.90), (130.66, 32.90), (130.60, 32.96),
+                                            (130.60, 32.90)]]]},
+        {"name": "outside", "polygons": [[[(10.0, 10.0), (10.1, 10.0), (10.1, 10.1), (10.0, 10.0)]]]},
+    ]
+
+    result = zonal_stats.process_file_zonal(sgli_hdf5, fields, "NDVI")
+    stats = {field["name"]: field["statistics"] for field in result["fields"]}
+
+    with h5py.File(sgli_hdf5, 'r') as f:
+        values = f['Image_data/NDVI'][:]
+        lat = f['Geometry_data/Latitude'][:]
+        lon = f['Geometry_data/Longitude'][:]
+
+    for field in fields[:2]:
+        inside = zonal_stats.points_in_polygon(lon, lat, field["polygons"][0])
+        expected = values[inside]
+        assert stats[field["name"]]["valid_pixels"] == expected.size
+        assert stats[field["name"]]["mean"] == pytest.approx(expected.mean())
+        assert stats[field["name"]]["std"] == pytest.approx(expected.std())
+        assert stats[field["name"]]["min"] == expected.min()
+        assert stats[field["name"]]["percentiles"]["75"] == pytest.approx(np.percentile(expected, 75))
+        assert KLLSketch.from_dict(stats[field["name"]]["sketch"]).count == expected.size
+
+    # 圃場のスケッチはマージして複数圃場の分布を求められる
+    merged = merge_statistics([stats["square"], stats["triangle"], stats["outside"]])
+    both = np.concatenate([values[zonal_stats.points_in_polygon(lon, lat, field["polygons"][0])]
+                           for field in fields[:2]])
+    assert merged["valid_pixels"] == both.size
+    assert merged["median"] == pytest.approx(np.median(both), abs=0.01)
+
+    assert stats["outside"]["valid_pixels"] == 0
+    assert len(list((sgli_hdf5.parent.parent / "metadata").glob("labels_*.npz"))) == 1
+
+
+def test_calculate_statistics_matches_numpy():
+    """配列入力の統計がnumpyの計算結果と一致する（NaN・マスク除外）"""
+    from geotiff_processor import calculate_statistics
+
+    rng = np.random.default_rng(1)
+    data = rng.normal(291.5, 3.0, (300, 200))
+    data[::7, ::5] = np.nan
+    masked = np.ma.masked_greater(data, 297.0)
+
+    valid = masked.compressed()
+    valid = valid[~np.isnan(valid)]
+
+    stats = calculate_statistics(masked)
+
+    assert stats["valid_pixels"] == valid.size
+    assert stats["mean"] == pytest.approx(valid.mean())
+    assert stats["std"] == pytest.approx(valid.std())
+    assert stats["min"] == valid.min()
+    assert stats["max"] == valid.max()
+    assert stats["median"] == pytest.approx(np.median(valid))
+    for p in (25, 50, 75):
+        assert stats["percentiles"][str(p)] == pytest.approx(np.percentile(valid, p))
+
+
+def test_calculate_statistics_chunk_iterator(sgli_hdf5):
+    """チャンクイテレータ入力でもモーメントは厳密、パーセンタイルは近似で一致する"""
+    from geotiff_processor import calculate_statistics
+    from stats_engine import iter_chunks
+
+    with h5py.File(sgli_hdf5, 'r') as f:
+        dataset = f['Image_data/NDVI']
+        full = dataset[:].ravel()
+        stats = calculate_statistics(iter_chunks(dataset, chunk_rows=16))
+
+    assert stats["valid_pixels"] == full.size
+    assert stats["mean"] == pytest.approx(full.mean())
+    assert stats["std"] == pytest.approx(full.std())
+    assert stats["min"] == full.min()
+    assert stats["max"] == full.max()
+
+    # KLLスケッチの順位誤差は概ね 1/k 程度
+    for p in (25, 50, 75):
+        rank = np.searchsorted(np.sort(full), stats["percentiles"][str(p)]) / full.size
+        assert rank == pytest.approx(p / 100, abs=0.02)
+
+
+def test_geotiff_batch_records_points_outside_raster(tmp_path):
+    """GeoTIFFの一括処理は範囲外の地点をエラーとして記録し、読み込み範囲に含めない"""
+    rasterio = pytest.importorskip('rasterio')
+    from rasterio.transform import from_origin
+    from geotiff_processor import calculate_statistics, read_geotiff_rasterio_batch
+
+    path = tmp_path / "ndvi.tif"
+    values = np.linspace(0.1, 0.9, 100 * 120, dtype=np.float32).reshape(100, 120)
+    values[40:45, 50:55] = -9999
+    with rasterio.open(path, 'w', driver='GTiff', width=120, height=100, count=1, dtype='float32',
+                       crs='EPSG:4326', transform=from_origin(130.5, 33.0, 0.001, 0.001), nodata=-9999) as dst:
+        dst.write(values, 1)
+
+    points = [
+        {"name": "A", "lat": 32.955, "lon": 130.555, "buffer_km": 0.5},
+        {"name": "B", "lat": 32.952, "lon": 130.558, "buffer_km": 0.3},
+        {"name": "outside", "lat": 32.95, "lon": 140.0, "buffer_km": 0.5},
+    ]
+    fields, metadata = read_geotiff_rasterio_batch(path, points)
+
+    assert fields[2]["error"] == "指定座標がグラニュールの範囲外です"
+    assert "statistics" not in fields[2]
+    assert metadata["window"]["col_off"] + metadata["window"]["width"] <= 120
+
+    # 重なるウィンドウも地点ごとに1地点ずつの計算と一致する（NoDataは除外）
+    for field in fields[:2]:
+        window = field["window"]
+        expected = np.ma.masked_equal(values[
+            window["row_off"]:window["row_off"] + window["height"],
+            window["col_off"]:window["col_off"] + window["width"]
+        ], -9999)
+        assert_same_statistics(field["statistics"], calculate_statistics(expected))
+    assert fields[0]["statistics"]["valid_pixels"] == 100 - 25
+
+    with pytest.raises(RuntimeError, match="範囲内の地点がありません"):
+        read_geotiff_rasterio_batch(path, points[2:])
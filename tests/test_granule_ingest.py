@@ -0,0 +1,151 @@
+"""
+グラニュールの切り出し（subset-on-ingest）のテスト
+"""
+
+import sys
+import os
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+np = pytest.importorskip('numpy')
+h5py = pytest.importorskip('h5py')
+
+FARM = (32.8032, 130.7075)
+
+
+@pytest.fixture
+def sgli_granule(tmp_path):
+    """緯度経度グリッドが10ピクセル間隔（Grid_interval）の 800x800 SGLI形式HDF5ファイル"""
+    path = tmp_path / "geotiff" / "GC1SG1_2026010801D01D_NDVI.h5"
+    path.parent.mkdir()
+
+    grid_rows, grid_cols = np.mgrid[0:81, 0:81]
+    rows, cols = np.mgrid[0:800, 0:800]
+
+    with h5py.File(path, 'w') as f:
+        f.attrs['Satellite'] = 'GCOM-C'
+        ndvi = f.create_dataset('Image_data/NDVI', data=(rows * 1000 + cols).astype(np.float32))
+        ndvi.attrs['units'] = 'dimensionless'
+        lat = f.create_dataset('Geometry_data/Latitude', data=34.0 - grid_rows * 0.025)
+        lat.attrs['Grid_interval'] = 10
+        f.create_dataset('Geometry_data/Longitude', data=130.0 + grid_cols * 0.025)
+
+    return path
+
+
+def test_subset_keeps_farm_window_and_geolocation(sgli_granule, tmp_path):
+    """切り出したファイルから圃場周辺を読むと元のグラニュールと同じ値になる"""
+    from geotiff_processor import read_hdf5_gcom_c
+    from granule_ingest import farm_region, subset_hdf5
+
+    subset = sgli_granule.with_name("subset.h5")
+    [(path, bbox)] = subset_hdf5(sgli_granule, subset, [farm_region(*FARM, margin_km=10)])
+    assert path == subset
+
+    assert bbox[0] <= FARM[1] - 0.1 and bbox[2] >= FARM[1] + 0.1
+    assert bbox[1] <= FARM[0] - 0.1 and bbox[3] >= FARM[0] + 0.1
+
+    with h5py.File(subset, 'r') as f:
+        ndvi = f['Image_data/NDVI']
+        assert ndvi.compression == 'gzip'
+        assert ndvi.chunks is not None
+        assert ndvi.shape[0] < 200 and ndvi.shape[1] < 200
+        assert ndvi.attrs['units'] == 'dimensionless'
+        assert f['Geometry_data/Latitude'].attrs['Grid_interval'] == 10
+        assert f.attrs['Satellite'] == 'GCOM-C'
+
+    expected, _, _ = read_hdf5_gcom_c(sgli_granule, *FARM, buffer_km=5, dataset_name='NDVI')
+    actual, _, _ = read_hdf5_gcom_c(subset, *FARM, buffer_km=5, dataset_name='NDVI')
+    np.testing.assert_array_equal(actual, expected)
+
+    # 範囲外の圃場だけなら切り出さない
+    assert subset_hdf5(sgli_granule, tmp_path / "none.h5", [farm_region(40.0, 140.0)]) == []
+
+
+def test_ingest_granule_replaces_stored_content_and_resubsets_from_source(sgli_granule, tmp_path):
+    """保存領域の内容を切り出し結果で置き換え、新しい圃場は元のグラニュールから切り出し直す"""
+    from granule_ingest import ingest_granule
+    from granule_store import GranuleStore
+
+    with GranuleStore(tmp_path / "granules", tmp_path / "index.db") as store:
+        full_size = sgli_granule.stat().st_size
+        store.put(sgli_granule, "GC1SG1_20260108_NDVI", bbox=[130.0, 32.0, 132.0, 34.0])
+
+        [bbox] = ingest_granule(store, "GC1SG1_20260108_NDVI", [FARM], margin_km=10)
+        stored, _ = store.get("GC1SG1_20260108_NDVI")
+        assert stored.stat().st_size < full_size / 10
+        assert store.contains("GC1SG1_20260108_NDVI", [FARM[1], FARM[0], FARM[1], FARM[0]])
+        assert not store.contains("GC1SG1_20260108_NDVI", [131.5, 33.5, 131.5, 33.5])
+        assert store.source("GC1SG1_20260108_NDVI").stat().st_size == full_size
+
+        # 近くの圃場を加えて切り出し直すと1つのファイルの範囲が広がる
+        [wider] = ingest_granule(store, "GC1SG1_20260108_NDVI", [FARM, (32.9, 130.8)], margin_km=10)
+        assert wider[2] > bbox[2] and wider[3] > bbox[3]
+
+        # 元を削除すると切り出し結果だけが残る
+        ingest_granule(store, "GC1SG1_20260108_NDVI", [FARM], margin_km=10, delete_source=True)
+        assert store.source("GC1SG1_20260108_NDVI") is None
+        assert store.summary()["blobs"] == 1
+        assert len(list((tmp_path / "granules" / "objects").rglob("*.h5"))) == 1
+
+
+def test_far_apart_farms_are_subset_into_separate_tiles(sgli_granule, tmp_path):
+    """離れた圃場はそれぞれ緯度経度グリッドを持つ別のファイルに切り出し、保存領域にタイルとして索引する"""
+    from geotiff_processor import read_hdf5_gcom_c
+    from granule_ingest import cluster_windows, farm_region, ingest_granule, subset_hdf5
+    from granule_store import GranuleStore
+
+    far = (33.5, 131.5)
+
+    # 重なる・近い範囲はまとめ、離れた範囲は別のまま
+    assert cluster_windows([(0, 9, 0, 9), (5, 14, 5, 14), (60, 69, 60, 69)]) == [(0, 14, 0, 14), (60, 69, 60, 69)]
+
+    subset = sgli_granule.with_name("subset.h5")
+    tiles = subset_hdf5(sgli_granule, subset, [farm_region(*FARM, margin_km=10), farm_region(*far, margin_km=10)])
+    assert [path.name for path, _ in tiles] == ["subset.h5", "subset_T1.h5"]
+
+    total = 0
+    for (path, bbox), farm in zip(sorted(tiles, key=lambda tile: -tile[1][3]), [far, FARM]):
+        assert bbox[0] <= farm[1] <= bbox[2] and bbox[1] <= farm[0] <= bbox[3]
+        with h5py.File(path, 'r') as f:
+            total += f['Image_data/NDVI'].size
+
+        expected, _, _ = read_hdf5_gcom_c(sgli_granule, *farm, buffer_km=5, dataset_name='NDVI')
+        actual, _, _ = read_hdf5_gcom_c(path, *farm, buffer_km=5, dataset_name='NDVI')
+        np.testing.assert_array_equal(actual, expected)
+
+    # 2つの圃場を囲む1つの矩形よりずっと小さい
+    assert total < 800 * 800 / 10
+
+    with GranuleStore(tmp_path / "granules", tmp_path / "index.db") as store:
+        store.put(sgli_granule, "GC1SG1_20260108_NDVI", bbox=[130.0, 32.0, 132.0, 34.0])
+        assert len(ingest_granule(store, "GC1SG1_20260108_NDVI", [FARM, far], margin_km=10)) == 2
+
+        assert len(store.tiles("GC1SG1_20260108_NDVI")) == 2
+        for lat, lon in (FARM, far):
+            assert store.contains("GC1SG1_20260108_NDVI", [lon, lat, lon, lat])
+            assert store.find([lon, lat, lon, lat])
+        # 圃場の間はどのタイルにも含まれない
+        assert not store.contains("GC1SG1_20260108_NDVI", [131.1, 33.1, 131.1, 33.1])
+        assert store.find([131.1, 33.1, 131.1, 33.1]) == []
+
+        # 圃場ごとにその圃場を含むタイルのリンクを返す
+        footprints = {name: footprint for _, name, footprint in store.tiles("GC1SG1_20260108_NDVI")}
+        linked = [
+            store.link("GC1SG1_20260108_NDVI", tmp_path / "linked", [lon, lat, lon, lat]).name
+            for lat, lon in (FARM, far)
+        ]
+        assert linked[0] != linked[1]
+        for name, (lat, lon) in zip(linked, (FARM, far)):
+            bbox = footprints[name]
+            assert bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+        assert sorted(path.name for path in (tmp_path / "linked").iterdir()) == [
+            "GC1SG1_2026010801D01D_NDVI.h5", "GC1SG1_2026010801D01D_NDVI_T1.h5"
+        ]
+
+        # 1つの範囲に切り出し直すとタイルの索引と保存ファイルを片付ける
+        ingest_granule(store, "GC1SG1_20260108_NDVI", [FARM], margin_km=10, delete_source=True)
+        assert store.tiles("GC1SG1_20260108_NDVI") == []
+        assert store.summary()["blobs"] == 1
@@ -0,0 +1,126 @@
+"""
+グラニュール保存領域（内容アドレス方式）のテスト
+"""
+
+import sys
+import os
+
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+from granule_store import GranuleStore
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    """内容が同じグラニュールは別のプロダクトIDでも1つのファイルを共有する"""
+    incoming = tmp_path / "incoming"
+    incoming.mkdir()
+
+    with GranuleStore(tmp_path / "granules", tmp_path / "index.db") as store:
+        for product_id in ("GC1SG1_20260108_VGI", "GC1SG1_20260108_NDVI"):
+            path = incoming / f"{product_id}.h5"
+            path.write_bytes(b"VGI granule")
+            store.put(path, product_id, bbox=[130.0, 32.0, 131.5, 33.5],
+                      start_time="2026-01-08T01:30:00", end_time="2026-01-08T01:35:00",
+                      product_type="NDVI")
+            assert not path.exists()
+
+        assert store.summary() == {"granules": 2, "blobs": 1, "bytes": len(b"VGI granule")}
+
+        linked = store.link("GC1SG1_20260108_NDVI", tmp_path / "geotiff")
+        assert linked.name == "GC1SG1_20260108_NDVI.h5"
+        assert os.path.samefile(linked, store.get("GC1SG1_20260108_VGI")[0])
+
+        # フットプリントが圃場の範囲を含むものだけ引き当てる
+        assert len(store.find([130.2, 32.3, 131.2, 33.3], product_type="NDVI")) == 2
+        assert store.find([131.2, 33.3, 132.2, 34.3]) == []
+        assert store.find([130.2, 32.3, 131.2, 33.3], start_time="2026-01-09") == []
+
+
+def test_put_over_replaced_granule_removes_unreferenced_content(tmp_path):
+    """置き換え済みのグラニュールを再び put すると、切り出し結果・元の内容の保存ファイルを削除する"""
+    incoming = tmp_path / "incoming"
+    incoming.mkdir()
+
+    def write(name, content):
+        path = incoming / name
+        path.write_bytes(content)
+        return path
+
+    with GranuleStore(tmp_path / "granules", tmp_path / "index.db") as store:
+        store.put(write("a.h5", b"full granule"), "GC1SG1_20260108_NDVI")
+        store.replace(write("a.subset.h5", b"subset"), "GC1SG1_20260108_NDVI", keep_source=True)
+        assert store.summary()["blobs"] == 2
+
+        store.put(write("a.h5", b"downloaded again"), "GC1SG1_20260108_NDVI")
+
+        assert store.summary() == {"granules": 1, "blobs": 1, "bytes": len(b"downloaded again")}
+        assert len(list((tmp_path / "granules" / "objects").rglob("*.h5"))) == 1
+        assert store.source("GC1SG1_20260108_NDVI") is None
+
+        # 他のプロダクトが参照している内容は残す
+        store.put(write("b.h5", b"downloaded again"), "GC1SG1_20260108_VGI")
+        store.put(write("a.h5", b"newer"), "GC1SG1_20260108_NDVI")
+        assert store.summary()["blobs"] == 2
+        assert store.get("GC1SG1_20260108_VGI")[0].read_bytes() == b"downloaded again"
+
+
+def test_farms_in_one_scene_share_one_download(tmp_path, monkeypatch):
+    """同じシーンの圃場は1回だけダウンロードし、再実行では転送しない"""
+    pytest.importorskip('h5py')
+    pytest.importorskip('numpy')
+    import jaxa_api_client
+
+    monkeypatch.setattr(jaxa_api_client, 'DATA_DIR', tmp_path / "geotiff")
+    monkeypatch.setattr(jaxa_api_client, 'METADATA_DIR', tmp_path / "metadata")
+
+    downloads = []
+    download_product_mock = jaxa_api_client.download_product_mock
+    monkeypatch.setattr(jaxa_api_client, 'download_product_mock',
+                        lambda *args: downloads.append(args) or download_product_mock(*args))
+
+    farms = [(32.8032, 130.7075), (32.81, 130.72), (32.79, 130.70)]
+    with GranuleStore(tmp_path / "granules", tmp_path / "index.db") as store:
+        results = jaxa_api_client.fetch_products_for_farms(farms, 7, "NDVI", use_mock=True, store=store)
+        assert len(downloads) == 1
+        assert [len(farm) for farm in results] == [1, 1, 1]
+        assert len({metadata["file_path"] for farm in results for metadata in farm}) == 1
+
+        assert len(jaxa_api_client.fetch_products(32.8032, 130.7075, 7, "NDVI", use_mock=True, store=store)) == 1
+        assert len(downloads) == 1
+        assert store.summary()["blobs"] == 1
+
+    assert len(list((tmp_path / "geotiff").glob("*.h5"))) == 1
+
+
+def test_download_source_is_kept_in_index(tmp_path):
+    """ダウンロード元を索引に残し、検索できないときの保存済みプロダクトでも再ダウンロードできる"""
+    import sqlite3
+    pytest.importorskip('numpy')
+    from jaxa_api_client import has_download_source, stored_product
+
+    # ダウンロード元の列がない既存の索引には列を追加する
+    index_path = tmp_path / "index.db"
+    with sqlite3.connect(index_path) as conn:
+        conn.execute(
+            "CREATE TABLE granules (product_id TEXT PRIMARY KEY, sha256 TEXT NOT NULL, name TEXT NOT NULL, "
+            "product_type TEXT, start_time TEXT, end_time TEXT, lon_min REAL, lat_min REAL, "
+            "lon_max REAL, lat_max REAL, source_sha256 TEXT)"
+        )
+
+    path = tmp_path / "GC1SG1_20260108_LST.h5"
+    with GranuleStore(tmp_path / "granules", index_path) as store:
+        path.write_bytes(b"LST granule")
+        store.put(path, "GC1SG1_20260108_LST", bbox=[130.0, 32.0, 131.5, 33.5], product_type="LST",
+                  start_time="2026-01-08T01:30:00", end_time="2026-01-08T01:35:00",
+                  data_path="/standard/GCOM-C/GC1SG1_20260108_LST.h5")
+        path.write_bytes(b"legacy granule")
+        store.put(path, "GC1SG1_20260107_LST", bbox=[130.0, 32.0, 131.5, 33.5], product_type="LST",
+                  start_time="2026-01-07T01:30:00", end_time="2026-01-07T01:35:00")
+
+        products = [stored_product(granule) for granule in store.find([130.2, 32.3, 131.2, 33.3])]
+
+    assert [product["data_path"] for product in products] == [None, "/standard/GCOM-C/GC1SG1_20260108_LST.h5"]
+    assert [has_download_source(product) for product in products] == [False, True]
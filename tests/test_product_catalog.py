@@ -0,0 +1,79 @@
+"""
+G-Portalプロダクトカタログのテスト
+"""
+
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+from product_catalog import ProductCatalog
+
+
+class FakeRemote:
+    """1日1グラニュール（1度セル単位のフットプリント）を返すリモートカタログ"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, bbox, start, end):
+        self.calls.append((bbox, start, end))
+        day = start
+        while day <= end:
+            yield {
+                "product_id": f"GC1SG1_{day:%Y%m%d}01D01D_NDVI",
+                "dataset": "GCOM-C/SGLI/L2-VGI",
+                "start_time": f"{day.isoformat()}T01:30:00",
+                "end_time": f"{day.isoformat()}T01:35:00",
+                "bbox": bbox,
+                "data_path": f"/standard/GCOM-C/{day:%Y/%m/%d}/NDVI.h5",
+            }
+            day += timedelta(days=1)
+
+
+def test_search_queries_only_unsynced_ranges(tmp_path):
+    """2回目以降はローカルから返し、延長した期間だけをリモートに問い合わせる"""
+    remote = FakeRemote()
+    bbox = [130.2, 32.3, 131.2, 33.3]
+    now = datetime(2026, 1, 16, 9, 0)
+
+    with ProductCatalog(tmp_path / "catalog.db") as catalog:
+        first = catalog.search('NDVI', bbox, date(2026, 1, 1), date(2026, 1, 10), remote, now=now)
+        assert [p["start_time"][:10] for p in first] == [f"2026-01-{d:02d}" for d in range(1, 11)]
+        # 範囲にかかる4セルは同じ未同期期間なので1回にまとめる
+        assert len(remote.calls) == 1
+
+        # 同じ検索・近くの圃場の検索はリモートに問い合わせない
+        assert catalog.search('NDVI', bbox, date(2026, 1, 1), date(2026, 1, 10), remote, now=now) == first
+        catalog.search('NDVI', [130.4, 32.5, 130.9, 33.0], date(2026, 1, 3), date(2026, 1, 8), remote, now=now)
+        assert len(remote.calls) == 1
+
+        # 期間を延ばした分だけ問い合わせる
+        extended = catalog.search('NDVI', bbox, date(2026, 1, 1), date(2026, 1, 15), remote, now=now)
+        assert len(extended) == 15
+        assert [(start, end) for _, start, end in remote.calls[1:]] == [(date(2026, 1, 11), date(2026, 1, 15))]
+
+        # ダウンロード状況は再同期しても保持される
+        catalog.mark_downloaded(first[0]["product_id"], tmp_path / "a.h5")
+        later = now + timedelta(days=1)
+        refreshed = catalog.search('NDVI', bbox, date(2026, 1, 1), date(2026, 1, 15), remote, now=later)
+        assert refreshed[0]["download_state"] == "downloaded"
+        # 時間が経つと公開遅延の期間（同期日の3日前より後）だけ問い合わせ直す
+        assert [(start, end) for _, start, end in remote.calls[2:]] == [(date(2026, 1, 14), date(2026, 1, 15))]
+
+
+def test_failed_sync_is_retried(tmp_path):
+    """検索に失敗した期間は同期済みにしない"""
+    remote = FakeRemote()
+    bbox = [130.2, 32.3, 130.8, 32.9]
+    now = datetime(2026, 1, 20, 9, 0)
+
+    def failing(*args):
+        raise ConnectionError("timeout")
+
+    with ProductCatalog(tmp_path / "catalog.db") as catalog:
+        assert catalog.search('LST', bbox, date(2026, 1, 1), date(2026, 1, 5), failing, now=now) == []
+        assert len(catalog.search('LST', bbox, date(2026, 1, 1), date(2026, 1, 5), remote, now=now)) == 5
+        assert len(remote.calls) == 1
@@ -0,0 +1,123 @@
+"""
+COG・チャンク分割HDF5への変換とオーバービュー選択のテスト
+"""
+
+import sys
+import os
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+np = pytest.importorskip('numpy')
+
+FARM = (32.8032, 130.7075)
+
+
+def test_select_overview_never_coarser_than_requested():
+    """要求する倍率以下で最大のオーバービューを選ぶ"""
+    from geotiff_processor import select_overview
+
+    assert select_overview([2, 4, 8], 5.3) == 4
+    assert select_overview([2, 4, 8], 1.5) == 1
+    assert select_overview([], 16) == 1
+
+
+def test_geotiff_converts_to_cog_and_reads_overview(tmp_path):
+    """COGに変換し、出力解像度に合うオーバービューから読む"""
+    rasterio = pytest.importorskip('rasterio')
+    from rasterio.transform import from_origin
+    from geotiff_processor import read_geotiff_rasterio
+    from raster_convert import convert_raster
+
+    # 0.001度（≒100m）間隔の 1024x1024 ストリップ形式GeoTIFF
+    src = tmp_path / "GCOM-C_20260108_LST.tif"
+    data = np.linspace(280, 300, 1024 * 1024, dtype=np.float32).reshape(1024, 1024)
+    with rasterio.open(src, 'w', driver='GTiff', width=1024, height=1024, count=1, dtype='float32',
+                       crs='EPSG:4326', transform=from_origin(130.2, 33.3, 0.001, 0.001)) as dst:
+        dst.write(data, 1)
+
+    cog = convert_raster(src, tmp_path / "cog" / src.name)
+
+    with rasterio.open(cog) as dataset:
+        assert dataset.profile['tiled']
+        assert dataset.compression.name.lower() == 'deflate'
+        assert dataset.overviews(1) == [2, 4]
+        np.testing.assert_array_equal(dataset.read(1), data)
+
+    full, full_meta, _ = read_geotiff_rasterio(cog, *FARM, buffer_km=20)
+    coarse, meta, stats = read_geotiff_rasterio(cog, *FARM, buffer_km=20, resolution_m=450)
+
+    assert "overview_level" not in full_meta
+    assert meta["overview_level"] == 4
+    assert coarse.shape == (full.shape[0] // 4, full.shape[1] // 4)
+    assert abs(stats["mean"] - float(full.mean())) < 0.05
+
+
+def test_hdf5_converts_to_chunked_with_overviews(tmp_path):
+    """チャンク分割・圧縮したHDF5に変換し、オーバービューから統計を計算する"""
+    h5py = pytest.importorskip('h5py')
+    from geotiff_processor import read_hdf5_gcom_c
+    from raster_convert import convert_raster
+
+    # 250m（0.0025度）間隔の 800x800 画像、緯度経度グリッドは10ピクセル間隔
+    src = tmp_path / "geotiff" / "GC1SG1_2026010801D01D_NDVI.h5"
+    src.parent.mkdir()
+    grid_rows, grid_cols = np.mgrid[0:81, 0:81]
+    rows, cols = np.mgrid[0:800, 0:800]
+    with h5py.File(src, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=(0.5 + rows / 4000 + cols / 8000).astype(np.float32))
+        lat = f.create_dataset('Geometry_data/Latitude', data=33.8 - grid_rows * 0.025)
+        lat.attrs['Grid_interval'] = 10
+        f.create_dataset('Geometry_data/Longitude', data=130.2 + grid_cols * 0.025)
+
+    convert_raster(src)
+
+    with h5py.File(src, 'r') as f:
+        ndvi = f['Image_data/NDVI']
+        assert ndvi.chunks == (128, 128)
+        assert ndvi.compression == 'gzip'
+        assert sorted(f['Overviews/Image_data/NDVI']) == ['2', '4']
+        assert f['Overviews/Image_data/NDVI/4'].shape == (200, 200)
+
+    full, _, full_stats = read_hdf5_gcom_c(src, *FARM, buffer_km=20, dataset_name='NDVI')
+    coarse, meta, stats = read_hdf5_gcom_c(src, *FARM, buffer_km=20, dataset_name='NDVI', resolution_m=1000)
+
+    assert meta["overview_level"] == 4
+    assert coarse.size < full.size / 10
+    assert abs(stats["mean"] - full_stats["mean"]) < 0.01
+
+
+def test_in_place_conversion_of_stored_granule_replaces_store_content(tmp_path, monkeypatch):
+    """保存領域のリンクを変換すると保存領域の内容が置き換わり、リンクし直しても元に戻らない"""
+    h5py = pytest.importorskip('h5py')
+    import raster_convert
+    from granule_store import GranuleStore
+
+    incoming = tmp_path / "incoming.h5"
+    with h5py.File(incoming, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=np.random.default_rng(0).random((600, 600), dtype=np.float32))
+
+    def open_store():
+        return GranuleStore(tmp_path / "granules", tmp_path / "index.db")
+
+    monkeypatch.setattr(raster_convert, 'GranuleStore', open_store)
+
+    with open_store() as store:
+        store.put(incoming, "GC1SG1_20260108_NDVI", bbox=[130.0, 32.0, 131.5, 33.5])
+        linked = store.link("GC1SG1_20260108_NDVI", tmp_path / "geotiff")
+
+    monkeypatch.setattr(sys, 'argv', ['raster_convert.py', str(linked), '--in-place'])
+    raster_convert.main()
+
+    with open_store() as store:
+        relinked = store.link("GC1SG1_20260108_NDVI", tmp_path / "geotiff")
+        assert os.path.samefile(relinked, store.get("GC1SG1_20260108_NDVI")[0])
+        with h5py.File(relinked, 'r') as f:
+            assert f['Image_data/NDVI'].chunks == (128, 128)
+            assert 'Overviews/Image_data/NDVI/2' in f
+
+        # 変換前の内容は残さず、フットプリントは変わらない
+        assert store.summary()["blobs"] == 1
+        assert store.contains("GC1SG1_20260108_NDVI", [130.5, 32.5, 131.0, 33.0])
+        assert store.source("GC1SG1_20260108_NDVI") is None
@@ -0,0 +1,193 @@
+"""
+Neo4jライターのテスト
+"""
+
+import sys
+import os
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+
+def test_save_batch_unwinds_rows_per_batch():
+    """JSON-linesの観測がバッチごとに1トランザクションで書き込まれる"""
+    import save_weather
+
+    lines = [
+        json.dumps({"date": f"2026-01-{day:02d}", "temperature": 18.0, "humidity": 65.0, "ndvi_avg": 0.7})
+        for day in range(1, 26)
+    ]
+    lines[3] = json.dumps({"date": "2026-01-04", "temperature": 18.0, "humidity": 65.0, "ndvi_avg": 0.7,
+                           "ndvi_stats": {"valid_pixels": 81, "std": 0.1, "min": 0.5, "max": 0.9,
+                                          "sketch": {"type": "kll"}}})
+
+    batches = []
+    session = MagicMock()
+    session.__enter__.return_value.execute_write.side_effect = \
+        lambda func, rows, farm: batches.append(list(rows)) or len(rows)
+    session.__enter__.return_value.run.return_value.single.return_value = \
+        {"found": 1, "unkeyed": False, "unaggregated": False}
+
+    with patch.object(save_weather, 'GraphDatabase') as graph_database:
+        graph_database.driver.return_value.session.return_value = session
+
+        with save_weather.SatelliteDataWriter() as writer:
+            written = writer.save_batch(save_weather.read_observations(lines), batch_size=10)
+
+    assert written == 25
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert graph_database.driver.call_count == 1
+    assert batches[0][3]["pixel_count"] == 81
+    assert json.loads(batches[0][3]["ndvi_sketch"]) == {"type": "kll"}
+    assert batches[0][0]["ndvi_sketch"] is None
+    assert batches[0][0]["product"] == save_weather.DEFAULT_PRODUCT
+
+    # 初回書き込み前に一意制約とインデックスを作成（移行済み・集計済みなら移行・再集計しない）
+    schema = [call.args[0] for call in session.__enter__.return_value.run.call_args_list]
+    assert schema == [save_weather.CONSTRAINT_EXISTS_QUERY, save_weather.SCHEMA_STATUS_QUERY] \
+        + save_weather.SCHEMA_QUERIES
+
+
+def run_schema_queries(save_weather, calls, fail_query=None, status=None):
+    """ensure_schema をモックのNeo4jで実行し、クエリとトランザクション関数を calls に記録"""
+    session = MagicMock()
+    tx_session = session.__enter__.return_value
+
+    def run(query, **params):
+        calls.append(query)
+        result = MagicMock()
+        result.single.return_value = {"found": 0, **(status or {"unkeyed": True, "unaggregated": False})}
+        if query == fail_query:
+            result.consume.side_effect = save_weather.ClientError("duplicate keys")
+        return result
+
+    tx_session.run.side_effect = run
+    tx_session.execute_write.side_effect = \
+        lambda func, *args: calls.append(func.__name__) or ((3, 2) if not args else 12)
+
+    with patch.object(save_weather, 'GraphDatabase') as graph_database, \
+            patch.object(save_weather, 'bump_version'):
+        graph_database.driver.return_value.session.return_value = session
+
+        with save_weather.SatelliteDataWriter() as writer:
+            writer.ensure_schema()
+            return writer
+
+
+def test_ensure_schema_migrates_before_constraints_and_fails_loudly():
+    """制約がない場合は既存の観測を移行してから制約を作成し、作成できなければ例外"""
+    import save_weather
+
+    calls = []
+    with pytest.raises(RuntimeError, match="satellite_data_key"):
+        run_schema_queries(save_weather, calls, fail_query=save_weather.SCHEMA_QUERIES[1])
+
+    assert calls[:4] == [
+        save_weather.CONSTRAINT_EXISTS_QUERY, save_weather.SCHEMA_STATUS_QUERY,
+        "_migrate_observations", save_weather.SCHEMA_QUERIES[0]
+    ]
+
+    # 移行で観測が変わった場合は、制約の作成後に全期間の集計ノードを作り直す
+    calls = []
+    writer = run_schema_queries(save_weather, calls)
+    assert writer._schema_ready
+    assert calls[-1] == "_rebuild_all_aggregates"
+
+
+def test_ensure_schema_builds_aggregates_for_existing_observations():
+    """集計ノードのない観測日があれば、書き込み前に集計ノードを作成する"""
+    import save_weather
+
+    calls = []
+    run_schema_queries(save_weather, calls, status={"found": 1, "unkeyed": False, "unaggregated": True})
+
+    assert "_migrate_observations" not in calls
+    assert calls[-1] == "_rebuild_all_aggregates"
+
+
+def test_read_observations_rejects_bad_date():
+    """日付形式が不正な行は行番号付きでエラー"""
+    from save_weather import read_observations
+
+    lines = ['{"date": "2026-01-01", "temperature": 1, "humidity": 2, "ndvi_avg": 0.5}',
+             '{"date": "01/02/2026", "temperature": 1, "humidity": 2, "ndvi_avg": 0.5}']
+
+    with pytest.raises(ValueError, match="2行目"):
+        list(read_observations(lines))
+
+
+def test_spool_keeps_rows_until_written(tmp_path):
+    """書き込みに失敗した観測はスプールに残り、次回バッチ単位で書き出される"""
+    from neo4j_spool import ObservationSpool
+    from save_weather import observation_row
+
+    class FlakyWriter:
+        def __init__(self):
+            self.batches = []
+            self.fail = True
+
+        def save_batch(self, rows, batch_size):
+            if self.fail:
+                self.fail = False
+                raise ConnectionError("Neo4j unavailable")
+            self.batches.append(rows)
+            return len(rows)
+
+    writer = FlakyWriter()
+
+    with ObservationSpool(tmp_path / "spool.db") as spool:
+        spool.append([observation_row(f"2026-02-{day:02d}", 18.0, 65.0, 0.7) for day in range(1, 8)])
+
+        with pytest.raises(ConnectionError):
+            spool.drain(writer, batch_size=3)
+        assert spool.count() == 7
+
+    # 再オープンしても残っている（永続化済み）
+    with ObservationSpool(tmp_path / "spool.db") as spool:
+        assert spool.drain(writer, batch_size=3) == 7
+        assert spool.count() == 0
+
+    assert [len(batch) for batch in writer.batches] == [3, 3, 1]
+    assert [row["date"] for batch in writer.batches for row in batch][0] == "2026-02-01"
+
+
+def test_aggregate_periods_cover_day_week_month():
+    """観測日を含む日・週（月曜始まり）・月の期間が重複なく列挙される"""
+    from save_weather import aggregate_periods
+
+    periods = aggregate_periods(["2026-01-30", "2026-02-01", "2026-01-30"])
+
+    assert {"period": "day", "start": "2026-01-30", "end": "2026-01-31"} in periods
+    assert {"period": "day", "start": "2026-02-01", "end": "2026-02-02"} in periods
+    # 2026-01-30（金）と 2026-02-01（日）は同じ週
+    assert [p for p in periods if p["period"] == "week"] == \
+        [{"period": "week", "start": "2026-01-26", "end": "2026-02-02"}]
+    assert [p for p in periods if p["period"] == "month"] == [
+        {"period": "month", "start": "2026-01-01", "end": "2026-02-01"},
+        {"period": "month", "start": "2026-02-01", "end": "2026-03-01"},
+    ]
+    assert len(periods) == 5
+
+
+def _bump_many(path, count):
+    from data_version import bump_version
+    for _ in range(count):
+        bump_version(path)
+
+
+def test_bump_version_is_atomic_across_processes(tmp_path):
+    """複数プロセスが同時にバージョンを上げても、更新が失われない"""
+    import multiprocessing
+    from data_version import read_version
+
+    path = tmp_path / "data_version.json"
+    processes = [multiprocessing.Process(target=_bump_many, args=(path, 25)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert read_version(path) == 100
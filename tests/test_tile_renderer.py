@@ -0,0 +1,117 @@
+"""
+XYZタイル描画のテスト
+"""
+
+import sys
+import os
+import math
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+np = pytest.importorskip('numpy')
+h5py = pytest.importorskip('h5py')
+pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+
+
+def lonlat_to_tile(lat, lon, z):
+    """緯度経度を含むタイル番号"""
+    n = 2 ** z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+@pytest.fixture
+def ndvi_granule(tmp_path):
+    """NDVI = 経度 - 130.2 の 200x200 SGLI形式HDF5ファイル（20260108観測）"""
+    path = tmp_path / "GC1SG1_2026010801D01D_NDVI.h5"
+    size = 200
+
+    rows, cols = np.mgrid[0:size, 0:size]
+    lat_grid = 33.3 - rows * 0.005
+    lon_grid = 130.2 + cols * 0.005
+
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=lon_grid - 130.2)
+        f.create_dataset('Geometry_data/Latitude', data=lat_grid)
+        f.create_dataset('Geometry_data/Longitude', data=lon_grid)
+
+    return path
+
+
+def test_hdf5_tile_samples_granule_at_tile_pixels(ndvi_granule):
+    """タイルの各ピクセルにその位置のグラニュールの値が対応する"""
+    from tile_renderer import read_tile_hdf5, tile_lonlat
+
+    z = 12
+    x, y = lonlat_to_tile(32.8, 130.7, z)
+    lons, lats = tile_lonlat(z, x, y)
+
+    values = read_tile_hdf5(ndvi_granule, 'NDVI', lons, lats)
+
+    assert values.shape == (256, 256)
+    assert np.isfinite(values).all()
+    # 格子間隔（0.005度）以内で経度に一致
+    assert np.abs(values - (lons - 130.2)).max() <= 0.005 + 1e-9
+
+
+def test_get_tile_caches_on_disk_and_evicts_lru(ndvi_granule, tmp_path, monkeypatch):
+    """2回目はディスクキャッシュから返し、上限を超えると古いタイルから削除する"""
+    import tile_renderer
+    from tile_renderer import TileCache, get_tile
+
+    renders = []
+    render_tile = tile_renderer.render_tile
+    monkeypatch.setattr(tile_renderer, 'render_tile',
+                        lambda *args: renders.append(args) or render_tile(*args))
+
+    cache = TileCache(tmp_path / "tiles", max_bytes=10 ** 7)
+    z = 12
+    x, y = lonlat_to_tile(32.8, 130.7, z)
+
+    png, etag = get_tile('ndvi', '2026-01-08', z, x, y, data_dir=ndvi_granule.parent, cache=cache)
+    assert png.startswith(b'\x89PNG')
+    assert get_tile('NDVI', 'latest', z, x, y, data_dir=ndvi_granule.parent, cache=cache) == (png, etag)
+    assert len(renders) == 1
+
+    assert get_tile('LST', '2026-01-08', z, x, y, data_dir=ndvi_granule.parent, cache=cache) is None
+    with pytest.raises(ValueError):
+        get_tile('NDVI', '2026-01-08', 3, 8, 0, data_dir=ndvi_granule.parent, cache=cache)
+
+    # 上限を超えると、最も長く使われていないタイルから削除される
+    (cached,) = (tmp_path / "tiles").rglob('*.png')
+    os.utime(cached, (0, 0))
+    cache.max_bytes = int(len(png) * 1.5)
+
+    get_tile('NDVI', 'latest', z, x + 1, y, data_dir=ndvi_granule.parent, cache=cache)
+    assert not cached.exists()
+    assert len(list((tmp_path / "tiles").rglob('*.png'))) == 1
+
+    get_tile('NDVI', 'latest', z, x, y, data_dir=ndvi_granule.parent, cache=cache)
+    assert len(renders) == 3
+
+
+def test_find_source_picks_granule_covering_tile(ndvi_granule):
+    """同じ日に別シーンがある場合はタイルと重なるものを選び、VGIプロダクトもNDVIとして扱う"""
+    from tile_renderer import find_source, tile_bounds
+
+    # 同じ観測日・ファイル名順で先になる別シーン（北海道付近）のL2 VGIプロダクト
+    other = ndvi_granule.with_name("GC1SG1_202601080155A00000_L2SG_VGI_Q_3000.h5")
+    rows, cols = np.mgrid[0:50, 0:50]
+    with h5py.File(other, 'w') as f:
+        f.create_dataset('Image_data/NDVI', data=np.full((50, 50), 0.5))
+        f.create_dataset('Geometry_data/Latitude', data=43.5 - rows * 0.01)
+        f.create_dataset('Geometry_data/Longitude', data=142.0 + cols * 0.01)
+
+    z = 12
+    farm_tile = tile_bounds(z, *lonlat_to_tile(32.8, 130.7, z))
+    hokkaido_tile = tile_bounds(z, *lonlat_to_tile(43.3, 142.2, z))
+
+    assert find_source('NDVI', '2026-01-08', ndvi_granule.parent, bbox=farm_tile) == ndvi_granule
+    assert find_source('NDVI', '2026-01-08', ndvi_granule.parent, bbox=hokkaido_tile) == other
+    assert find_source('NDVI', 'latest', ndvi_granule.parent, bbox=hokkaido_tile) == other
+    assert find_source('NDVI', '2026-01-08', ndvi_granule.parent, bbox=tile_bounds(z, 0, 0)) is None
+    assert find_source('LST', '2026-01-08', ndvi_granule.parent, bbox=farm_tile) is None
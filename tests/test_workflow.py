@@ -0,0 +1,111 @@
+"""
+収集ワークフローのテスト
+"""
+
+import sys
+import os
+import pytest
+
+# scriptsディレクトリをPYTHONPATHに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../scripts')))
+
+np = pytest.importorskip('numpy')
+h5py = pytest.importorskip('h5py')
+
+
+class ListLogger:
+    """メッセージをリストに記録するロガー"""
+
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message, level="INFO"):
+        self.messages.append((level, message))
+
+
+@pytest.fixture
+def granule_dir(tmp_path, monkeypatch):
+    """LST/NDVIのグラニュール3件と破損ファイル1件を置いたデータディレクトリ"""
+    import collect_and_save_workflow
+
+    rows, cols = np.mgrid[0:100, 0:100]
+    for i, dataset in enumerate(["LST", "NDVI", "LST"]):
+        with h5py.File(tmp_path / f"GC1SG1_2026010{i + 1}_{dataset}.h5", 'w') as f:
+            f.create_dataset(f'Image_data/{dataset}', data=(rows + cols + i).astype('float64'))
+            f.create_dataset('Geometry_data/Latitude', data=33.0 - rows * 0.01)
+            f.create_dataset('Geometry_data/Longitude', data=130.2 + cols * 0.01)
+
+    (tmp_path / "GC1SG1_20260109_broken_NDVI.h5").write_bytes(b"not an hdf5 file")
+
+    monkeypatch.setattr(collect_and_save_workflow, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(collect_and_save_workflow.time, "sleep", lambda seconds: None)
+    return tmp_path
+
+
+def test_process_hdf5_files_parallel_matches_serial(granule_dir):
+    """並列処理の結果が逐次処理と同じ順序・内容になる"""
+    from collect_and_save_workflow import process_hdf5_files
+
+    serial_logger = ListLogger()
+    serial_files, serial_stats = process_hdf5_files(32.6, 130.6, serial_logger, buffer_km=3)
+    parallel_files, parallel_stats = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=3, workers=2)
+
+    assert [f.name for f in serial_files] == [f.name for f in parallel_files]
+    assert len(serial_files) == 3
+    assert [s["statistics"] for s in serial_stats] == [s["statistics"] for s in parallel_stats]
+
+    errors = [message for level, message in serial_logger.messages if level == "ERROR"]
+    assert len(errors) == 1 and "broken" in errors[0]
+
+
+def test_manifest_skips_processed_granules(granule_dir, tmp_path_factory):
+    """台帳に記録済みのグラニュールは再処理せず、変更されたものだけ処理する"""
+    from collect_and_save_workflow import process_hdf5_files, processing_params
+    from processing_manifest import ProcessingManifest
+
+    params = processing_params(32.6, 130.6, 3)
+    manifest_path = tmp_path_factory.mktemp("metadata") / "processing_manifest.db"
+
+    with ProcessingManifest(manifest_path) as manifest:
+        files, _ = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=3, manifest=manifest)
+        assert len(files) == 3
+        assert len(manifest.pending_saves(params)) == 3
+
+        files, _ = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=3, manifest=manifest)
+        assert files == []
+
+        # 内容が変わったファイルのみ再処理
+        changed = granule_dir / "GC1SG1_20260102_NDVI.h5"
+        with h5py.File(changed, 'a') as f:
+            f['Image_data/NDVI'][0, 0] = -1.0
+        os.utime(changed, ns=(changed.stat().st_atime_ns, changed.stat().st_mtime_ns + 10**9))
+
+        files, _ = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=3, manifest=manifest)
+        assert [f.name for f in files] == [changed.name]
+
+        # 保存済みは未保存一覧から外れ、パラメータが変われば再処理対象
+        path, dataset, _ = manifest.pending_saves(params)[0]
+        manifest.mark_saved(path, dataset, params)
+        assert len(manifest.pending_saves(params)) == 2
+
+        files, _ = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=4, manifest=manifest)
+        assert len(files) == 3
+
+
+def test_granules_from_different_days_are_saved_as_separate_observations(granule_dir, tmp_path_factory):
+    """同じ実行で処理した同じプロダクトのグラニュールは、観測日ごとに別の観測になる"""
+    from collect_and_save_workflow import process_hdf5_files, save_to_neo4j
+    from neo4j_spool import ObservationSpool
+
+    _, stats_list = process_hdf5_files(32.6, 130.6, ListLogger(), buffer_km=3)
+    lst_stats = [stats for stats in stats_list if "LST" in stats["file"]]
+    assert [stats["observation_date"] for stats in lst_stats] == ["2026-01-01", "2026-01-03"]
+
+    spool_path = tmp_path_factory.mktemp("metadata") / "neo4j_spool.db"
+    with ObservationSpool(spool_path) as spool:
+        assert save_to_neo4j(lst_stats, ListLogger(), spool) == [0, 1]
+        rows = [row for _, row in spool.peek(10)]
+
+    assert {(row["date"], row["product"]) for row in rows} == {("2026-01-01", "LST"), ("2026-01-03", "LST")}
+    # LSTもピクセル分布（スケッチ）を保存する
+    assert all(row["lst_sketch"] and row["ndvi_sketch"] is None for row in rows)